@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Product, Order, OrderItem, ContactMessage, Notification
+from .models import Product, Order, OrderItem, ContactMessage, Notification, Tombstone, IdempotencyKey, ProductRecommendation
+from .models import ArchivedOrder, ArchivedOrderItem
+from .search import search_products
  
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -8,6 +10,13 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ('name', 'description')
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Utiliser l'index plein texte plutôt que des icontains sur toute la table
+        if not search_term:
+            return queryset, False
+        matches = search_products(search_term, limit=200, queryset=queryset)
+        return queryset.filter(pk__in=[product.pk for product in matches]), False
  
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -26,11 +35,12 @@ class OrderItemAdmin(admin.ModelAdmin):
  
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'subject', 'status', 'created_at')
+    list_display = ('name', 'email', 'subject', 'status', 'repondu_par', 'created_at')
     list_filter = ('status', 'subject', 'created_at')
     search_fields = ('name', 'email', 'message')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at',)
+    list_select_related = ('repondu_par',)
+    readonly_fields = ('created_at', 'repondu_le', 'repondu_par')
  
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -39,3 +49,43 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'message')
     ordering = ('-created_at',)
     readonly_fields = ('created_at',)
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('model', 'object_id', 'owner_id', 'deleted_at')
+    list_filter = ('model', 'deleted_at')
+    ordering = ('-deleted_at',)
+    readonly_fields = ('deleted_at',)
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'status_code', 'expires_at')
+    ordering = ('-expires_at',)
+    readonly_fields = ('key', 'request_hash', 'status_code', 'response', 'expires_at')
+
+@admin.register(ProductRecommendation)
+class ProductRecommendationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'rank', 'recommended', 'score', 'computed_at')
+    list_select_related = ('product', 'recommended')
+    ordering = ('product', 'rank')
+    readonly_fields = ('product', 'recommended', 'rank', 'score', 'computed_at')
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    readonly_fields = ('product_id', 'product_name', 'quantity', 'unit_price', 'total_price')
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'customer_name', 'status', 'total_amount', 'created_at', 'archived_at')
+    list_filter = ('status', 'archived_at')
+    search_fields = ('customer_name', 'customer_email')
+    ordering = ('-created_at',)
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,137 @@
+"""
+Exécution groupée de plusieurs appels API en un aller-retour (/api/batch/).
+
+Chaque sous-requête est résolue par l'urlconf et exécutée dans le même
+processus, en réutilisant la session, l'utilisateur authentifié et la
+connexion à la base de la requête englobante : les middlewares (session,
+authentification, CSRF) ne tournent qu'une fois pour tout le lot. Les vues
+async (notifications) sont exécutées jusqu'au bout via `async_to_sync`.
+
+Une sous-requête qui échoue (exception dans la vue) donne une entrée
+``{"status": 500}`` sans interrompre les autres.
+"""
+import io
+import json
+import logging
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import Http404, StreamingHttpResponse
+from django.urls import Resolver404, resolve
+
+MAX_BATCH_SIZE = 20
+ALLOWED_METHODS = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE'}
+# En-têtes transmis aux sous-requêtes (conditionnels, idempotence...)
+FORWARDED_HEADERS = {'if-none-match', 'if-modified-since', 'idempotency-key', 'accept'}
+
+logger = logging.getLogger(__name__)
+
+
+class BatchError(ValueError):
+    """Lot invalide dans son ensemble (format, taille)."""
+
+
+def parse_batch(data):
+    """Valider le corps ``{"requests": [...]}`` et retourner la liste des sous-requêtes."""
+    requests = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(requests, list) or not requests:
+        raise BatchError('Le corps doit contenir "requests": une liste non vide')
+    if len(requests) > MAX_BATCH_SIZE:
+        raise BatchError(f"{MAX_BATCH_SIZE} sous-requêtes au maximum par lot")
+    return requests
+
+
+def _build_request(parent, spec):
+    method = str(spec.get('method', 'GET')).upper()
+    path, _, query = str(spec.get('path', '')).partition('?')
+    body = b''
+    if spec.get('body') is not None and method != 'GET':
+        body = json.dumps(spec['body']).encode()
+
+    environ = {key: value for key, value in parent.META.items() if not key.startswith('wsgi.')}
+    environ.pop('HTTP_IF_NONE_MATCH', None)
+    environ.pop('HTTP_IF_MODIFIED_SINCE', None)
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json' if body else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': parent.scheme,
+        'HTTP_ACCEPT': 'application/json',
+    })
+    for name, value in (spec.get('headers') or {}).items():
+        if name.lower() in FORWARDED_HEADERS:
+            environ['HTTP_' + name.upper().replace('-', '_')] = str(value)
+
+    request = WSGIRequest(environ)
+    request.session = parent.session
+    request.user = parent.user
+    if hasattr(parent, 'auser'):
+        request.auser = parent.auser
+    # Le CSRF a été vérifié sur la requête englobante
+    request._dont_enforce_csrf_checks = True
+    return method, path, request
+
+
+def _error(status, message):
+    return status, json.dumps({'error': message}, ensure_ascii=False).encode()
+
+
+def run_one(parent, spec):
+    """Exécuter une sous-requête et retourner (statut, corps JSON en octets, en-têtes)."""
+    if not isinstance(spec, dict):
+        return (*_error(400, "Sous-requête invalide"), {})
+    method, path, request = _build_request(parent, spec)
+    if method not in ALLOWED_METHODS:
+        return (*_error(405, f"Méthode non autorisée : {method}"), {})
+    if not path.startswith('/api/') or path.rstrip('/') == '/api/batch':
+        return (*_error(400, f"Chemin non autorisé : {path}"), {})
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return (*_error(404, f"Introuvable : {path}"), {})
+
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    try:
+        response = view(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+            response.render()
+    except Http404:
+        return (*_error(404, f"Introuvable : {path}"), {})
+    except PermissionDenied:
+        return (*_error(403, "Accès non autorisé"), {})
+    except Exception:
+        logger.exception('Sous-requête %s %s en échec', method, path)
+        return (*_error(500, "Erreur interne"), {})
+    if isinstance(response, StreamingHttpResponse):
+        return (*_error(400, "Les réponses en flux ne sont pas disponibles en lot"), {})
+
+    headers = {name: response[name] for name in ('ETag', 'Last-Modified') if response.has_header(name)}
+    content = response.content
+    if not content:
+        content = b'null'
+    elif 'json' not in response.get('Content-Type', ''):
+        content = json.dumps(content.decode(response.charset or 'utf-8', 'replace')).encode()
+    return response.status_code, content, headers
+
+
+def run_batch(parent, specs):
+    """
+    Exécuter les sous-requêtes dans l'ordre et assembler directement la
+    réponse JSON (les corps déjà encodés ne sont pas re-parsés).
+    """
+    parts = []
+    for spec in specs:
+        status, content, headers = run_one(parent, spec)
+        parts.append(
+            b'{"status":' + str(status).encode()
+            + b',"headers":' + json.dumps(headers).encode()
+            + b',"body":' + content + b'}'
+        )
+    return b'{"responses":[' + b','.join(parts) + b']}'
@@ -0,0 +1,173 @@
+"""
+Catalogue filtrable avec compteurs de facettes.
+
+Les compteurs par catégorie, disponibilité et tranche de prix viennent d'une
+seule requête groupée (un « cube » de quelques dizaines de cellules au plus),
+mise en cache sous le numéro de version du catalogue. Toute écriture sur un
+produit incrémente ce numéro : tant que le catalogue ne change pas, un clic
+sur un filtre ne coûte que la requête de la page de résultats, et une page
+déjà servie ne coûte plus de requête du tout (`page_cache_key`).
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from .models import Product
+
+CATALOG_VERSION_KEY = 'catalog:version'
+FACETS_CACHE_TIMEOUT = 60 * 60
+
+# Tranches de prix en FCFA : (code, libellé, minimum inclus, maximum exclu)
+PRICE_BANDS = [
+    ('lt-1000', 'Moins de 1 000 FCFA', None, 1000),
+    ('1000-2500', '1 000 à 2 500 FCFA', 1000, 2500),
+    ('2500-5000', '2 500 à 5 000 FCFA', 2500, 5000),
+    ('gte-5000', '5 000 FCFA et plus', 5000, None),
+]
+PRICE_BAND_CODES = [code for code, _, _, _ in PRICE_BANDS]
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+ORDERINGS = {'-created_at', 'created_at', 'price', '-price', 'name', '-name'}
+
+
+def catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    """Invalider les facettes (et tout ce qui dépend de la version du catalogue)."""
+    def bump():
+        try:
+            cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.set(CATALOG_VERSION_KEY, 2, timeout=None)
+    # Après le commit, pour ne pas mettre en cache un état en cours d'écriture
+    transaction.on_commit(bump)
+
+
+def _band_q(minimum, maximum):
+    q = Q()
+    if minimum is not None:
+        q &= Q(price__gte=minimum)
+    if maximum is not None:
+        q &= Q(price__lt=maximum)
+    return q
+
+
+def _price_band_expression():
+    return Case(
+        *[When(_band_q(minimum, maximum), then=Value(index))
+          for index, (_, _, minimum, maximum) in enumerate(PRICE_BANDS)],
+        output_field=IntegerField(),
+    )
+
+
+def facet_cube():
+    """
+    Retourner [(catégorie, disponible, indice de tranche, nombre)] pour tout le
+    catalogue, en une requête GROUP BY, mise en cache par version.
+    """
+    key = f'catalog:facets:{catalog_version()}'
+    cube = cache.get(key)
+    if cube is None:
+        rows = (
+            Product.objects
+            .order_by()
+            .annotate(band=_price_band_expression())
+            .values_list('category', 'available', 'band')
+            .annotate(n=Count('id'))
+        )
+        cube = [tuple(row) for row in rows]
+        cache.set(key, cube, FACETS_CACHE_TIMEOUT)
+    return cube
+
+
+def page_cache_key(query_string):
+    """Clé de cache d'une page du catalogue (périmée dès que la version change)."""
+    digest = hashlib.md5(query_string.encode(), usedforsecurity=False).hexdigest()
+    return f'catalog:page:{catalog_version()}:{digest}'
+
+
+def _matches(cell, filters, skip=None):
+    category, available, band, _ = cell
+    if skip != 'category' and filters['category'] and category not in filters['category']:
+        return False
+    if skip != 'available' and filters['available'] is not None and available != filters['available']:
+        return False
+    if skip != 'price_band' and filters['price_band'] and PRICE_BAND_CODES[band] not in filters['price_band']:
+        return False
+    return True
+
+
+def compute_facets(cube, filters):
+    """
+    Compteurs de chaque facette en tenant compte des autres filtres mais pas
+    du sien (on voit combien de produits donnerait chaque autre choix).
+    """
+    categories = {code: 0 for code, _ in Product.CATEGORY_CHOICES}
+    bands = {code: 0 for code in PRICE_BAND_CODES}
+    availability = {'true': 0, 'false': 0}
+    total = 0
+    for cell in cube:
+        count = cell[3]
+        if _matches(cell, filters, skip='category'):
+            categories[cell[0]] = categories.get(cell[0], 0) + count
+        if _matches(cell, filters, skip='price_band'):
+            bands[PRICE_BAND_CODES[cell[2]]] += count
+        if _matches(cell, filters, skip='available'):
+            availability['true' if cell[1] else 'false'] += count
+        if _matches(cell, filters):
+            total += count
+    labels = dict(Product.CATEGORY_CHOICES)
+    band_labels = {code: label for code, label, _, _ in PRICE_BANDS}
+    return total, {
+        'category': [{'value': code, 'label': labels.get(code, code), 'count': n} for code, n in categories.items()],
+        'price_band': [{'value': code, 'label': band_labels[code], 'count': n} for code, n in bands.items()],
+        'available': [{'value': value, 'count': n} for value, n in availability.items()],
+    }
+
+
+def parse_filters(params):
+    """Lire les filtres depuis les paramètres de requête. Lève ValueError si invalides."""
+    categories = [value for value in params.getlist('category') if value]
+    unknown = set(categories) - {code for code, _ in Product.CATEGORY_CHOICES}
+    if unknown:
+        raise ValueError(f"Catégorie inconnue : {', '.join(sorted(unknown))}")
+
+    bands = [value for value in params.getlist('price_band') if value]
+    unknown = set(bands) - set(PRICE_BAND_CODES)
+    if unknown:
+        raise ValueError(f"Tranche de prix inconnue : {', '.join(sorted(unknown))}")
+
+    available = params.get('available')
+    if available in (None, ''):
+        available = None
+    elif available.lower() in ('1', 'true'):
+        available = True
+    elif available.lower() in ('0', 'false'):
+        available = False
+    else:
+        raise ValueError("available doit valoir true ou false")
+
+    return {'category': categories, 'price_band': bands, 'available': available}
+
+
+def filter_queryset(queryset, filters):
+    if filters['category']:
+        queryset = queryset.filter(category__in=filters['category'])
+    if filters['available'] is not None:
+        queryset = queryset.filter(available=filters['available'])
+    if filters['price_band']:
+        q = Q()
+        for code, _, minimum, maximum in PRICE_BANDS:
+            if code in filters['price_band']:
+                q |= _band_q(minimum, maximum)
+        queryset = queryset.filter(q)
+    return queryset
@@ -0,0 +1,199 @@
+"""
+Compression des réponses de l'API (Brotli ou gzip).
+
+`CompressionMiddleware` compresse les réponses JSON, NDJSON et CSV au-delà de
+``COMPRESSION_MIN_SIZE`` octets, y compris les réponses en flux (exports),
+morceau par morceau. Brotli est utilisé si le paquet ``brotli`` est installé
+et accepté par le client, sinon gzip.
+
+Une vue peut poser ``response.compression_cache_key`` : les octets compressés
+sont alors gardés en cache sous cette clé (une entrée par encodage) et une
+réponse identique n'est jamais recompressée.
+"""
+import gzip
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    brotli = None
+
+COMPRESSION_MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+# Pas de HTML : une page qui contient le jeton CSRF et reflète une saisie de
+# l'utilisateur permettrait de deviner le jeton à la taille compressée (BREACH)
+COMPRESSIBLE_TYPES = getattr(settings, 'COMPRESSION_TYPES', (
+    'application/json', 'application/x-ndjson', 'text/csv',
+))
+COMPRESSED_CACHE_TIMEOUT = 60 * 60
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+BROTLI_STREAM_QUALITY = 4
+
+_token_re = _lazy_re_compile(r'\s*([a-z*]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', flags=0)
+
+
+def accepted_encodings(header):
+    """Encodages acceptés par le client (q > 0)."""
+    accepted = set()
+    for part in header.lower().split(','):
+        match = _token_re.match(part)
+        if not match:
+            continue
+        encoding, quality = match.group(1), match.group(2)
+        try:
+            if quality is not None and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding)
+    return accepted
+
+
+def choose_encoding(request):
+    accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """Compression incrémentale : chaque morceau reçu est émis compressé et vidé."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=BROTLI_STREAM_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+    def wrap(self, chunks):
+        for data in chunks:
+            out = self.chunk(data)
+            if out:
+                yield out
+        yield self.finish()
+
+    async def awrap(self, chunks):
+        async for data in chunks:
+            out = self.chunk(data)
+            if out:
+                yield out
+        yield self.finish()
+
+
+def _compressible(response):
+    if response.status_code != 200 or response.has_header('Content-Encoding'):
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Utilisable en WSGI comme en ASGI : sous ASGI, `__acall__` reste sur la
+    boucle d'évènements (pas de passage par un thread pour chaque requête) ;
+    seul le cache des corps compressés est lu et écrit en async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        encoding = self._encoding(request, response)
+        if encoding is None:
+            return response
+        if response.streaming:
+            return self._compress_stream(response, encoding)
+
+        cache_key = getattr(response, 'compression_cache_key', None)
+        compressed = cache.get(f'{cache_key}:{encoding}') if cache_key else None
+        if compressed is None:
+            compressed = compress(response.content, encoding)
+            if cache_key:
+                cache.set(f'{cache_key}:{encoding}', compressed, COMPRESSED_CACHE_TIMEOUT)
+        return self._compressed(response, encoding, compressed)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        encoding = self._encoding(request, response)
+        if encoding is None:
+            return response
+        if response.streaming:
+            return self._compress_stream(response, encoding)
+
+        cache_key = getattr(response, 'compression_cache_key', None)
+        compressed = await cache.aget(f'{cache_key}:{encoding}') if cache_key else None
+        if compressed is None:
+            compressed = compress(response.content, encoding)
+            if cache_key:
+                await cache.aset(f'{cache_key}:{encoding}', compressed, COMPRESSED_CACHE_TIMEOUT)
+        return self._compressed(response, encoding, compressed)
+
+    def _encoding(self, request, response):
+        """Encodage à appliquer, ou None si la réponse reste telle quelle."""
+        if not _compressible(response):
+            return None
+        # La réponse dépend de Accept-Encoding même quand on ne compresse pas
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        if encoding is None or (not response.streaming and len(response.content) < COMPRESSION_MIN_SIZE):
+            return None
+        return encoding
+
+    def _compress_stream(self, response, encoding):
+        compressor = StreamCompressor(encoding)
+        if response.is_async:
+            response.streaming_content = compressor.awrap(response.streaming_content)
+        else:
+            response.streaming_content = compressor.wrap(response.streaming_content)
+        del response['Content-Length']
+        return self._encoded(response, encoding)
+
+    def _compressed(self, response, encoding, compressed):
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        return self._encoded(response, encoding)
+
+    def _encoded(self, response, encoding):
+        # Le corps change selon l'encodage : un ETag fort doit devenir faible
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,135 @@
+"""
+Statistiques de commandes par client (nombre, dépenses, dernière commande).
+
+Plutôt qu'un GROUP BY sur toutes les commandes à chaque affichage de la
+liste des utilisateurs, chaque client a une ligne `CustomerStats` mise à
+jour dans la même transaction que l'écriture qui la fait varier :
+
+- commande passée : +1 commande, +total, dernière commande = maintenant ;
+- commande annulée : -1 commande, -(total - déjà remboursé) ;
+- remboursement d'une commande non annulée : -montant.
+
+Les mises à jour sont des ``UPDATE ... SET n = n + delta`` : deux commandes
+simultanées du même client ne perdent pas d'incrément. Les cas plus rares
+(modification complète, suppression) recalculent la ligne du client depuis
+ses commandes avec `rebuild`. L'archivage (api/deletion.py) ne change pas
+les compteurs : `rebuild` compte aussi les commandes archivées.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+
+from .models import ArchivedOrder, CustomerStats, Order
+
+COUNTED = ~Q(status='cancelled')
+STAT_FIELDS = ('order_count', 'total_spent', 'last_order_at')
+
+# Tris de la liste des utilisateurs, chacun servi par un index de CustomerStats
+SORTS = {
+    'username': ('user__username',),
+    '-username': ('-user__username',),
+    'order_count': ('order_count', 'user'),
+    '-order_count': ('-order_count', '-user'),
+    'total_spent': ('total_spent', 'user'),
+    '-total_spent': ('-total_spent', '-user'),
+    'last_order_at': ('last_order_at', 'user'),
+    '-last_order_at': ('-last_order_at', '-user'),
+}
+DEFAULT_SORT = 'username'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def adjust(user_id, orders=0, spent=0, last_order_at=None):
+    """Appliquer un delta à la ligne du client (recalculée si elle manque)."""
+    values = {
+        'order_count': F('order_count') + orders,
+        'total_spent': F('total_spent') + spent,
+        'updated_at': timezone.now(),
+    }
+    if last_order_at is not None:
+        values['last_order_at'] = last_order_at
+    if not CustomerStats.objects.filter(user_id=user_id).update(**values):
+        rebuild([user_id])
+
+
+def order_placed(order):
+    adjust(order.user_id, orders=1, spent=order.total_amount, last_order_at=order.created_at)
+
+
+def orders_cancelled(order_ids):
+    """Retirer des compteurs les commandes `order_ids` qui viennent d'être annulées."""
+    rows = (
+        Order.objects.filter(pk__in=order_ids)
+        .values('user_id')
+        .annotate(orders=Count('pk'), spent=Sum(F('total_amount') - F('refund_amount')))
+        .order_by()
+    )
+    for row in rows:
+        adjust(row['user_id'], orders=-row['orders'], spent=-row['spent'])
+
+
+def rebuild(user_ids=None):
+    """
+    Recalculer les lignes de `user_ids` (tous les clients si None) depuis les
+    commandes et les commandes archivées, en une requête groupée par table
+    et un upsert.
+    """
+    users = User.objects.all()
+    sources = [Order.objects.all(), ArchivedOrder.objects.all()]
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        sources = [orders.filter(user_id__in=user_ids) for orders in sources]
+    totals = {}
+    for orders in sources:
+        for row in orders.values('user_id').annotate(
+            order_count=Count('pk', filter=COUNTED),
+            total_spent=Sum(F('total_amount') - F('refund_amount'), filter=COUNTED),
+            last_order_at=Max('created_at'),
+        ).order_by():
+            total = totals.setdefault(row['user_id'], {'order_count': 0, 'total_spent': 0, 'last_order_at': None})
+            total['order_count'] += row['order_count']
+            total['total_spent'] += row['total_spent'] or 0
+            total['last_order_at'] = max(filter(None, (total['last_order_at'], row['last_order_at'])))
+    now = timezone.now()
+    empty = {'order_count': 0, 'total_spent': 0, 'last_order_at': None}
+    stats = [
+        CustomerStats(user_id=pk, **totals.get(pk, empty), updated_at=now)
+        for pk in users.values_list('pk', flat=True).iterator()
+    ]
+    with transaction.atomic():
+        CustomerStats.objects.bulk_create(
+            stats, batch_size=1000, update_conflicts=True,
+            unique_fields=['user'], update_fields=[*STAT_FIELDS, 'updated_at'],
+        )
+    return len(stats)
+
+
+def users_page(sort=DEFAULT_SORT, page=1, page_size=DEFAULT_PAGE_SIZE, search=''):
+    """
+    (nombre total, page d'utilisateurs avec leurs compteurs), triée selon
+    `sort`. `search` filtre sur le début du nom d'utilisateur ou de l'email
+    (sans casse, index de la migration 0016).
+    """
+    if sort not in SORTS:
+        raise ValueError(f"Tri inconnu : {sort}")
+    stats = CustomerStats.objects.all()
+    search = search.strip()
+    if search:
+        stats = stats.filter(Q(user__username__istartswith=search) | Q(user__email__istartswith=search))
+    offset = (page - 1) * page_size
+    rows = (
+        stats
+        .order_by(*SORTS[sort])
+        .values_list('user_id', 'user__username', 'user__email', 'user__is_staff', 'user__is_active',
+                     *STAT_FIELDS)[offset:offset + page_size]
+    )
+    results = [
+        {
+            'id': pk, 'username': username, 'email': email, 'is_staff': is_staff, 'is_active': is_active,
+            'order_count': order_count, 'total_spent': total_spent, 'last_order_at': last_order_at,
+        }
+        for pk, username, email, is_staff, is_active, order_count, total_spent, last_order_at in rows
+    ]
+    return stats.count(), results
@@ -0,0 +1,185 @@
+"""
+Suppressions et archivage en masse, sans le collecteur de Django.
+
+``instance.delete()`` charge en mémoire toutes les lignes liées (commandes,
+articles, messages, notifications...) pour les supprimer une par une et
+déclencher les signaux. Ici chaque table est traitée par une requête
+ensembliste, des enfants vers les parents :
+
+- les commandes non livrées rendent leur stock (`release_stock`) ;
+- les commandes ne sont pas détruites mais déplacées dans l'archive
+  (``INSERT INTO api_archivedorder ... SELECT ... FROM api_order``, de même
+  pour les articles avec le nom du produit), puis supprimées par un
+  ``DELETE ... WHERE`` : l'historique des ventes est conservé ;
+- les tables sans signal ni dépendance (articles, messages, notifications)
+  sont vidées par un seul ``DELETE ... WHERE`` ;
+- les traces de synchronisation (`Tombstone`) des commandes sont écrites
+  directement, à la place du signal post_delete.
+
+Chaque fonction renvoie le nombre de lignes touchées par table, lu dans le
+résultat des requêtes (ou d'un ``COUNT`` avec ``dry_run=True``), sans
+instancier les objets.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import DateTimeField, Q, Value
+from django.utils import timezone
+
+from . import inbox, kitchen
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ContactMessage, Notification, Order, OrderItem, Product,
+    ProductRecommendation,
+)
+from .ordering import STOCK_HELD_STATUSES, release_stock
+from .sync import record_deletions
+
+MAX_BULK_USERS = 500
+ARCHIVE_CHUNK_SIZE = 1000
+ORDER_ARCHIVE_AFTER_DAYS = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365)
+FINISHED_STATUSES = ('delivered', 'cancelled')
+
+# Colonnes copiées telles quelles de api_order vers api_archivedorder
+ORDER_COLUMNS = ('customer_name', 'customer_email', 'customer_phone', 'status', 'notes', 'pickup_at',
+                 'total_amount', 'refund_amount', 'created_at', 'updated_at')
+
+
+class DeletionError(Exception):
+    """Suppression refusée (par exemple un produit encore dans des commandes en cours)."""
+
+
+def _insert_select(model, fields, queryset):
+    """``INSERT INTO <model> (fields) SELECT ...`` ; `queryset` sélectionne les colonnes dans le même ordre."""
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+    columns = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) {sql}', params)
+        return cursor.rowcount
+
+
+def _archive_chunk(order_ids, now):
+    orders = Order.objects.filter(pk__in=order_ids).order_by()
+    items = OrderItem.objects.filter(order_id__in=order_ids).order_by()
+    archived = _insert_select(
+        ArchivedOrder, ('id', 'user_id', *ORDER_COLUMNS, 'archived_at'),
+        # L'annotation est sélectionnée après les champs : archived_at en dernier
+        orders.annotate(archived_at=Value(now, output_field=DateTimeField()))
+        .values_list('pk', 'user_id', *ORDER_COLUMNS, 'archived_at'),
+    )
+    archived_items = _insert_select(
+        ArchivedOrderItem, ('id', 'order', 'product_id', 'product_name', 'quantity', 'unit_price', 'total_price'),
+        items.values_list('pk', 'order_id', 'product_id', 'product__name', 'quantity', 'unit_price', 'total_price'),
+    )
+    record_deletions('order', orders.values_list('pk', 'user_id'))
+    # OrderItem n'a ni signal ni dépendance : delete() émet directement un DELETE ... WHERE.
+    # Order a un signal post_delete (remplacé par record_deletions) : suppression brute
+    items.delete()
+    orders._raw_delete(orders.db)
+    return archived, archived_items
+
+
+def archive_orders(orders, chunk_size=ARCHIVE_CHUNK_SIZE, dry_run=False):
+    """
+    Déplacer les commandes `orders` (un queryset) et leurs articles vers
+    l'archive, par lots de `chunk_size` clés primaires, chacun dans sa
+    transaction.
+    """
+    if dry_run:
+        return {
+            'archived_orders': orders.count(),
+            'archived_order_items': OrderItem.objects.filter(order_id__in=orders.values('pk')).count(),
+        }
+    counts = {'archived_orders': 0, 'archived_order_items': 0}
+    now = timezone.now()
+    last = 0
+    while True:
+        ids = list(orders.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return counts
+        with transaction.atomic():
+            archived, archived_items = _archive_chunk(ids, now)
+        counts['archived_orders'] += archived
+        counts['archived_order_items'] += archived_items
+        last = ids[-1]
+
+
+def archive_old_orders(days=ORDER_ARCHIVE_AFTER_DAYS, chunk_size=ARCHIVE_CHUNK_SIZE, dry_run=False):
+    """Archiver les commandes livrées ou annulées depuis plus de `days` jours."""
+    before = timezone.now() - timedelta(days=days)
+    orders = Order.objects.filter(status__in=FINISHED_STATUSES, updated_at__lt=before)
+    return archive_orders(orders, chunk_size=chunk_size, dry_run=dry_run)
+
+
+def _delete(queryset, dry_run):
+    return queryset.count() if dry_run else queryset.delete()[0]
+
+
+def delete_users(user_ids, dry_run=False):
+    """
+    Supprimer les utilisateurs `user_ids` : leurs commandes sont archivées,
+    leurs messages et notifications supprimés. Retourne les nombres de
+    lignes par table.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return dict.fromkeys(
+            ('archived_orders', 'archived_order_items', 'contact_messages', 'notifications', 'users'), 0,
+        )
+    with transaction.atomic():
+        # Les produits des commandes en cours sortent de la file de la cuisine
+        products = set(
+            OrderItem.objects
+            .filter(order__user_id__in=user_ids, order__status__in=kitchen.ACTIVE_STATUSES)
+            .values_list('product_id', flat=True).distinct()
+        )
+        if not dry_run:
+            # Les commandes non livrées rendent leur stock avant d'être archivées
+            release_stock(Order.objects.filter(user_id__in=user_ids, status__in=STOCK_HELD_STATUSES).values('pk'))
+        counts = archive_orders(Order.objects.filter(user_id__in=user_ids), dry_run=dry_run)
+        counts['contact_messages'] = _delete(ContactMessage.objects.filter(user_id__in=user_ids), dry_run)
+        counts['notifications'] = _delete(Notification.objects.filter(user_id__in=user_ids), dry_run)
+
+        # Il ne reste que les utilisateurs eux-mêmes (et leurs petites tables
+        # auth) : le collecteur ne trouve plus rien de volumineux
+        users = User.objects.filter(pk__in=user_ids)
+        if dry_run:
+            counts['users'] = users.count()
+        else:
+            counts['users'] = users.delete()[1].get(User._meta.label, 0)
+            kitchen.publish(products)
+            inbox.unread_changed()
+    return counts
+
+
+def delete_products(product_ids, dry_run=False):
+    """
+    Supprimer les produits `product_ids`. Les commandes terminées qui les
+    contiennent sont archivées ; si l'un d'eux figure dans une commande en
+    cours, lève DeletionError (le rendre indisponible à la place).
+    """
+    product_ids = list(product_ids)
+    items = OrderItem.objects.filter(product_id__in=product_ids)
+
+    with transaction.atomic():
+        # Verrou sur les produits : `place_order` réserve le stock par un UPDATE
+        # de ces lignes, aucune commande ne peut donc s'y ajouter entre la
+        # vérification et l'archivage
+        list(Product.objects.select_for_update().filter(pk__in=product_ids).values_list('pk', flat=True))
+        if items.exclude(order__status__in=FINISHED_STATUSES).exists():
+            raise DeletionError("Produit présent dans des commandes en cours : rendez-le indisponible plutôt")
+        # Seules les commandes terminées sont archivées : une commande en cours n'y
+        # perdrait jamais son stock réservé
+        counts = archive_orders(
+            Order.objects.filter(pk__in=items.values('order_id'), status__in=FINISHED_STATUSES), dry_run=dry_run,
+        )
+        counts['recommendations'] = _delete(
+            ProductRecommendation.objects.filter(Q(product_id__in=product_ids) | Q(recommended_id__in=product_ids)),
+            dry_run,
+        )
+        # Peu de lignes : le collecteur garde les signaux (catalogue, Tombstone)
+        products = Product.objects.filter(pk__in=product_ids)
+        counts['products'] = products.count() if dry_run else products.delete()[1].get(Product._meta.label, 0)
+    return counts
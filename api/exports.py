@@ -0,0 +1,135 @@
+"""
+Export des commandes pour la comptabilité.
+
+Les lignes sont lues avec un curseur côté serveur (`iterator(chunk_size=...)`)
+et écrites au fil de l'eau : la mémoire reste constante et le premier octet
+part dès la première tranche, même pour une année entière de commandes.
+
+Sous ASGI, Django lirait entièrement un itérateur synchrone avant d'envoyer
+quoi que ce soit ; `aiter_chunks` en fait un itérateur async qui lit les
+lignes par lots dans le thread synchrone de la requête (même connexion, même
+curseur).
+"""
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from .models import Order
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_CHUNK_SIZE = 2000
+# Morceaux produits par passage dans le thread synchrone (flux ASGI)
+ASYNC_BATCH_SIZE = 500
+
+ORDER_FIELDS = [
+    'id', 'created_at', 'status', 'customer_name', 'customer_email',
+    'customer_phone', 'total_amount',
+]
+ITEM_FIELDS = [
+    'items__id', 'items__product_id', 'items__product__name',
+    'items__quantity', 'items__unit_price', 'items__total_price',
+]
+
+CSV_HEADER = [
+    'order_id', 'created_at', 'status', 'customer_name', 'customer_email',
+    'customer_phone', 'total_amount', 'item_id', 'product_id', 'product_name',
+    'quantity', 'unit_price', 'item_total',
+]
+
+
+def filter_orders(queryset, date_from=None, date_to=None, status=None):
+    """Appliquer les filtres d'export (dates incluses) à un queryset de commandes."""
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Itérer une ligne par article de commande (jointure externe : une commande
+    sans article donne une ligne aux champs article vides).
+    """
+    rows = (
+        queryset
+        .order_by('id', 'items__id')
+        .values_list(*ORDER_FIELDS, *ITEM_FIELDS)
+    )
+    return rows.iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """Pseudo-fichier qui renvoie ce qu'on y écrit (pour csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for row in rows:
+        yield writer.writerow([_json_value(value) for value in row])
+
+
+def iter_ndjson(rows):
+    """Regrouper les lignes consécutives d'une même commande en un objet JSON par ligne."""
+    current = None
+    order_len = len(ORDER_FIELDS)
+    for row in rows:
+        if current is None or current['id'] != row[0]:
+            if current is not None:
+                yield json.dumps(current, ensure_ascii=False) + '\n'
+            current = {name: _json_value(value) for name, value in zip(ORDER_FIELDS, row[:order_len])}
+            current['items'] = []
+        item_id, product_id, product_name, quantity, unit_price, total_price = row[order_len:]
+        if item_id is not None:
+            current['items'].append({
+                'id': item_id,
+                'product': product_id,
+                'product_name': product_name,
+                'quantity': quantity,
+                'unit_price': _json_value(unit_price),
+                'total_price': _json_value(total_price),
+            })
+    if current is not None:
+        yield json.dumps(current, ensure_ascii=False) + '\n'
+
+
+def iter_export(queryset, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    rows = export_rows(queryset, chunk_size=chunk_size)
+    if export_format == 'ndjson':
+        return iter_ndjson(rows)
+    return iter_csv(rows)
+
+
+def export_orders(export_format='csv', date_from=None, date_to=None, status=None,
+                  chunk_size=EXPORT_CHUNK_SIZE):
+    """Générateur de morceaux de texte pour l'export de toutes les commandes filtrées."""
+    queryset = filter_orders(Order.objects.all(), date_from, date_to, status)
+    return iter_export(queryset, export_format, chunk_size=chunk_size)
+
+
+async def aiter_chunks(chunks, batch_size=ASYNC_BATCH_SIZE):
+    """Itérateur async sur `chunks` (itérateur synchrone qui lit la base), par lots."""
+    chunks = iter(chunks)
+    next_batch = sync_to_async(lambda: list(islice(chunks, batch_size)), thread_sensitive=True)
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
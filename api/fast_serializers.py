@@ -0,0 +1,105 @@
+"""
+Sérialisation rapide en lecture pour les listes.
+
+Un `ModelSerializer` instancie un modèle par ligne puis parcourt ses champs
+un à un ; sur une longue liste cela coûte plus cher que la requête SQL.
+`ValuesSerializer` « compile » une fois le serializer existant en une liste
+de chemins ``.values()`` et construit directement les dictionnaires de
+sortie. Le schéma reste celui du serializer : mêmes clés, même ordre, et
+les Decimal / datetimes passent par les mêmes champs DRF pour un format
+identique. Les relations imbriquées (`many=True`) sont chargées en une
+requête par lot de lignes parentes.
+
+Les écritures continuent de passer par les serializers validés.
+"""
+from rest_framework import serializers
+
+NESTED_BATCH_SIZE = 500
+
+# Champs dont la représentation dépend du formatage DRF (arrondi, fuseau horaire)
+_FORMATTED_FIELDS = (serializers.DecimalField, serializers.DateTimeField)
+
+
+class ValuesSerializer:
+    """Construire la sortie de `serializer_class` à partir de lignes ``.values()``."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.plan = []
+        self.nested = {}
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source)
+                self.nested[name] = (ValuesSerializer(type(field.child)), relation.field.attname)
+                self.plan.append((name, None, None))
+                continue
+            path = '__'.join(field.source_attrs)
+            convert = field.to_representation if isinstance(field, _FORMATTED_FIELDS) else None
+            self.plan.append((name, path, convert))
+
+    @property
+    def field_names(self):
+        return [name for name, _, _ in self.plan]
+
+    def restrict(self, fields):
+        """Copie limitée aux champs de sortie `fields` (dans l'ordre du serializer)."""
+        restricted = ValuesSerializer.__new__(ValuesSerializer)
+        restricted.serializer_class = self.serializer_class
+        restricted.model = self.model
+        restricted.plan = [step for step in self.plan if step[0] in fields]
+        restricted.nested = {name: nested for name, nested in self.nested.items() if name in fields}
+        return restricted
+
+    @property
+    def paths(self):
+        paths = ['pk']
+        paths.extend(path for _, path, _ in self.plan if path and path != 'pk')
+        return paths
+
+    def to_representation(self, row, nested_rows=None):
+        data = {}
+        for name, path, convert in self.plan:
+            if path is None:
+                data[name] = (nested_rows or {}).get(name, [])
+                continue
+            value = row[path]
+            if value is not None and convert is not None:
+                value = convert(value)
+            data[name] = value
+        return data
+
+    def _load_nested(self, pks):
+        loaded = {name: {} for name in self.nested}
+        for name, (child, fk_attname) in self.nested.items():
+            child_qs = child.model._default_manager.order_by('pk')
+            for start in range(0, len(pks), NESTED_BATCH_SIZE):
+                batch = pks[start:start + NESTED_BATCH_SIZE]
+                rows = child_qs.filter(**{f'{fk_attname}__in': batch}).values(fk_attname, *child.paths)
+                for row in rows:
+                    loaded[name].setdefault(row[fk_attname], []).append(child.to_representation(row))
+        return loaded
+
+    def serialize(self, queryset):
+        rows = list(queryset.values(*self.paths))
+        if not self.nested:
+            return [self.to_representation(row) for row in rows]
+
+        loaded = self._load_nested([row['pk'] for row in rows])
+        return [
+            self.to_representation(row, {name: by_parent.get(row['pk'], []) for name, by_parent in loaded.items()})
+            for row in rows
+        ]
+
+
+_compiled = {}
+
+
+def values_serializer_for(serializer_class):
+    """ValuesSerializer mis en cache par classe de serializer (compilé une seule fois)."""
+    compiled = _compiled.get(serializer_class)
+    if compiled is None:
+        compiled = _compiled[serializer_class] = ValuesSerializer(serializer_class)
+    return compiled
@@ -0,0 +1,40 @@
+"""
+Champs de modèle propres à l'application.
+
+Les montants sont en FCFA, une devise sans subdivision : l'unité mineure est
+le franc lui-même. `MoneyField` les stocke donc en entier (BIGINT), ce qui
+évite l'arithmétique Decimal dans les totaux et l'encodage en chaîne dans les
+réponses ; les sommes SQL restent entières elles aussi.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.core import exceptions
+from django.db import models
+
+
+def to_fcfa(value):
+    """Convertir un montant (int, Decimal, float ou chaîne) en francs entiers, arrondi au franc."""
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(Decimal(str(value).strip()).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError):
+        raise exceptions.ValidationError(
+            "« %(value)s » n'est pas un montant valide.",
+            code='invalid',
+            params={'value': value},
+        )
+
+
+class MoneyField(models.BigIntegerField):
+    """Montant en FCFA stocké en entier (unité mineure = 1 franc)."""
+
+    description = "Montant en FCFA (entier)"
+
+    def to_python(self, value):
+        return to_fcfa(value)
+
+    def get_prep_value(self, value):
+        # IntegerField.get_prep_value tronquerait : on arrondit au franc
+        value = models.Field.get_prep_value(self, value)
+        return to_fcfa(value)
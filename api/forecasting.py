@@ -0,0 +1,172 @@
+"""
+Prévision de la demande pour préparer le stock du matin.
+
+Les ventes quotidiennes par produit sont chargées en une requête groupée
+puis placées dans une matrice NumPy produits x jours. La prévision d'un jour
+donné ne regarde que les mêmes jours de la semaine (un samedi ressemble aux
+samedis précédents, pas au vendredi) :
+
+- ``ewma`` : moyenne pondérée exponentiellement, la semaine la plus récente
+  pesant le plus (lissage exponentiel simple) ;
+- ``ma`` : moyenne mobile des N dernières semaines.
+
+Tous les produits sont calculés ensemble par opérations matricielles, sans
+boucle Python par produit. Les jours antérieurs à la création d'un produit
+sont ignorés (NaN) plutôt que comptés comme des ventes nulles.
+
+Stock conseillé = prévision + `safety` x écart-type des mêmes jours,
+arrondi à l'unité supérieure. La date cible est au plus `MAX_HORIZON_DAYS`
+jours après aujourd'hui : au-delà, aucune semaine d'historique ne précède
+la cible.
+"""
+import math
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import OrderItem, Product
+
+DEFAULT_WEEKS = 8
+MAX_WEEKS = 52
+DEFAULT_ALPHA = 0.3
+DEFAULT_SAFETY = 0.5
+MAX_HORIZON_DAYS = 7
+FORECAST_METHODS = ('ewma', 'ma')
+# Les commandes annulées ne reflètent pas une demande servie
+COUNTED_STATUSES = ('pending', 'paid', 'ready', 'delivered')
+
+
+def load_daily_sales(start, end):
+    """
+    Ventes de `start` à `end` (exclu) : (ids produits, matrice produits x jours).
+    Une seule requête ``GROUP BY produit, jour``.
+    """
+    tz = timezone.get_current_timezone()
+    since = timezone.make_aware(datetime.combine(start, time.min), tz)
+    until = timezone.make_aware(datetime.combine(end, time.min), tz)
+    rows = list(
+        OrderItem.objects
+        .filter(order__created_at__gte=since, order__created_at__lt=until,
+                order__status__in=COUNTED_STATUSES)
+        .annotate(day=TruncDate('order__created_at', tzinfo=tz))
+        .values_list('product_id', 'day')
+        .annotate(quantity=Sum('quantity'))
+        .order_by()
+    )
+    days = (end - start).days
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.zeros((0, days))
+
+    product_col, day_col, quantity_col = zip(*rows)
+    product_ids, product_index = np.unique(np.array(product_col, dtype=np.int64), return_inverse=True)
+    day_index = np.array([(day - start).days for day in day_col], dtype=np.int64)
+    sales = np.zeros((len(product_ids), days))
+    np.add.at(sales, (product_index, day_index), np.array(quantity_col, dtype=float))
+    return product_ids, sales
+
+
+def same_weekday_history(sales, start, target, weeks):
+    """Colonnes des `weeks` derniers jours de même jour de semaine que `target`, la plus récente en premier."""
+    offsets = [(target - timedelta(weeks=k) - start).days for k in range(1, weeks + 1)]
+    offsets = [offset for offset in offsets if 0 <= offset < sales.shape[1]]
+    return sales[:, offsets], offsets
+
+
+def forecast_matrix(history, method='ewma', alpha=DEFAULT_ALPHA):
+    """
+    Prévision et écart-type par ligne de `history` (produits x semaines, NaN
+    = pas encore au catalogue), colonnes de la plus récente à la plus ancienne.
+    """
+    weeks = history.shape[1]
+    if method == 'ewma':
+        weights = alpha * (1 - alpha) ** np.arange(weeks)
+    elif method == 'ma':
+        weights = np.ones(weeks)
+    else:
+        raise ValueError(f"Méthode inconnue : {method}")
+
+    known = ~np.isnan(history)
+    values = np.where(known, history, 0.0)
+    row_weights = known * weights
+    total = row_weights.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        forecast = np.where(total > 0, (values * row_weights).sum(axis=1) / total, 0.0)
+        variance = np.where(
+            total > 0,
+            (row_weights * (values - forecast[:, None]) ** 2).sum(axis=1) / total,
+            0.0,
+        )
+    return forecast, np.sqrt(variance)
+
+
+def suggest_stock(target=None, weeks=DEFAULT_WEEKS, method='ewma', alpha=DEFAULT_ALPHA,
+                  safety=DEFAULT_SAFETY):
+    """
+    Stock conseillé pour le matin de `target` (demain par défaut) pour chaque
+    produit disponible, du plus grand besoin de cuisson au plus petit.
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"Méthode inconnue : {method}")
+    if not 1 <= weeks <= MAX_WEEKS:
+        raise ValueError(f"weeks doit être compris entre 1 et {MAX_WEEKS}")
+    if not (math.isfinite(safety) and safety >= 0):
+        raise ValueError("safety doit être un nombre positif ou nul")
+    today = timezone.localdate()
+    target = target or today + timedelta(days=1)
+    if target > today + timedelta(days=MAX_HORIZON_DAYS):
+        raise ValueError(f"La date doit être au plus {MAX_HORIZON_DAYS} jours après aujourd'hui")
+    start = target - timedelta(weeks=weeks)
+    end = min(target, today + timedelta(days=1))
+
+    products = list(
+        Product.objects.filter(available=True).order_by('id').values_list('id', 'name', 'stock', 'created_at')
+    )
+    if not products:
+        return []
+    ids = np.array([row[0] for row in products], dtype=np.int64)
+
+    sold_ids, sold = load_daily_sales(start, end)
+    sales = np.zeros((len(ids), (target - start).days))
+    if len(sold_ids):
+        # Aligner les lignes vendues sur la liste des produits disponibles
+        position = np.searchsorted(ids, sold_ids)
+        position = np.clip(position, 0, len(ids) - 1)
+        matched = ids[position] == sold_ids
+        sales[position[matched], :sold.shape[1]] = sold[matched]
+
+    history, offsets = same_weekday_history(sales, start, target, weeks)
+    offsets = np.array(offsets, dtype=np.int64)
+    # Jours antérieurs à la création du produit, ou pas encore écoulés : inconnus, pas zéro
+    created = np.array([(timezone.localtime(row[3]).date() - start).days for row in products])
+    history[(offsets[None, :] < created[:, None]) | (offsets[None, :] >= (end - start).days)] = np.nan
+
+    forecast, spread = forecast_matrix(history, method=method, alpha=alpha)
+    suggested = np.ceil(forecast + safety * spread).astype(int)
+    stock = np.array([row[2] for row in products])
+    to_bake = np.maximum(suggested - stock, 0)
+
+    results = [
+        {
+            'product_id': int(ids[i]),
+            'product_name': products[i][1],
+            'stock': int(stock[i]),
+            'forecast': round(float(forecast[i]), 1),
+            'suggested_stock': int(suggested[i]),
+            'to_bake': int(to_bake[i]),
+        }
+        for i in np.lexsort((ids, -to_bake))
+    ]
+    return results
+
+
+def parse_target(value):
+    """Date cible ``AAAA-MM-JJ`` (None si absente). Lève ValueError si invalide."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError("date doit être au format AAAA-MM-JJ")
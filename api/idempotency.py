@@ -0,0 +1,126 @@
+"""
+Clés d'idempotence (en-tête ``Idempotency-Key``).
+
+Un client mobile qui renvoie une commande après une coupure réseau envoie
+la même clé : la première requête est exécutée et sa réponse enregistrée,
+les suivantes reçoivent la réponse enregistrée sans rien ré-exécuter
+(validation, réservation du stock, notifications).
+
+La clé est réservée par un INSERT avant d'exécuter la vue (contrainte
+d'unicité) : deux envois simultanés ne peuvent pas s'exécuter tous les deux,
+le second reçoit 409 tant que le premier n'a pas répondu. Une réservation
+restée sans réponse au-delà de IDEMPOTENCY_LEASE_SECONDS (processus tué en
+pleine requête) est reprise par l'envoi suivant. Les réponses 5xx
+ne sont pas enregistrées pour que le client puisse réessayer. Les clés
+expirent après IDEMPOTENCY_KEY_TTL_HOURS (index sur `expires_at`, purge par
+`manage.py purge_idempotency_keys`).
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .renderers import FastJSONRenderer
+
+IDEMPOTENCY_KEY_TTL_HOURS = getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24)
+# Au-delà du délai maximal d'une requête (timeout du worker) : la première
+# exécution est forcément terminée, ou morte
+IDEMPOTENCY_LEASE_SECONDS = getattr(settings, 'IDEMPOTENCY_LEASE_SECONDS', 120)
+MAX_KEY_LENGTH = 255
+
+
+def key_digest(user_id, method, path, key):
+    """Empreinte de taille fixe : une même clé n'a de sens que pour un utilisateur et une route."""
+    return hashlib.sha256(f'{user_id}:{method}:{path}:{key}'.encode()).hexdigest()
+
+
+def request_fingerprint(data):
+    canonical = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.md5(canonical.encode(), usedforsecurity=False).hexdigest()
+
+
+def claim(digest, fingerprint):
+    """Réserver la clé. Retourne (None, True) si elle est neuve, (enregistrement, False) sinon."""
+    now = timezone.now()
+    ttl = timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    # Réservée à expires_at - ttl : une réservation sans réponse plus vieille
+    # que le bail est abandonnée, comme une clé expirée
+    abandoned_before = now + ttl - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+    IdempotencyKey.objects.filter(key=digest).filter(
+        Q(expires_at__lt=now) | Q(status_code__isnull=True, expires_at__lt=abandoned_before)
+    ).delete()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(key=digest, request_hash=fingerprint, expires_at=now + ttl)
+        return None, True
+    except IntegrityError:
+        return IdempotencyKey.objects.filter(key=digest).first(), False
+
+
+def release(digest):
+    IdempotencyKey.objects.filter(key=digest, status_code__isnull=True).delete()
+
+
+def store(digest, response):
+    body = FastJSONRenderer().render(response.data) if response.data is not None else b''
+    IdempotencyKey.objects.filter(key=digest).update(status_code=response.status_code, response=body)
+
+
+def replay(record):
+    response = HttpResponse(bytes(record.response), status=record.status_code, content_type='application/json')
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """Décorer une méthode de viewset DRF (POST) pour honorer l'en-tête Idempotency-Key."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({'error': f"Idempotency-Key : {MAX_KEY_LENGTH} caractères au maximum"}, status=400)
+
+        digest = key_digest(request.user.pk, request.method, request.path, key)
+        fingerprint = request_fingerprint(request.data)
+        record, created = claim(digest, fingerprint)
+        if not created:
+            if record is None:
+                # Expirée et purgée entre-temps : le client peut réessayer
+                return Response({'error': "Requête en cours, réessayez"}, status=409)
+            if record.request_hash != fingerprint:
+                return Response({'error': "Idempotency-Key déjà utilisée pour une autre requête"}, status=422)
+            if record.status_code is None:
+                return Response({'error': "Une requête avec cette Idempotency-Key est en cours"}, status=409)
+            return replay(record)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except APIException as exc:
+            # Erreurs de validation : la réponse 4xx est enregistrée comme les autres
+            response = self.handle_exception(exc)
+        except Exception:
+            release(digest)
+            raise
+        if response.status_code >= 500:
+            release(digest)
+        else:
+            store(digest, response)
+        return response
+    return wrapper
+
+
+def purge_idempotency_keys():
+    """Supprimer les clés expirées."""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,215 @@
+"""
+Import en masse du catalogue produits (CSV, JSON ou NDJSON).
+
+Le fichier est validé ligne par ligne avec les règles de `ProductSerializer`
+puis appliqué par lots avec ``bulk_create(update_conflicts=True)`` : une
+ligne avec un ``id`` (ou dont le nom correspond, sans tenir compte de la
+casse, à un produit existant) met le produit à jour, sinon elle le crée. Tout l'import se fait dans une seule
+transaction et quelques requêtes par lot de `IMPORT_BATCH_SIZE` lignes.
+
+En mode simulation (`dry_run`), rien n'est écrit : le rapport liste les
+créations et, pour chaque mise à jour, les champs modifiés (ancien, nouveau).
+"""
+import csv
+import io
+import json
+
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .models import Product
+from .serializers import ProductSerializer
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_FIELDS = ['name', 'description', 'price', 'category', 'stock', 'available', 'image']
+
+
+class ImportFormatError(ValueError):
+    """Fichier illisible (format inconnu, JSON invalide...)."""
+
+
+def _text_stream(fileobj):
+    if isinstance(fileobj, io.TextIOBase):
+        return fileobj
+    return io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+
+
+def iter_records(fileobj, file_format):
+    """Itérer les lignes du fichier sous forme de dictionnaires."""
+    stream = _text_stream(fileobj)
+    if file_format == 'csv':
+        for record in csv.DictReader(stream):
+            yield {key.strip(): value for key, value in record.items() if key}
+    elif file_format == 'ndjson':
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise ImportFormatError(f"JSON invalide ligne {number} : {exc}")
+    elif file_format == 'json':
+        try:
+            data = json.load(stream)
+        except json.JSONDecodeError as exc:
+            raise ImportFormatError(f"JSON invalide : {exc}")
+        if not isinstance(data, list):
+            raise ImportFormatError("Le fichier JSON doit contenir une liste de produits")
+        yield from data
+    else:
+        raise ImportFormatError(f"Format inconnu : {file_format}")
+
+
+def guess_format(filename):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.json'):
+        return 'json'
+    return 'csv'
+
+
+def _clean_record(record):
+    # Les cellules CSV vides valent "non renseigné"
+    return {key: value for key, value in record.items() if value not in ('', None) or key == 'image'}
+
+
+def _name_key(name):
+    # Même clé que Lower('name') en base : "Tarte Citron" et "tarte citron" sont un seul produit
+    return name.strip().lower()
+
+
+class ProductImport:
+    """Validation en flux puis upsert par lots d'un fichier de produits."""
+
+    def __init__(self, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.errors = []
+        self.diff = []
+        self._seen_names = set()
+
+    def report(self):
+        report = {
+            'dry_run': self.dry_run,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'errors': self.errors,
+        }
+        if self.dry_run:
+            report['diff'] = self.diff
+        return report
+
+    def run(self, records):
+        """Valider et appliquer `records`. Rien n'est écrit s'il y a la moindre erreur."""
+        with transaction.atomic():
+            batch = []
+            for line, record in enumerate(records, start=1):
+                row = self._validate(line, record)
+                if row is not None:
+                    batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._apply(batch)
+                    batch = []
+            if batch:
+                self._apply(batch)
+            if self.errors or self.dry_run:
+                transaction.set_rollback(True)
+            else:
+                # bulk_create n'envoie pas post_save
+                bump_catalog_version()
+        if self.errors:
+            self.created = self.updated = self.unchanged = 0
+        return self.report()
+
+    def _validate(self, line, record):
+        if not isinstance(record, dict):
+            self.errors.append({'line': line, 'errors': "Ligne invalide"})
+            return None
+        record = _clean_record(record)
+        serializer = ProductSerializer(data=record)
+        if not serializer.is_valid():
+            self.errors.append({'line': line, 'errors': serializer.errors})
+            return None
+        data = serializer.validated_data
+        name_key = _name_key(data['name'])
+        if name_key in self._seen_names:
+            self.errors.append({'line': line, 'errors': {'name': ["Produit en double dans le fichier"]}})
+            return None
+        self._seen_names.add(name_key)
+
+        pk = record.get('id')
+        if pk not in (None, ''):
+            try:
+                pk = int(pk)
+            except (TypeError, ValueError):
+                self.errors.append({'line': line, 'errors': {'id': ["Identifiant invalide"]}})
+                return None
+        else:
+            pk = None
+        return line, pk, data
+
+    def _apply(self, batch):
+        # Résoudre les noms sans id en une requête (sans casse, comme les doublons du
+        # fichier), puis charger l'état actuel en une autre
+        names = {_name_key(data['name']) for _, pk, data in batch if pk is None}
+        by_name = {}
+        if names:
+            matches = (
+                Product.objects.annotate(name_key=Lower('name'))
+                .filter(name_key__in=names).order_by('pk').values_list('id', 'name_key')
+            )
+            for pk, name_key in matches:
+                by_name.setdefault(name_key, pk)
+        ids = {pk for _, pk, _ in batch if pk is not None} | set(by_name.values())
+        current = {row['id']: row for row in Product.objects.filter(pk__in=ids).values('id', *IMPORT_FIELDS)}
+
+        now = timezone.now()
+        # Une ligne ne met à jour que les colonnes qu'elle fournit : on regroupe par jeu de colonnes
+        groups = {}
+        for line, pk, data in batch:
+            if pk is None:
+                pk = by_name.get(_name_key(data['name']))
+            elif pk not in current:
+                self.errors.append({'line': line, 'errors': {'id': [f"Produit {pk} introuvable"]}})
+                continue
+
+            if pk is None:
+                self.created += 1
+                if self.dry_run:
+                    self.diff.append({'line': line, 'action': 'create', 'name': data['name']})
+            else:
+                old = current[pk]
+                changes = {
+                    field: [old[field], data[field]]
+                    for field in IMPORT_FIELDS
+                    if field in data and old[field] != data[field]
+                }
+                if not changes:
+                    self.unchanged += 1
+                    continue
+                self.updated += 1
+                if self.dry_run:
+                    self.diff.append({'line': line, 'action': 'update', 'id': pk, 'name': data['name'], 'changes': changes})
+            fields = tuple(field for field in IMPORT_FIELDS if field in data)
+            groups.setdefault(fields, []).append(Product(pk=pk, created_at=now, updated_at=now, **data))
+
+        if self.dry_run or self.errors:
+            return
+        for fields, objs in groups.items():
+            Product.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=[*fields, 'updated_at'],
+            )
+
+
+def import_products(fileobj, file_format='csv', dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """Importer un fichier de produits et retourner le rapport."""
+    return ProductImport(dry_run=dry_run, batch_size=batch_size).run(iter_records(fileobj, file_format))
@@ -0,0 +1,109 @@
+"""
+Boîte de réception des messages de contact.
+
+Chaque action du staff est un seul ``UPDATE ... WHERE`` conditionnel : la
+condition porte l'état attendu (``status = 'new'`` pour « marquer comme lu »),
+si bien que deux membres du staff qui agissent en même temps ne se marchent
+pas dessus et que le nombre de lignes modifiées dit si l'action a eu lieu,
+sans relire le message. `updated_at` est posé explicitement (``update()``
+ignore `auto_now`) pour que les ETag de la liste changent.
+
+Le nombre de messages non lus, affiché en permanence dans l'interface du
+staff, est mis en cache (`UNREAD_COUNT_KEY`). Il est recalculé sur l'index
+partiel des messages ``new`` quand la clé manque, et la clé est retirée
+après le commit de toute écriture qui peut le changer.
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ContactMessage, Notification
+
+UNREAD_COUNT_KEY = 'contact:unread_count'
+UNREAD_COUNT_TIMEOUT = 60 * 60
+UNREAD_LIMIT = 50
+# Un message fermé n'attend plus de réponse
+REPLYABLE_STATUSES = ('new', 'read', 'replied')
+
+
+def unread_count():
+    """Nombre de messages non lus (tous clients confondus), depuis le cache."""
+    count = cache.get(UNREAD_COUNT_KEY)
+    if count is None:
+        count = ContactMessage.objects.filter(status='new').count()
+        cache.set(UNREAD_COUNT_KEY, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def unread_changed():
+    """Invalider le compteur, après le commit pour ne pas remettre en cache un état en cours d'écriture."""
+    transaction.on_commit(lambda: cache.delete(UNREAD_COUNT_KEY))
+
+
+def unread_messages(limit=UNREAD_LIMIT):
+    """Messages non lus, du plus ancien au plus récent (ordre de traitement), sur l'index partiel."""
+    return ContactMessage.objects.filter(status='new').order_by('created_at')[:limit]
+
+
+def mark_as_read(message_id):
+    """Passer un message nouveau à « lu ». Retourne False s'il n'était pas (ou plus) nouveau."""
+    updated = (
+        ContactMessage.objects
+        .filter(pk=message_id, status='new')
+        .update(status='read', updated_at=timezone.now())
+    )
+    if updated:
+        unread_changed()
+    return bool(updated)
+
+
+def mark_as_replied(message_id):
+    """Passer un message nouveau ou lu à « répondu » (réponse donnée hors de l'application)."""
+    updated = (
+        ContactMessage.objects
+        .filter(pk=message_id, status__in=('new', 'read'))
+        .update(status='replied', updated_at=timezone.now())
+    )
+    if updated:
+        unread_changed()
+    return bool(updated)
+
+
+def reply(message_id, staff_user, reponse):
+    """
+    Enregistrer (ou remplacer) la réponse du staff et prévenir le client.
+    Retourne False si le message n'existe pas ou est fermé.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        updated = (
+            ContactMessage.objects
+            .filter(pk=message_id, status__in=REPLYABLE_STATUSES)
+            .update(status='replied', admin_reponse=reponse, repondu_le=now,
+                    repondu_par=staff_user, updated_at=now)
+        )
+        if not updated:
+            return False
+        unread_changed()
+        owner_id, subject = ContactMessage.objects.values_list('user_id', 'subject').get(pk=message_id)
+        Notification.objects.create(
+            user_id=owner_id, type='reponse_message',
+            message=f"Nous avons répondu à votre message « {subject} »",
+            lien=f'/client/?message={message_id}',
+        )
+    return True
+
+
+def message_received(message):
+    """Nouveau message d'un client : compteur à recalculer et notification du staff."""
+    unread_changed()
+    staff = User.objects.filter(is_staff=True, is_active=True).values_list('pk', flat=True)
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id, type='nouveau_message',
+            message=f"Nouveau message de {message.name} : {message.subject}",
+            lien=f'/management/?message={message.pk}',
+        )
+        for user_id in staff
+    ])
@@ -0,0 +1,135 @@
+"""
+File de production de la cuisine (« quoi enfourner maintenant »).
+
+Les articles des commandes en attente ou payées sont regroupés par produit
+en une requête GROUP BY : quantité totale, nombre de commandes et retrait
+le plus proche (`pickup_at`, à défaut la date de commande), triés par
+retrait.
+
+Mises à jour incrémentales : quand une commande entre dans la file ou en
+sort, seules les lignes des produits concernés sont recalculées (la même
+requête, filtrée sur ces produits) et publiées dans un journal
+d'évènements en cache, numéroté par `kitchen:version`. Les écrans de
+cuisine abonnés au flux SSE lisent ce journal et fusionnent les lignes
+reçues par ``product_id`` ; ils ne rechargent la file complète qu'à la
+connexion, si le journal a expiré ou si leur numéro est inconnu (cache
+vidé).
+
+Les numéros sont attribués par la ligne `KitchenState`, verrouillée par
+l'``UPDATE`` jusqu'à la fin de la publication : deux publications
+simultanées ne reçoivent jamais le même numéro (``cache.incr`` n'est pas
+atomique sur le cache en base) et le numéro en cache ne recule pas.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import Coalesce
+
+from .models import KitchenState, OrderItem
+
+ACTIVE_STATUSES = ('pending', 'paid')
+KITCHEN_VERSION_KEY = 'kitchen:version'
+EVENT_TIMEOUT = 10 * 60
+
+
+def _grouped(items):
+    rows = (
+        items
+        .filter(order__status__in=ACTIVE_STATUSES)
+        .values('product_id', 'product__name', 'product__category')
+        .annotate(
+            quantity=Sum('quantity'),
+            orders=Count('order_id', distinct=True),
+            next_pickup=Min(Coalesce('order__pickup_at', 'order__created_at')),
+        )
+        .order_by('next_pickup', 'product_id')
+    )
+    return [
+        {
+            'product_id': row['product_id'],
+            'product_name': row['product__name'],
+            'category': row['product__category'],
+            'quantity': row['quantity'],
+            'orders': row['orders'],
+            'next_pickup': row['next_pickup'],
+        }
+        for row in rows
+    ]
+
+
+def production_queue():
+    """La file complète, en une requête groupée."""
+    return _grouped(OrderItem.objects.all())
+
+
+def queue_rows(product_ids):
+    """
+    Lignes à jour pour `product_ids` seulement ; un produit sorti de la file
+    est renvoyé avec une quantité nulle pour que l'écran le retire.
+    """
+    rows = _grouped(OrderItem.objects.filter(product_id__in=product_ids))
+    present = {row['product_id'] for row in rows}
+    rows.extend(
+        {'product_id': pk, 'quantity': 0, 'orders': 0, 'next_pickup': None}
+        for pk in sorted(set(product_ids) - present)
+    )
+    return rows
+
+
+def kitchen_version():
+    """Dernier numéro publié : le cache, ou la base si le cache l'a perdu."""
+    version = cache.get(KITCHEN_VERSION_KEY)
+    if version is None:
+        version = KitchenState.objects.values_list('version', flat=True).filter(pk=1).first() or 0
+        cache.add(KITCHEN_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def _next_version():
+    """Numéro suivant ; la ligne reste verrouillée jusqu'à la fin de la transaction."""
+    if not KitchenState.objects.filter(pk=1).update(version=F('version') + 1):
+        KitchenState.objects.get_or_create(pk=1)
+        KitchenState.objects.filter(pk=1).update(version=F('version') + 1)
+    return KitchenState.objects.values_list('version', flat=True).get(pk=1)
+
+
+def products_of_orders(order_ids):
+    return set(
+        OrderItem.objects.filter(order_id__in=order_ids).values_list('product_id', flat=True).distinct()
+    )
+
+
+def publish(product_ids):
+    """
+    Après le commit, recalculer les lignes de `product_ids` et les ajouter au
+    journal sous un nouveau numéro de version.
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return
+
+    def push():
+        with transaction.atomic():
+            version = _next_version()
+            # Lignes lues sous le verrou : un numéro plus grand porte un état plus récent
+            cache.set(f'kitchen:event:{version}', queue_rows(product_ids), EVENT_TIMEOUT)
+            cache.set(KITCHEN_VERSION_KEY, version, timeout=None)
+    transaction.on_commit(push)
+
+
+def events_since(version, current):
+    """
+    Lignes publiées entre `version` (exclue) et `current` (incluse), dans
+    l'ordre. Retourne None si une partie du journal a expiré ou si `version`
+    est postérieure à `current` (numéro d'avant un vidage du cache) : le
+    client doit alors recharger la file complète.
+    """
+    if version > current:
+        return None
+    if version == current:
+        return []
+    keys = [f'kitchen:event:{v}' for v in range(version + 1, current + 1)]
+    found = cache.get_many(keys)
+    if len(found) != len(keys):
+        return None
+    return [row for key in keys for row in found[key]]
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.deletion import ARCHIVE_CHUNK_SIZE, ORDER_ARCHIVE_AFTER_DAYS, archive_old_orders
+
+
+class Command(BaseCommand):
+    help = "Déplacer les commandes livrées ou annulées anciennes vers l'archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ORDER_ARCHIVE_AFTER_DAYS,
+                            help="Ancienneté minimale en jours (ORDER_ARCHIVE_AFTER_DAYS par défaut)")
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans rien déplacer")
+
+    def handle(self, *args, **options):
+        counts = archive_old_orders(options['days'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        verb = "à archiver" if options['dry_run'] else "archivée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['archived_orders']} commande(s) {verb} ({counts['archived_order_items']} article(s))"
+        ))
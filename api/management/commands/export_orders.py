@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_orders
+from api.models import Order
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise CommandError(f"Date invalide : {value} (AAAA-MM-JJ)")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Exporter les commandes et leurs articles en CSV ou NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--from', dest='date_from', type=_date, help="Date de début incluse (AAAA-MM-JJ)")
+        parser.add_argument('--to', dest='date_to', type=_date, help="Date de fin incluse (AAAA-MM-JJ)")
+        parser.add_argument('--status', choices=[code for code, _ in Order.STATUS_CHOICES])
+        parser.add_argument('--output', '-o', help="Fichier de sortie (stdout par défaut)")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunks = export_orders(
+            options['export_format'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+            status=options['status'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.forecasting import (
+    DEFAULT_SAFETY, DEFAULT_WEEKS, FORECAST_METHODS, suggest_stock,
+)
+
+
+def _date(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise CommandError(f"Date invalide : {value} (AAAA-MM-JJ)")
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Afficher le stock conseillé du matin par produit (prévision par jour de semaine)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=_date, help="Jour à préparer (demain par défaut, AAAA-MM-JJ)")
+        parser.add_argument('--weeks', type=int, default=DEFAULT_WEEKS, help="Semaines d'historique")
+        parser.add_argument('--method', choices=FORECAST_METHODS, default='ewma')
+        parser.add_argument('--safety', type=float, default=DEFAULT_SAFETY,
+                            help="Marge en écarts-types ajoutée à la prévision")
+        parser.add_argument('--json', action='store_true', help="Sortie JSON")
+
+    def handle(self, *args, **options):
+        try:
+            results = suggest_stock(options['date'], weeks=options['weeks'],
+                                    method=options['method'], safety=options['safety'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(f"{'Produit':<30} {'Stock':>6} {'Prévu':>7} {'Conseillé':>9} {'À cuire':>8}")
+        for row in results:
+            self.stdout.write(
+                f"{row['product_name'][:30]:<30} {row['stock']:>6} {row['forecast']:>7.1f}"
+                f" {row['suggested_stock']:>9} {row['to_bake']:>8}"
+            )
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.imports import IMPORT_BATCH_SIZE, ImportFormatError, guess_format, import_products
+
+
+class Command(BaseCommand):
+    help = "Importer des produits depuis un fichier CSV, JSON ou NDJSON (création ou mise à jour)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer")
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'json', 'ndjson'],
+                            help="Format du fichier (déduit de l'extension par défaut)")
+        parser.add_argument('--dry-run', action='store_true', help="Afficher les changements sans rien écrire")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or guess_format(options['path'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as f:
+                report = import_products(f, file_format, dry_run=options['dry_run'],
+                                         batch_size=options['batch_size'])
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+
+        if options['dry_run']:
+            for change in report['diff']:
+                self.stdout.write(json.dumps(change, cls=DjangoJSONEncoder, ensure_ascii=False))
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error, cls=DjangoJSONEncoder, ensure_ascii=False))
+
+        summary = f"{report['created']} créé(s), {report['updated']} mis à jour, {report['unchanged']} inchangé(s)"
+        if report['errors']:
+            raise CommandError(f"{len(report['errors'])} erreur(s), aucun produit importé")
+        prefix = "[simulation] " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(prefix + summary))
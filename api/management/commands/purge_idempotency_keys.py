@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = "Supprimer les clés d'idempotence expirées (IDEMPOTENCY_KEY_TTL_HOURS)"
+
+    def handle(self, *args, **options):
+        deleted = purge_idempotency_keys()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} clé(s) d'idempotence expirée(s) supprimée(s)"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.partitions import DELETE_CHUNK_SIZE, NOTIFICATION_RETENTION_DAYS, purge_notifications
+
+
+class Command(BaseCommand):
+    help = ("Supprimer les notifications lues anciennes (partitions détachées sur PostgreSQL) "
+            "et créer les partitions des prochains mois")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=NOTIFICATION_RETENTION_DAYS,
+                            help="Ancienneté minimale en jours (NOTIFICATION_RETENTION_DAYS par défaut)")
+        parser.add_argument('--chunk-size', type=int, default=DELETE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        report = purge_notifications(options['days'], chunk_size=options['chunk_size'])
+        for name in report['dropped_partitions']:
+            self.stdout.write(f"Partition {name} détachée et supprimée")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['dropped'] + report['deleted']} notification(s) lue(s) de plus de {options['days']} jours supprimée(s)"
+        ))
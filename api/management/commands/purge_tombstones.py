@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.sync import TOMBSTONE_RETENTION_DAYS, purge_tombstones
+
+
+class Command(BaseCommand):
+    help = "Supprimer les traces de suppression plus anciennes que TOMBSTONE_RETENTION_DAYS"
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} trace(s) de plus de {TOMBSTONE_RETENTION_DAYS} jours supprimée(s)"
+        ))
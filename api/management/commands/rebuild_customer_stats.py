@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.customer_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recalculer les compteurs de commandes des clients depuis les commandes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('users', nargs='*', type=int, help="Identifiants d'utilisateurs (tous par défaut)")
+
+    def handle(self, *args, **options):
+        count = rebuild(options['users'] or None)
+        self.stdout.write(self.style.SUCCESS(f"{count} client(s) recalculé(s)"))
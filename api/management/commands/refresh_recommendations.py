@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = "Mettre à jour les recommandations « souvent achetés ensemble » avec les nouvelles commandes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Tout recalculer depuis la première commande")
+
+    def handle(self, *args, **options):
+        report = refresh_recommendations(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['orders']} commande(s) ajoutée(s), recommandations de {report['products']} produit(s) réécrites"
+        ))
@@ -0,0 +1,174 @@
+"""
+Authentification avec cache utilisateur par processus.
+
+`django.contrib.auth.middleware.AuthenticationMiddleware` relit l'utilisateur
+(``SELECT ... FROM auth_user``) à chaque requête, y compris pour les
+sondages de notifications toutes les 30 secondes. Ce middleware garde les
+utilisateurs quelques dizaines de secondes en mémoire ; la validité de la
+session (empreinte du mot de passe) est toujours vérifiée.
+
+Chaque worker a sa propre copie : une modification d'un utilisateur
+(``is_active``, ``is_staff``, mot de passe... via les signaux de
+`api.signals` ou `invalidate_cached_user`) change son tampon de version dans
+le cache partagé (`USER_VERSION_KEY`), relu à chaque requête ; un worker
+dont la copie porte un autre tampon relit l'utilisateur en base. Le contrôle
+coûte une lecture du cache partagé par requête : avec Redis, aucune requête
+SQL d'authentification ; avec ``CACHE_URL=db`` (et les sessions
+``cached_db``, stockées dans le même cache), ces lectures sont des requêtes
+sur la table du cache, plus légères que la jointure session + utilisateur
+mais pas nulles.
+
+Les middlewares de ce module sont utilisables en ASGI sans passer par un
+thread à chaque requête (`__acall__`), comme `api.compression`.
+"""
+import copy
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+USER_CACHE_TTL = getattr(settings, 'USER_CACHE_TTL', 30)
+USER_VERSION_KEY = 'auth:user_version:{}'
+
+_lock = threading.Lock()
+_users = {}
+
+
+def _bump_version(user_id):
+    # Valeur neuve plutôt qu'un incr (non atomique sur DatabaseCache) : il suffit qu'elle diffère
+    cache.set(USER_VERSION_KEY.format(user_id), uuid.uuid4().hex, None)
+
+
+def _current_version(user_id):
+    """Tampon partagé de l'utilisateur, créé s'il manque (jamais None)."""
+    key = USER_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _forget(user_id):
+    with _lock:
+        _users.pop(user_id, None)
+
+
+def invalidate_cached_user(user_id):
+    """Retirer l'utilisateur du cache de tous les workers."""
+    _forget(str(user_id))
+    _bump_version(user_id)
+    # Une seconde fois après le commit : un worker qui a relu l'ancienne ligne
+    # pendant la transaction ne la garde pas
+    transaction.on_commit(lambda: _bump_version(user_id))
+
+
+def clear_user_cache():
+    with _lock:
+        _users.clear()
+
+
+def _cached(user_id):
+    with _lock:
+        entry = _users.get(user_id)
+        if entry is None:
+            return None
+        user, version, expires_at = entry
+        if expires_at < time.monotonic():
+            del _users[user_id]
+            return None
+    if version != cache.get(USER_VERSION_KEY.format(user_id)):
+        # Modifié dans un autre worker (ou tampon évincé du cache partagé)
+        _forget(user_id)
+        return None
+    return user
+
+
+def _remember(user, version):
+    with _lock:
+        _users[str(user.pk)] = (user, version, time.monotonic() + USER_CACHE_TTL)
+
+
+def get_user(request):
+    """Équivalent de `django.contrib.auth.get_user` avec cache mémoire."""
+    session = request.session
+    user_id = session.get(SESSION_KEY)
+    backend_path = session.get(BACKEND_SESSION_KEY)
+    if user_id is None or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    user = _cached(str(user_id))
+    if user is None:
+        # Tampon lu avant l'utilisateur : une modification entre les deux sera vue au prochain appel
+        version = _current_version(user_id)
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            _remember(user, version)
+            user = copy.copy(user)
+        return user
+
+    # Même contrôle que get_user : la session est invalidée si le mot de passe change
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not session_hash or not constant_time_compare(session_hash, user.get_session_auth_hash()):
+        _forget(str(user_id))
+        return auth.get_user(request)
+    # Copie pour qu'une vue qui modifie request.user n'altère pas le cache partagé
+    return copy.copy(user)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+        async def auser():
+            # Vues async : même cache, lecture de session exécutée hors de la boucle
+            return await sync_to_async(get_user)(request)
+
+        request.auser = auser
+
+    async def __acall__(self, request):
+        # process_request ne fait aucune E/S (objets paresseux) : pas de thread
+        self.process_request(request)
+        return await self.get_response(request)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise utilisable en ASGI : le middleware d'origine n'est que
+    synchrone, ce qui ferait passer toute la chaîne (et les vues async) par
+    un thread. Les fichiers statiques sont servis depuis un thread, les
+    autres requêtes continuent sur la boucle d'évènements.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -1,55 +1,50 @@
 # Generated migration for converting prices from EUR to FCFA
 
+from decimal import Decimal
+
 from django.db import migrations
 
+from ._frozen_data_migrations import scale_models
+
+EUR_TO_FCFA = Decimal('655')
+
+# Les montants de commande s'appelaient `total_price` à l'origine puis
+# `total_amount` : les champs absents du modèle historique sont ignorés.
+PRICE_FIELDS = [
+    ('Product', ['price']),
+    ('Order', ['total_price', 'total_amount']),
+    ('OrderItem', ['unit_price', 'total_price']),
+]
+
+
 def convert_prices_to_fcfa(apps, schema_editor):
     """
     Convert all prices from EUR to FCFA (multiply by 655)
     """
-    Product = apps.get_model('api', 'Product')
-    Order = apps.get_model('api', 'Order')
-    OrderItem = apps.get_model('api', 'OrderItem')
-    
-    # Convert product prices
-    for product in Product.objects.all():
-        product.price = product.price * 655
-        product.save()
-    
-    # Convert order total prices
-    for order in Order.objects.all():
-        order.total_price = order.total_price * 655
-        order.save()
-    
-    # Convert order item prices
-    for item in OrderItem.objects.all():
-        item.unit_price = item.unit_price * 655
-        item.save()
+    scale_models(
+        apps, schema_editor, PRICE_FIELDS, EUR_TO_FCFA,
+        prefix='0006_convert_prices_to_fcfa',
+        opposite_prefix='0006_convert_prices_to_eur',
+    )
+
 
 def convert_prices_to_eur(apps, schema_editor):
     """
     Reverse migration: convert FCFA back to EUR (divide by 655)
     """
-    Product = apps.get_model('api', 'Product')
-    Order = apps.get_model('api', 'Order')
-    OrderItem = apps.get_model('api', 'OrderItem')
-    
-    # Convert product prices back
-    for product in Product.objects.all():
-        product.price = product.price / 655
-        product.save()
-    
-    # Convert order total prices back
-    for order in Order.objects.all():
-        order.total_price = order.total_price / 655
-        order.save()
-    
-    # Convert order item prices back
-    for item in OrderItem.objects.all():
-        item.unit_price = item.unit_price / 655
-        item.save()
+    scale_models(
+        apps, schema_editor, PRICE_FIELDS, EUR_TO_FCFA,
+        divide=True,
+        prefix='0006_convert_prices_to_eur',
+        opposite_prefix='0006_convert_prices_to_fcfa',
+    )
+
 
 class Migration(migrations.Migration):
 
+    # Chaque tranche est validée séparément pour pouvoir reprendre la conversion
+    atomic = False
+
     dependencies = [
         ('api', '0005_alter_product_image_alter_product_price'),
     ]
@@ -0,0 +1,74 @@
+# Recherche plein texte : colonne tsvector maintenue par trigger + index GIN
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'french_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION french_unaccent (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION french_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION api_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('french_unaccent', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('french_unaccent', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER api_product_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, description ON api_product
+        FOR EACH ROW EXECUTE FUNCTION api_product_search_vector_update()
+    """,
+    """
+    UPDATE api_product SET search_vector =
+        setweight(to_tsvector('french_unaccent', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('french_unaccent', coalesce(description, '')), 'B')
+    """,
+    "CREATE INDEX api_product_search_vector_gin ON api_product USING gin (search_vector)",
+    "CREATE INDEX api_product_name_trgm ON api_product USING gin (name gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS api_product_name_trgm",
+    "DROP INDEX IF EXISTS api_product_search_vector_gin",
+    "DROP TRIGGER IF EXISTS api_product_search_vector_trigger ON api_product",
+    "DROP FUNCTION IF EXISTS api_product_search_vector_update()",
+]
+
+
+def _run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_notification_contactmessage_reply'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_run_on_postgresql(POSTGRES_FORWARD), _run_on_postgresql(POSTGRES_BACKWARD)),
+    ]
@@ -0,0 +1,37 @@
+# Synchronisation incrémentale : index sur updated_at et table des suppressions
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='api_product_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='api_order_updated_idx'),
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('product', 'Produit'), ('order', 'Commande')], max_length=20, verbose_name='Modèle')),
+                ('object_id', models.BigIntegerField(verbose_name='Identifiant supprimé')),
+                ('owner_id', models.BigIntegerField(blank=True, null=True, verbose_name='Propriétaire')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Supprimé le')),
+            ],
+            options={
+                'verbose_name': 'Suppression',
+                'verbose_name_plural': 'Suppressions',
+                'ordering': ['-deleted_at'],
+                'indexes': [models.Index(fields=['model', 'deleted_at'], name='api_tombstone_model_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Montants en FCFA stockés en entiers (le franc CFA n'a pas de subdivision)
+#
+# Le total de commande prend au passage le nom utilisé par le modèle
+# (total_amount) et chaque ligne de commande reçoit son total
+# (OrderItem.total_price = quantité x prix unitaire).
+
+from django.db import migrations
+from django.db.models import F
+
+import api.fields
+
+from ._frozen_data_migrations import clear_checkpoint, round_fields, update_in_chunks
+
+# Mêmes colonnes que 0006 : les champs absents du modèle historique sont ignorés.
+MONEY_FIELDS = [
+    ('Product', ['price']),
+    ('Order', ['total_price', 'total_amount', 'refund_amount']),
+    ('OrderItem', ['unit_price', 'total_price']),
+]
+
+ITEM_TOTALS_CHECKPOINT = '0011_money_integer_fcfa:OrderItem.total_price'
+
+
+def round_to_franc(apps, schema_editor):
+    """
+    Arrondir les montants au franc avant le changement de type, par tranches
+    (le ``ALTER COLUMN ... TYPE bigint`` ne fait alors que convertir des
+    valeurs entières).
+    """
+    using = schema_editor.connection.alias
+    for model_name, field_names in MONEY_FIELDS:
+        round_fields(
+            apps.get_model('api', model_name), field_names,
+            using=using,
+            checkpoint=f'0011_money_integer_fcfa:{model_name}',
+        )
+    # L'arrondi est idempotent : une nouvelle application repart de zéro
+    for model_name, _ in MONEY_FIELDS:
+        clear_checkpoint(schema_editor.connection, f'0011_money_integer_fcfa:{model_name}')
+
+
+def fill_item_totals(apps, schema_editor):
+    """Total de ligne = quantité x prix unitaire, en francs entiers, par tranches."""
+    update_in_chunks(
+        apps.get_model('api', 'OrderItem'), {'total_price': F('quantity') * F('unit_price')},
+        using=schema_editor.connection.alias, checkpoint=ITEM_TOTALS_CHECKPOINT,
+    )
+    clear_checkpoint(schema_editor.connection, ITEM_TOTALS_CHECKPOINT)
+
+
+class Migration(migrations.Migration):
+
+    # Chaque tranche d'arrondi est validée séparément, comme en 0006
+    atomic = False
+
+    dependencies = [
+        ('api', '0010_sync_indexes_tombstone'),
+    ]
+
+    operations = [
+        migrations.RunPython(round_to_franc, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='price',
+            field=api.fields.MoneyField(verbose_name='Prix (FCFA)'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_price',
+            field=api.fields.MoneyField(default=0, verbose_name='Montant total (FCFA)'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='refund_amount',
+            field=api.fields.MoneyField(default=0, verbose_name='Montant remboursé (FCFA)'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='unit_price',
+            field=api.fields.MoneyField(verbose_name='Prix unitaire (FCFA)'),
+        ),
+        # Même colonne bigint, sous le nom utilisé par le modèle
+        migrations.RenameField(
+            model_name='order',
+            old_name='total_price',
+            new_name='total_amount',
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_amount',
+            field=api.fields.MoneyField(verbose_name='Montant total (FCFA)'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='total_price',
+            field=api.fields.MoneyField(default=0, verbose_name='Prix total (FCFA)'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_item_totals, migrations.RunPython.noop),
+    ]
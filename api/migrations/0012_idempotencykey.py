@@ -0,0 +1,29 @@
+# Clés d'idempotence (en-tête Idempotency-Key)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_money_integer_fcfa'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Clé')),
+                ('request_hash', models.CharField(max_length=32, verbose_name='Empreinte de la requête')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Statut HTTP')),
+                ('response', models.BinaryField(blank=True, null=True, verbose_name='Réponse')),
+                ('expires_at', models.DateTimeField(verbose_name='Expire le')),
+            ],
+            options={
+                'verbose_name': "Clé d'idempotence",
+                'verbose_name_plural': "Clés d'idempotence",
+                'indexes': [models.Index(fields=['expires_at'], name='api_idempotency_expires_idx')],
+            },
+        ),
+    ]
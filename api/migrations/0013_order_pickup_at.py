@@ -0,0 +1,22 @@
+# Heure de retrait des commandes (file de production de la cuisine)
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='pickup_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Retrait prévu le'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'pickup_at'], name='api_order_status_pickup_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Recommandations « souvent achetés ensemble »
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_order_pickup_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Rang')),
+                ('score', models.FloatField(verbose_name='Score')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Calculé le')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='api.product', verbose_name='Produit')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.product', verbose_name='Produit recommandé')),
+            ],
+            options={
+                'verbose_name': 'Recommandation',
+                'verbose_name_plural': 'Recommandations',
+                'ordering': ['product', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('product', 'rank'), name='api_recommendation_rank_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CooccurrenceMatrix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField(verbose_name='Matrice')),
+                ('last_order_id', models.BigIntegerField(default=0, verbose_name='Dernière commande')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Matrice de co-occurrence',
+                'verbose_name_plural': 'Matrices de co-occurrence',
+            },
+        ),
+    ]
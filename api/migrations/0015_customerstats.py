@@ -0,0 +1,70 @@
+# Compteurs de commandes par client (liste des utilisateurs)
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Q, Sum
+
+import api.fields
+
+
+def fill_customer_stats(apps, schema_editor):
+    """Une ligne par utilisateur, calculée en une requête groupée sur les commandes."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Order = apps.get_model('api', 'Order')
+    CustomerStats = apps.get_model('api', 'CustomerStats')
+    db = schema_editor.connection.alias
+
+    counted = ~Q(status='cancelled')
+    totals = {
+        row['user_id']: row
+        for row in Order.objects.using(db).values('user_id').annotate(
+            order_count=Count('pk', filter=counted),
+            total_spent=Sum(F('total_amount') - F('refund_amount'), filter=counted),
+            last_order_at=Max('created_at'),
+        ).order_by()
+    }
+    empty = {'order_count': 0, 'total_spent': 0, 'last_order_at': None}
+    CustomerStats.objects.using(db).bulk_create(
+        [
+            CustomerStats(
+                user_id=pk,
+                order_count=totals.get(pk, empty)['order_count'],
+                total_spent=totals.get(pk, empty)['total_spent'] or 0,
+                last_order_at=totals.get(pk, empty)['last_order_at'],
+            )
+            for pk in User.objects.using(db).values_list('pk', flat=True).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_recommendations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de commandes')),
+                ('total_spent', api.fields.MoneyField(default=0, verbose_name='Dépenses totales (FCFA)')),
+                ('last_order_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière commande le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Statistiques client',
+                'verbose_name_plural': 'Statistiques clients',
+                'indexes': [
+                    models.Index(fields=['order_count', 'user'], name='api_custstats_orders_idx'),
+                    models.Index(fields=['total_spent', 'user'], name='api_custstats_spent_idx'),
+                    models.Index(fields=['last_order_at', 'user'], name='api_custstats_last_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(fill_customer_stats, migrations.RunPython.noop),
+    ]
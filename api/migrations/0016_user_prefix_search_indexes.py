@@ -0,0 +1,47 @@
+# Annuaire des utilisateurs : index pour la recherche par début de nom / d'email
+#
+# `istartswith` produit ``UPPER(col::text) LIKE UPPER('abc%')`` sur PostgreSQL :
+# l'index doit porter sur la même expression, avec text_pattern_ops pour que
+# LIKE puisse l'utiliser quelle que soit la collation. SQLite compare sans
+# casse avec la collation NOCASE.
+
+from django.db import migrations
+
+FORWARD = {
+    'postgresql': [
+        "CREATE INDEX IF NOT EXISTS api_user_username_prefix_idx ON auth_user (UPPER(username::text) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS api_user_email_prefix_idx ON auth_user (UPPER(email::text) text_pattern_ops)",
+    ],
+    'sqlite': [
+        "CREATE INDEX IF NOT EXISTS api_user_username_prefix_idx ON auth_user (username COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS api_user_email_prefix_idx ON auth_user (email COLLATE NOCASE)",
+    ],
+}
+
+BACKWARD = [
+    "DROP INDEX IF EXISTS api_user_username_prefix_idx",
+    "DROP INDEX IF EXISTS api_user_email_prefix_idx",
+]
+
+
+def create_indexes(apps, schema_editor):
+    for statement in FORWARD.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in FORWARD:
+        for statement in BACKWARD:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_customerstats'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
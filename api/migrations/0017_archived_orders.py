@@ -0,0 +1,56 @@
+# Archive des commandes terminées (historique des ventes conservé après suppression)
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import api.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_user_prefix_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name='Utilisateur')),
+                ('customer_name', models.CharField(max_length=200, verbose_name='Nom du client')),
+                ('customer_email', models.EmailField(max_length=254, verbose_name='Email du client')),
+                ('customer_phone', models.CharField(max_length=20, verbose_name='Téléphone du client')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('paid', 'Payé'), ('ready', 'Prêt'), ('delivered', 'Livré'), ('cancelled', 'Annulé')], max_length=20, verbose_name='Statut')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+                ('pickup_at', models.DateTimeField(blank=True, null=True, verbose_name='Retrait prévu le')),
+                ('total_amount', api.fields.MoneyField(verbose_name='Montant total (FCFA)')),
+                ('refund_amount', api.fields.MoneyField(default=0, verbose_name='Montant remboursé (FCFA)')),
+                ('created_at', models.DateTimeField(verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(verbose_name='Mis à jour le')),
+                ('archived_at', models.DateTimeField(verbose_name='Archivée le')),
+            ],
+            options={
+                'verbose_name': 'Commande archivée',
+                'verbose_name_plural': 'Commandes archivées',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='api_archorder_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(blank=True, null=True, verbose_name='Produit')),
+                ('product_name', models.CharField(max_length=200, verbose_name='Nom du produit')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantité')),
+                ('unit_price', api.fields.MoneyField(verbose_name='Prix unitaire (FCFA)')),
+                ('total_price', api.fields.MoneyField(verbose_name='Prix total (FCFA)')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.archivedorder', verbose_name='Commande')),
+            ],
+            options={
+                'verbose_name': 'Article archivé',
+                'verbose_name_plural': 'Articles archivés',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Notifications : partitionnement mensuel sur PostgreSQL + index des requêtes courantes
+
+from django.db import migrations, models
+
+from api.partitions import partition_table, unpartition_table
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        partition_table(schema_editor)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        unpartition_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_archived_orders'),
+    ]
+
+    operations = [
+        # Avant les index : ils sont créés sur la table partitionnée et propagés à chaque partition
+        migrations.RunPython(partition, unpartition),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='api_notif_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('est_lue', False)), fields=['user'], name='api_notif_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at'], name='api_notif_created_idx'),
+        ),
+    ]
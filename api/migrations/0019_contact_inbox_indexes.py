@@ -0,0 +1,21 @@
+# Messages de contact : index des fils clients et de la boîte de réception du staff
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_notification_partitions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['user', 'created_at'], name='api_contact_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['created_at'], condition=models.Q(status='new'), name='api_contact_unread_idx'),
+        ),
+    ]
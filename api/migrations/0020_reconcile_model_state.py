@@ -0,0 +1,201 @@
+# Aligner l'historique des migrations sur les modèles
+#
+# Écarts hérités du schéma d'origine : slug des produits et created_at des
+# articles (absents des modèles), updated_at des messages, longueurs et
+# libellés. Corrigés sans perte de données : les colonnes inconnues des
+# modèles deviennent facultatives au lieu d'être supprimées.
+#
+# Les bases migrées avec une version antérieure de 0011 (qui ne renommait pas
+# encore le total de commande ni n'ajoutait le total de ligne) sont d'abord
+# mises au niveau de la 0011 actuelle.
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+from ._frozen_data_migrations import clear_checkpoint, update_in_chunks
+
+CHECKPOINT = '0020_reconcile_model_state:OrderItem'
+
+
+def _columns(connection, table):
+    with connection.cursor() as cursor:
+        return {column.name for column in connection.introspection.get_table_description(cursor, table)}
+
+
+def catch_up_money_columns(apps, schema_editor):
+    """Renommer order.total_price et créer orderitem.total_price s'ils ne l'ont pas été par 0011."""
+    connection = schema_editor.connection
+    Order = apps.get_model('api', 'Order')
+    OrderItem = apps.get_model('api', 'OrderItem')
+    quote = schema_editor.quote_name
+
+    order_columns = _columns(connection, Order._meta.db_table)
+    if 'total_price' in order_columns and 'total_amount' not in order_columns:
+        schema_editor.execute(
+            f'ALTER TABLE {quote(Order._meta.db_table)} RENAME COLUMN {quote("total_price")} TO {quote("total_amount")}'
+        )
+
+    if 'total_price' not in _columns(connection, OrderItem._meta.db_table):
+        field = OrderItem._meta.get_field('total_price').clone()
+        field.set_attributes_from_name('total_price')
+        field.default = 0
+        schema_editor.add_field(OrderItem, field)
+        update_in_chunks(
+            OrderItem, {'total_price': F('quantity') * F('unit_price')},
+            using=connection.alias, checkpoint=CHECKPOINT,
+        )
+        clear_checkpoint(connection, CHECKPOINT)
+
+
+class Migration(migrations.Migration):
+
+    # Rattrapage des totaux : chaque tranche est validée séparément, comme en 0011
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0019_contact_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(catch_up_money_columns, migrations.RunPython.noop),
+
+        # Colonnes absentes des modèles : gardées en base mais facultatives
+        # (sinon chaque INSERT échoue), retirées de l'état
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.AlterField(
+                    model_name='product',
+                    name='slug',
+                    field=models.SlugField(blank=True, max_length=200, null=True, unique=True),
+                ),
+                migrations.AlterField(
+                    model_name='orderitem',
+                    name='created_at',
+                    field=models.DateTimeField(auto_now_add=True, null=True, verbose_name='Date de création'),
+                ),
+            ],
+            state_operations=[
+                migrations.RemoveField(model_name='product', name='slug'),
+                migrations.RemoveField(model_name='orderitem', name='created_at'),
+            ],
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Mis à jour le'),
+            preserve_default=False,
+        ),
+
+        # Utilisateur obligatoire dans les modèles ; les anciennes lignes sans
+        # utilisateur (antérieures à 0003) restent en base
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='contactmessage',
+                    name='user',
+                    field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+                ),
+                migrations.AlterField(
+                    model_name='order',
+                    name='user',
+                    field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+                ),
+            ],
+        ),
+
+        # Longueurs et libellés
+        migrations.AlterField(
+            model_name='contactmessage',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Créé le'),
+        ),
+        migrations.AlterField(
+            model_name='contactmessage',
+            name='name',
+            field=models.CharField(max_length=200, verbose_name='Nom'),
+        ),
+        migrations.AlterField(
+            model_name='contactmessage',
+            name='phone',
+            field=models.CharField(max_length=20, verbose_name='Téléphone'),
+        ),
+        migrations.AlterField(
+            model_name='contactmessage',
+            name='subject',
+            field=models.CharField(max_length=200, verbose_name='Sujet'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Créé le'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='customer_email',
+            field=models.EmailField(max_length=254, verbose_name='Email du client'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='customer_name',
+            field=models.CharField(max_length=200, verbose_name='Nom du client'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='customer_phone',
+            field=models.CharField(max_length=20, verbose_name='Téléphone du client'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('paid', 'Payé'), ('ready', 'Prêt'), ('delivered', 'Livré'), ('cancelled', 'Annulé')], default='pending', max_length=20, verbose_name='Statut'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Mis à jour le'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='quantity',
+            field=models.PositiveIntegerField(verbose_name='Quantité'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='available',
+            field=models.BooleanField(default=True, verbose_name='Disponible'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.CharField(choices=[('gateaux', 'Gâteaux'), ('patisseries', 'Pâtisseries'), ('viennoiseries', 'Viennoiseries'), ('confiseries', 'Confiseries'), ('boissons', 'Boissons')], max_length=20, verbose_name='Catégorie'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Créé le'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.URLField(blank=True, max_length=500, null=True, verbose_name='Image URL'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(max_length=200, verbose_name='Nom'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='stock',
+            field=models.PositiveIntegerField(default=0, verbose_name='Stock'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Mis à jour le'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Numéro des évènements de la file de cuisine, attribué en base (voir api/kitchen.py)
+
+from django.db import migrations, models
+
+
+def create_state(apps, schema_editor):
+    KitchenState = apps.get_model('api', 'KitchenState')
+    KitchenState.objects.using(schema_editor.connection.alias).get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_reconcile_model_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KitchenState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': 'État de la file de cuisine',
+                'verbose_name_plural': 'États de la file de cuisine',
+            },
+        ),
+        migrations.RunPython(create_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,175 @@
+"""
+Copie figée des outils de `api.data_migrations` utilisés par les migrations
+0006, 0011 et 0020.
+
+Une migration déjà appliquée doit se rejouer à l'identique sur une base
+neuve : elle ne dépend donc pas du module vivant, qui peut évoluer. Ne pas
+modifier ce fichier ; une nouvelle migration importe `api.data_migrations`
+(ou en fige à son tour une copie). Le préfixe « _ » l'exclut du chargeur de
+migrations.
+"""
+import sys
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, transaction
+from django.db.models import F, FloatField, Max, Min
+from django.db.models.functions import Cast, Round
+
+CHECKPOINT_TABLE = 'api_data_migration_checkpoint'
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _ensure_checkpoint_table(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} ('
+            ' name VARCHAR(255) PRIMARY KEY,'
+            ' last_pk BIGINT NOT NULL)'
+        )
+
+
+def _read_checkpoint(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT last_pk FROM {CHECKPOINT_TABLE} WHERE name = %s', [name])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _write_checkpoint(connection, name, last_pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {CHECKPOINT_TABLE} SET last_pk = %s WHERE name = %s', [last_pk, name])
+        if cursor.rowcount == 0:
+            cursor.execute(f'INSERT INTO {CHECKPOINT_TABLE} (name, last_pk) VALUES (%s, %s)', [name, last_pk])
+
+
+def clear_checkpoint(connection, name):
+    """Oublier le point de reprise `name` (no-op s'il n'existe pas)."""
+    _ensure_checkpoint_table(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {CHECKPOINT_TABLE} WHERE name = %s', [name])
+
+
+def _stdout_progress(label, done, total):
+    sys.stdout.write(f'\n    {label}: {done}/{total} lignes')
+    sys.stdout.flush()
+
+
+def existing_fields(model, field_names):
+    """Garder uniquement les champs présents sur le modèle (historique) donné."""
+    fields = []
+    for name in field_names:
+        try:
+            model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        fields.append(name)
+    return fields
+
+
+def scale_fields(model, field_names, factor, *, divide=False, using='default', checkpoint=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, progress=_stdout_progress):
+    """
+    Multiplier (ou diviser si `divide`) `field_names` de `model` par `factor`
+    directement en SQL.
+
+    Les lignes sont traitées par plages de clés primaires de `chunk_size`.
+    Si `checkpoint` est fourni, la dernière clé traitée est enregistrée dans la
+    même transaction que la tranche : une relance reprend là où elle s'est
+    arrêtée. Les champs absents du modèle sont ignorés.
+
+    Retourne le nombre de lignes mises à jour.
+    """
+    fields = existing_fields(model, field_names)
+    if divide and connections[using].vendor == 'sqlite':
+        # SQLite stocke 2000.00 comme l'entier 2000 et ferait une division
+        # entière : on divise en flottant, la colonne arrondit au centime
+        assignments = {name: Cast(name, FloatField()) / float(factor) for name in fields}
+    elif divide:
+        assignments = {name: F(name) / factor for name in fields}
+    else:
+        assignments = {name: F(name) * factor for name in fields}
+    return update_in_chunks(model, assignments, using=using, checkpoint=checkpoint,
+                            chunk_size=chunk_size, progress=progress)
+
+
+def round_fields(model, field_names, *, using='default', checkpoint=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, progress=_stdout_progress):
+    """
+    Arrondir `field_names` de `model` à l'unité en SQL (``ROUND(col)``), par
+    tranches comme `scale_fields`. Sert avant de passer une colonne décimale
+    en entier, pour que le changement de type ne tronque pas les centimes.
+    """
+    assignments = {name: Round(F(name)) for name in existing_fields(model, field_names)}
+    return update_in_chunks(model, assignments, using=using, checkpoint=checkpoint,
+                            chunk_size=chunk_size, progress=progress)
+
+
+def update_in_chunks(model, assignments, *, using='default', checkpoint=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE, progress=_stdout_progress):
+    """
+    Exécuter ``UPDATE ... SET`` `assignments` sur toutes les lignes de
+    `model`, par plages de clés primaires, avec point de reprise optionnel.
+    Retourne le nombre de lignes mises à jour.
+    """
+    if not assignments:
+        return 0
+
+    connection = connections[using]
+    manager = model._base_manager.db_manager(using)
+    bounds = manager.aggregate(lo=Min('pk'), hi=Max('pk'))
+    if bounds['lo'] is None:
+        return 0
+
+    start = bounds['lo']
+    if checkpoint:
+        _ensure_checkpoint_table(connection)
+        last_pk = _read_checkpoint(connection, checkpoint)
+        if last_pk is not None:
+            start = last_pk + 1
+
+    total = manager.count()
+    done = manager.filter(pk__lt=start).count() if start > bounds['lo'] else 0
+    label = model._meta.db_table
+    updated = 0
+
+    while start <= bounds['hi']:
+        stop = start + chunk_size
+        with transaction.atomic(using=using):
+            count = manager.filter(pk__gte=start, pk__lt=stop).update(**assignments)
+            if checkpoint:
+                _write_checkpoint(connection, checkpoint, min(stop - 1, bounds['hi']))
+        updated += count
+        done += count
+        if progress and count:
+            progress(label, done, total)
+        start = stop
+
+    return updated
+
+
+def scale_models(apps, schema_editor, targets, factor, *, prefix, opposite_prefix=None,
+                 divide=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Appliquer `scale_fields` à plusieurs modèles depuis une opération RunPython.
+
+    `targets` est une liste de ``(nom_du_modele, [champs])`` de l'app ``api``.
+    Les points de reprise sont nommés ``<prefix>:<modele>``. Une fois tous les
+    modèles traités, ceux de `opposite_prefix` (le sens inverse de la même
+    migration) sont effacés pour qu'un aller-retour reparte de zéro.
+
+    La migration appelante doit déclarer ``atomic = False`` pour que chaque
+    tranche soit réellement validée au fil de l'eau.
+    """
+    using = schema_editor.connection.alias
+    for model_name, field_names in targets:
+        model = apps.get_model('api', model_name)
+        scale_fields(
+            model, field_names, factor,
+            divide=divide,
+            using=using,
+            checkpoint=f'{prefix}:{model_name}',
+            chunk_size=chunk_size,
+        )
+    if opposite_prefix:
+        for model_name, _ in targets:
+            clear_checkpoint(schema_editor.connection, f'{opposite_prefix}:{model_name}')
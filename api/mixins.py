@@ -0,0 +1,211 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .fast_serializers import values_serializer_for
+from . import sync
+
+
+def _split_param(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+class ValuesListMixin:
+    """
+    Action `list` servie par `ValuesSerializer` (dictionnaires construits depuis
+    ``.values()``) au lieu d'instancier le serializer pour chaque ligne.
+    Même schéma de sortie ; les autres actions gardent `serializer_class`.
+
+    ``?fields=id,name,stock`` limite les champs renvoyés (et les colonnes lues),
+    sur les listes comme sur le détail. Les relations imbriquées (``items``)
+    ne sont chargées que si elles sont demandées dans `fields` ou via
+    ``?expand=items`` ; sans `fields`, tous les champs sont renvoyés.
+    """
+
+    def requested_fields(self):
+        """Ensemble des champs demandés, ou None pour tous. Lève ValidationError si inconnus."""
+        if hasattr(self, '_requested_fields'):
+            return self._requested_fields
+        fields = _split_param(self.request.query_params.get('fields'))
+        expand = _split_param(self.request.query_params.get('expand'))
+        requested = None
+        if fields or expand:
+            compiled = values_serializer_for(self.get_serializer_class())
+            available = set(compiled.field_names)
+            for param, names in (('fields', fields), ('expand', expand)):
+                unknown = set(names) - available
+                if unknown:
+                    raise ValidationError({
+                        param: f"Champs inconnus : {', '.join(sorted(unknown))}",
+                        'available': compiled.field_names,
+                    })
+            if fields:
+                requested = set(fields) | set(expand)
+        self._requested_fields = requested
+        return requested
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.requested_fields()
+        if fields is not None and self.action == 'retrieve':
+            compiled = values_serializer_for(self.get_serializer_class())
+            columns = {path.split('__')[0] for _, path, _ in compiled.restrict(fields).plan if path}
+            concrete = {field.name for field in queryset.model._meta.concrete_fields}
+            queryset = queryset.only(*(columns & concrete))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.requested_fields() if self.request.method == 'GET' else None
+        if fields is not None:
+            for name in set(serializer.fields) - fields:
+                serializer.fields.pop(name)
+        return serializer
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        compiled = values_serializer_for(self.get_serializer_class())
+        fields = self.requested_fields()
+        if fields is not None:
+            compiled = compiled.restrict(fields)
+        return Response(compiled.serialize(queryset))
+
+
+class DeltaSyncMixin:
+    """
+    ``?updated_since=<ISO 8601 ou epoch>`` sur l'action `list` : seules les
+    lignes modifiées depuis cette date sont renvoyées, avec les identifiants
+    supprimés entre-temps::
+
+        {"results": [...], "deleted": [12, 15], "server_time": "...", "reset": false}
+
+    Le client repasse `server_time` au prochain appel. Si la date est plus
+    ancienne que la rétention des suppressions, la liste complète est
+    renvoyée avec ``"reset": true`` et le client remplace sa copie locale.
+
+    `sync_model` est la clé utilisée dans `Tombstone` ; `sync_owner_field`,
+    si défini, restreint les suppressions visibles par un non-staff aux siennes.
+    """
+
+    sync_model = None
+    sync_owner_field = None
+
+    def sync_since(self):
+        if self.action != 'list' or 'updated_since' not in self.request.query_params:
+            return None
+        since = sync.parse_since(self.request.query_params['updated_since'])
+        if since is None:
+            raise ValidationError({'updated_since': "Horodatage invalide (ISO 8601 ou secondes epoch)"})
+        return since
+
+    def sync_owner_id(self):
+        """Propriétaire auquel restreindre les suppressions, None pour toutes."""
+        if self.sync_owner_field and not self.request.user.is_staff:
+            return self.request.user.pk
+        return None
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        since = self.sync_since()
+        if since is not None and since >= sync.retention_horizon():
+            queryset = queryset.filter(updated_at__gte=since)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        since = self.sync_since()
+        if since is None:
+            return super().list(request, *args, **kwargs)
+
+        server_time = timezone.now()
+        reset = since < sync.retention_horizon()
+        response = super().list(request, *args, **kwargs)
+        deleted = []
+        if not reset:
+            deleted = sync.deleted_since(self.sync_model, since, owner_id=self.sync_owner_id())
+        response.data = {
+            'results': response.data,
+            'deleted': deleted,
+            'server_time': server_time.isoformat(),
+            'reset': reset,
+        }
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    Requêtes conditionnelles (ETag / Last-Modified) sur `list` et `retrieve`.
+
+    Le validateur vient d'une seule agrégation sur le queryset filtré :
+    ``MAX(updated_at)`` et ``COUNT(*)`` (plus `conditional_dependencies`, par
+    exemple la date de mise à jour des produits d'une commande). Si le client
+    a déjà cette version, on répond ``304`` sans exécuter la requête de
+    données ni la sérialisation.
+
+    Avec `DeltaSyncMixin` et ``?updated_since=``, une suppression change la
+    réponse (liste `deleted`) sans toucher au queryset : le validateur inclut
+    alors ``MAX(deleted_at)`` et le nombre de `Tombstone` visibles, ou le
+    passage en resynchronisation complète (`reset`).
+    """
+
+    # Autres colonnes dont dépend la représentation (chemins ORM vers un updated_at)
+    conditional_dependencies = ()
+
+    def conditional_state(self, queryset):
+        aggregates = {'last_modified': Max('updated_at'), 'count': Count('pk', distinct=True)}
+        for index, path in enumerate(self.conditional_dependencies):
+            aggregates[f'dep{index}'] = Max(path)
+        state = queryset.order_by().aggregate(**aggregates)
+
+        since = self.sync_since() if hasattr(self, 'sync_since') else None
+        if since is not None:
+            if since < sync.retention_horizon():
+                state['reset'] = True
+            else:
+                state.update(
+                    sync.tombstones_since(self.sync_model, since, owner_id=self.sync_owner_id())
+                    .aggregate(deleted_at=Max('deleted_at'), deleted_count=Count('pk'))
+                )
+
+        last_modified = max((value for value in state.values() if hasattr(value, 'timestamp')), default=None)
+        key = '|'.join([
+            self.request.path,
+            self.request.GET.urlencode(),
+            # Le contenu accepté (JSON, API navigable...) change les octets renvoyés
+            self.request.META.get('HTTP_ACCEPT', ''),
+            *(f'{name}={value.isoformat() if hasattr(value, "isoformat") else value}'
+              for name, value in sorted(state.items())),
+        ])
+        etag = quote_etag(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+        return etag, last_modified
+
+    def _conditional(self, queryset, render):
+        etag, last_modified = self.conditional_state(queryset)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            # Le navigateur doit revalider à chaque fois (réponses propres à l'utilisateur)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._conditional(queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self._conditional(queryset, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
@@ -1,5 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models import F, Sum
+
+from .fields import MoneyField, to_fcfa
 
 class Product(models.Model):
     CATEGORY_CHOICES = [
@@ -12,18 +16,21 @@ class Product(models.Model):
     
     name = models.CharField(max_length=200, verbose_name="Nom")
     description = models.TextField(verbose_name="Description")
-    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Prix")
+    price = MoneyField(verbose_name="Prix (FCFA)")
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, verbose_name="Catégorie")
     stock = models.PositiveIntegerField(default=0, verbose_name="Stock")
     available = models.BooleanField(default=True, verbose_name="Disponible")
     image = models.URLField(max_length=500, blank=True, null=True, verbose_name="Image URL")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+    # Maintenu par un trigger PostgreSQL (migration 0009), inutilisé sur SQLite
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['updated_at'], name='api_product_updated_idx')]
     
     def __str__(self):
         return self.name
@@ -43,7 +50,9 @@ class Order(models.Model):
     customer_phone = models.CharField(max_length=20, verbose_name="Téléphone du client")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
     notes = models.TextField(blank=True, verbose_name="Notes")
-    total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Montant total")
+    pickup_at = models.DateTimeField(null=True, blank=True, verbose_name="Retrait prévu le")
+    total_amount = MoneyField(verbose_name="Montant total (FCFA)")
+    refund_amount = MoneyField(default=0, verbose_name="Montant remboursé (FCFA)")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
     
@@ -51,16 +60,28 @@ class Order(models.Model):
         verbose_name = "Commande"
         verbose_name_plural = "Commandes"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at'], name='api_order_updated_idx'),
+            # File de production : commandes en attente / payées par heure de retrait
+            models.Index(fields=['status', 'pickup_at'], name='api_order_status_pickup_idx'),
+        ]
     
     def __str__(self):
         return f"Commande #{self.id} - {self.customer_name}"
 
+    @classmethod
+    def items_total(cls, order_id):
+        """Total des articles d'une commande, calculé en SQL (somme entière)."""
+        return OrderItem.objects.filter(order_id=order_id).aggregate(
+            total=Sum(F('quantity') * F('unit_price'))
+        )['total'] or 0
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items', verbose_name="Commande")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Produit")
     quantity = models.PositiveIntegerField(verbose_name="Quantité")
-    unit_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Prix unitaire")
-    total_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Prix total")
+    unit_price = MoneyField(verbose_name="Prix unitaire (FCFA)")
+    total_price = MoneyField(verbose_name="Prix total (FCFA)")
     
     class Meta:
         verbose_name = "Article de commande"
@@ -69,6 +90,13 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity}x {self.product.name}"
 
+    def save(self, *args, **kwargs):
+        # Montants entiers : le total de ligne est exact, sans arrondi
+        if self.total_price is None and self.unit_price is not None:
+            self.unit_price = to_fcfa(self.unit_price)
+            self.total_price = self.unit_price * self.quantity
+        super().save(*args, **kwargs)
+
 class ContactMessage(models.Model):
     STATUS_CHOICES = [
         ('new', 'Nouveau'),
@@ -84,6 +112,16 @@ class ContactMessage(models.Model):
     subject = models.CharField(max_length=200, verbose_name="Sujet")
     message = models.TextField(verbose_name="Message")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new', verbose_name="Statut")
+    admin_reponse = models.TextField(blank=True, null=True, verbose_name="Réponse de l'admin")
+    repondu_le = models.DateTimeField(blank=True, null=True, verbose_name="Répondu le")
+    repondu_par = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='messages_repondus',
+        verbose_name="Répondu par"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
     
@@ -91,12 +129,25 @@ class ContactMessage(models.Model):
         verbose_name = "Message de contact"
         verbose_name_plural = "Messages de contact"
         ordering = ['-created_at']
+        indexes = [
+            # Messages d'un client (mes_messages), du plus récent au plus ancien
+            models.Index(fields=['user', 'created_at'], name='api_contact_user_created_idx'),
+            # Boîte de réception du staff : seuls les messages non lus sont indexés
+            models.Index(fields=['created_at'], condition=models.Q(status='new'), name='api_contact_unread_idx'),
+        ]
     
     def __str__(self):
         return f"Message de {self.name} - {self.subject}"
 
+    @property
+    def est_repondu(self):
+        return self.status == 'replied' or bool(self.admin_reponse)
+
 class Notification(models.Model):
-    """Modèle pour les notifications utilisateurs"""
+    """
+    Modèle pour les notifications utilisateurs.
+    Sur PostgreSQL la table est partitionnée par mois de created_at (voir api/partitions.py).
+    """
 
     TYPE_CHOICES = [
         ('nouvelle_commande', 'Nouvelle commande'),
@@ -139,6 +190,182 @@ class Notification(models.Model):
         ordering = ['-created_at']
         verbose_name = "Notification"
         verbose_name_plural = "Notifications"
+        indexes = [
+            # Notifications récentes d'un utilisateur
+            models.Index(fields=['user', 'created_at'], name='api_notif_user_created_idx'),
+            # Compteur de non lues : seules les non lues sont indexées
+            models.Index(fields=['user'], condition=models.Q(est_lue=False), name='api_notif_unread_idx'),
+            # Rétention par tranches (SQLite, partition en cours)
+            models.Index(fields=['created_at'], name='api_notif_created_idx'),
+        ]
 
     def __str__(self):
         return f"Notification pour {self.user.username}: {self.message[:50]}"
+
+
+class Tombstone(models.Model):
+    """Trace d'une suppression, pour la synchronisation incrémentale (?updated_since=)"""
+
+    MODEL_CHOICES = [
+        ('product', 'Produit'),
+        ('order', 'Commande'),
+    ]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES, verbose_name="Modèle")
+    object_id = models.BigIntegerField(verbose_name="Identifiant supprimé")
+    # Propriétaire de l'objet supprimé (commandes), pour ne renvoyer à un client que les siennes
+    owner_id = models.BigIntegerField(null=True, blank=True, verbose_name="Propriétaire")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Supprimé le")
+
+    class Meta:
+        verbose_name = "Suppression"
+        verbose_name_plural = "Suppressions"
+        ordering = ['-deleted_at']
+        indexes = [models.Index(fields=['model', 'deleted_at'], name='api_tombstone_model_idx')]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} supprimé le {self.deleted_at}"
+
+
+class IdempotencyKey(models.Model):
+    """Réponse enregistrée pour une clé Idempotency-Key (voir api/idempotency.py)"""
+
+    # sha256 de (utilisateur, méthode, chemin, clé du client)
+    key = models.CharField(max_length=64, unique=True, verbose_name="Clé")
+    request_hash = models.CharField(max_length=32, verbose_name="Empreinte de la requête")
+    # Nul tant que la première requête est en cours
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Statut HTTP")
+    response = models.BinaryField(null=True, blank=True, verbose_name="Réponse")
+    expires_at = models.DateTimeField(verbose_name="Expire le")
+
+    class Meta:
+        verbose_name = "Clé d'idempotence"
+        verbose_name_plural = "Clés d'idempotence"
+        indexes = [models.Index(fields=['expires_at'], name='api_idempotency_expires_idx')]
+
+    def __str__(self):
+        return f"{self.key[:12]}… ({self.status_code or 'en cours'})"
+
+
+class ProductRecommendation(models.Model):
+    """Voisin « souvent acheté avec » d'un produit (voir api/recommendations.py)"""
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations', verbose_name="Produit")
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name="Produit recommandé")
+    rank = models.PositiveSmallIntegerField(verbose_name="Rang")
+    score = models.FloatField(verbose_name="Score")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="Calculé le")
+
+    class Meta:
+        verbose_name = "Recommandation"
+        verbose_name_plural = "Recommandations"
+        ordering = ['product', 'rank']
+        # L'index de la contrainte sert la lecture du détail produit
+        constraints = [models.UniqueConstraint(fields=['product', 'rank'], name='api_recommendation_rank_uniq')]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} (#{self.rank})"
+
+
+class CooccurrenceMatrix(models.Model):
+    """Matrice de co-occurrence des produits (NumPy compressé) pour le rafraîchissement incrémental"""
+
+    data = models.BinaryField(verbose_name="Matrice")
+    # Dernière commande prise en compte
+    last_order_id = models.BigIntegerField(default=0, verbose_name="Dernière commande")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    class Meta:
+        verbose_name = "Matrice de co-occurrence"
+        verbose_name_plural = "Matrices de co-occurrence"
+
+    def __str__(self):
+        return f"Co-occurrence jusqu'à la commande #{self.last_order_id}"
+
+
+class KitchenState(models.Model):
+    """Dernier numéro d'évènement de la file de cuisine (une seule ligne, voir api/kitchen.py)"""
+
+    version = models.BigIntegerField(default=0, verbose_name="Version")
+
+    class Meta:
+        verbose_name = "État de la file de cuisine"
+        verbose_name_plural = "États de la file de cuisine"
+
+    def __str__(self):
+        return f"File de cuisine v{self.version}"
+
+
+class CustomerStats(models.Model):
+    """Compteurs de commandes d'un client, tenus à jour par api/customer_stats.py"""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='order_stats', verbose_name="Utilisateur")
+    # Commandes non annulées
+    order_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de commandes")
+    # Somme de (total - remboursé) des commandes non annulées
+    total_spent = MoneyField(default=0, verbose_name="Dépenses totales (FCFA)")
+    # Dernière commande passée, même annulée
+    last_order_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernière commande le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    class Meta:
+        verbose_name = "Statistiques client"
+        verbose_name_plural = "Statistiques clients"
+        # Un index par tri proposé dans la liste des utilisateurs
+        indexes = [
+            models.Index(fields=['order_count', 'user'], name='api_custstats_orders_idx'),
+            models.Index(fields=['total_spent', 'user'], name='api_custstats_spent_idx'),
+            models.Index(fields=['last_order_at', 'user'], name='api_custstats_last_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} : {self.order_count} commande(s), {self.total_spent} FCFA"
+
+
+class ArchivedOrder(models.Model):
+    """Commande terminée déplacée hors de api_order (voir api/deletion.py), pour l'historique des ventes"""
+
+    # Même identifiant que la commande d'origine
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    # Simple identifiant : l'archive survit à la suppression du client
+    user_id = models.BigIntegerField(null=True, blank=True, db_index=True, verbose_name="Utilisateur")
+    customer_name = models.CharField(max_length=200, verbose_name="Nom du client")
+    customer_email = models.EmailField(verbose_name="Email du client")
+    customer_phone = models.CharField(max_length=20, verbose_name="Téléphone du client")
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, verbose_name="Statut")
+    notes = models.TextField(blank=True, verbose_name="Notes")
+    pickup_at = models.DateTimeField(null=True, blank=True, verbose_name="Retrait prévu le")
+    total_amount = MoneyField(verbose_name="Montant total (FCFA)")
+    refund_amount = MoneyField(default=0, verbose_name="Montant remboursé (FCFA)")
+    created_at = models.DateTimeField(verbose_name="Créé le")
+    updated_at = models.DateTimeField(verbose_name="Mis à jour le")
+    archived_at = models.DateTimeField(verbose_name="Archivée le")
+
+    class Meta:
+        verbose_name = "Commande archivée"
+        verbose_name_plural = "Commandes archivées"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_at'], name='api_archorder_created_idx')]
+
+    def __str__(self):
+        return f"Commande archivée #{self.id} - {self.customer_name}"
+
+
+class ArchivedOrderItem(models.Model):
+    """Article d'une commande archivée, avec le nom du produit au moment de l'archivage"""
+
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items', verbose_name="Commande")
+    # Le produit peut avoir été supprimé depuis
+    product_id = models.BigIntegerField(null=True, blank=True, verbose_name="Produit")
+    product_name = models.CharField(max_length=200, verbose_name="Nom du produit")
+    quantity = models.PositiveIntegerField(verbose_name="Quantité")
+    unit_price = MoneyField(verbose_name="Prix unitaire (FCFA)")
+    total_price = MoneyField(verbose_name="Prix total (FCFA)")
+
+    class Meta:
+        verbose_name = "Article archivé"
+        verbose_name_plural = "Articles archivés"
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_name}"
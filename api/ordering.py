@@ -0,0 +1,171 @@
+"""
+Passage de commande.
+
+`place_order` valide les coordonnées du client et les articles, réserve le
+stock, crée la commande et ses articles puis prévient l'équipe, le tout dans
+une transaction. La réservation est un ``UPDATE ... SET stock = stock - q
+WHERE stock >= q`` par produit : deux clients qui commandent la dernière
+pièce en même temps ne peuvent pas la réserver tous les deux.
+
+Le stock réservé est rendu (``SET stock = stock + q``) dans la transaction
+qui annule la commande ou la supprime avant livraison : `release_stock`,
+appelé par les transitions, la modification complète et les suppressions.
+"""
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+
+from . import customer_stats, kitchen
+from .catalog import bump_catalog_version
+from .fields import to_fcfa
+from .models import Notification, Order, OrderItem, Product
+from .serializers import OrderSerializer
+
+MAX_ORDER_LINES = 50
+# Statuts où la commande retient son stock (une commande livrée l'a consommé)
+STOCK_HELD_STATUSES = ('pending', 'paid', 'ready')
+
+
+def parse_items(items):
+    """Lire ``[{"product_id": ..., "quantity": ...}]`` -> {id produit: quantité} (lignes fusionnées)."""
+    if not isinstance(items, list) or not items:
+        raise serializers.ValidationError({'items': "La commande doit contenir au moins un article"})
+    if len(items) > MAX_ORDER_LINES:
+        raise serializers.ValidationError({'items': f"{MAX_ORDER_LINES} articles au maximum par commande"})
+    quantities = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise serializers.ValidationError({'items': "Article invalide"})
+        product_id = item.get('product_id', item.get('product'))
+        quantity = item.get('quantity')
+        if not isinstance(product_id, int) or not isinstance(quantity, int) or quantity < 1:
+            raise serializers.ValidationError({'items': "Chaque article doit avoir un product_id et une quantité positive"})
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def _reserve_stock(quantities):
+    now = timezone.now()
+    for product_id, quantity in quantities.items():
+        reserved = (
+            Product.objects
+            .filter(pk=product_id, available=True, stock__gte=quantity)
+            .update(stock=F('stock') - quantity, updated_at=now)
+        )
+        if not reserved:
+            raise serializers.ValidationError({'items': f"Stock insuffisant pour le produit #{product_id}"})
+    bump_catalog_version()
+
+
+def order_quantities(order_ids):
+    """{id produit: quantité totale} des articles des commandes `order_ids` (liste ou sous-requête)."""
+    return dict(
+        OrderItem.objects
+        .filter(order_id__in=order_ids)
+        .values('product_id')
+        .annotate(quantity=Sum('quantity'))
+        .values_list('product_id', 'quantity')
+        .order_by('product_id')
+    )
+
+
+def release_stock(order_ids):
+    """
+    Rendre au stock les articles des commandes `order_ids`, un UPDATE par
+    produit. À appeler dans la transaction qui annule ou supprime les
+    commandes, avant la suppression des articles.
+    """
+    quantities = order_quantities(order_ids)
+    if not quantities:
+        return
+    now = timezone.now()
+    # Toujours dans l'ordre des produits : pas d'interblocage entre deux libérations
+    for product_id, quantity in sorted(quantities.items()):
+        Product.objects.filter(pk=product_id).update(stock=F('stock') + quantity, updated_at=now)
+    bump_catalog_version()
+
+
+def stock_after_status_change(order_id, previous, current):
+    """Modification complète d'une commande : rendre ou reprendre le stock si elle entre ou sort de « annulée »."""
+    if current == 'cancelled' and previous != 'cancelled':
+        release_stock([order_id])
+    elif previous == 'cancelled' and current != 'cancelled':
+        _reserve_stock(order_quantities([order_id]))
+
+
+def _notify_staff(order):
+    staff = User.objects.filter(is_staff=True, is_active=True).values_list('pk', flat=True)
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id, type='nouvelle_commande',
+            message=f"Nouvelle commande #{order.pk} de {order.customer_name} ({order.total_amount} FCFA)",
+            lien=f'/management/?order={order.pk}',
+        )
+        for user_id in staff
+    ])
+
+
+def place_order(user, data):
+    """Créer une commande pour `user` à partir du corps de requête `data`. Lève ValidationError."""
+    serializer = OrderSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    quantities = parse_items(data.get('items'))
+
+    with transaction.atomic():
+        prices = dict(
+            Product.objects.filter(pk__in=quantities, available=True).values_list('pk', 'price')
+        )
+        missing = sorted(set(quantities) - set(prices))
+        if missing:
+            raise serializers.ValidationError({'items': f"Produit(s) indisponible(s) : {missing}"})
+        _reserve_stock(quantities)
+
+        order = serializer.save(
+            user=user,
+            status='pending',
+            total_amount=sum(prices[pk] * quantity for pk, quantity in quantities.items()),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=pk, quantity=quantity,
+                      unit_price=prices[pk], total_price=prices[pk] * quantity)
+            for pk, quantity in quantities.items()
+        ])
+        customer_stats.order_placed(order)
+        _notify_staff(order)
+        kitchen.publish(quantities)
+    return order
+
+
+def refund_order(queryset, pk, amount):
+    """
+    Rembourser `amount` FCFA sur la commande `pk` (prise dans `queryset`).
+    ``UPDATE ... WHERE refund_amount + amount <= total_amount`` : deux
+    remboursements simultanés ne peuvent pas dépasser le total.
+    """
+    try:
+        amount = to_fcfa(amount)
+    except DjangoValidationError:
+        amount = None
+    if not amount or amount < 0:
+        raise serializers.ValidationError({'amount': "Le montant doit être un entier positif"})
+
+    with transaction.atomic():
+        updated = (
+            queryset
+            .filter(pk=pk, refund_amount__lte=F('total_amount') - amount)
+            .update(refund_amount=F('refund_amount') + amount, updated_at=timezone.now())
+        )
+        if updated:
+            order = queryset.get(pk=pk)
+            # Une commande annulée est déjà sortie des dépenses du client
+            if order.status != 'cancelled':
+                customer_stats.adjust(order.user_id, spent=-amount)
+            return order
+
+    if not queryset.filter(pk=pk).exists():
+        raise NotFound("Commande introuvable")
+    raise serializers.ValidationError({'amount': "Le remboursement dépasse le montant restant de la commande"})
@@ -0,0 +1,255 @@
+"""
+Partitionnement mensuel des notifications (PostgreSQL) et rétention.
+
+Sur PostgreSQL, la migration 0018 transforme api_notification en table
+partitionnée par plage de `created_at`, une partition par mois UTC
+(``api_notification_p202610`` pour octobre 2026), plus une partition par
+défaut pour les lignes hors des mois créés. Créer un mois dont des lignes
+sont déjà dans la partition par défaut les y déplace d'abord (PostgreSQL
+refuse sinon la partition). Les requêtes courantes bornées par
+`created_at` (notifications récentes d'un utilisateur) ne lisent que les
+partitions récentes.
+
+La rétention supprime les notifications lues de plus de
+NOTIFICATION_RETENTION_DAYS jours :
+
+- une partition entièrement passée qui ne contient plus de notification
+  non lue est détachée puis supprimée (``DROP TABLE``, sans parcourir ses
+  lignes) ;
+- les lignes de la partition par défaut (mois dont la partition a déjà été
+  supprimée) sont supprimées directement ;
+- le reste (partition en cours, partitions encore porteuses de non lues,
+  ou base sans partitions comme SQLite) est supprimé par tranches de clés
+  primaires, chacune dans sa transaction.
+
+`purge_notifications` crée aussi à l'avance les partitions des prochains
+mois.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Notification
+
+TABLE = 'api_notification'
+PARTITIONS_AHEAD = 2
+DELETE_CHUNK_SIZE = 5000
+NOTIFICATION_RETENTION_DAYS = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+
+COLUMNS = 'id, type, message, lien, est_lue, created_at, user_id'
+COLUMN_DEFINITIONS = """
+    type varchar(50) NOT NULL,
+    message text NOT NULL,
+    lien varchar(255) NULL,
+    est_lue boolean NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    user_id integer NOT NULL
+"""
+
+
+def month_start(moment):
+    """Premier jour du mois (UTC) de `moment` (date ou datetime)."""
+    if isinstance(moment, datetime):
+        moment = moment.astimezone(dt_timezone.utc).date()
+    return moment.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def _bound(month):
+    # Bornes générées ici (jamais issues d'une saisie) : les bornes de
+    # partition doivent être des littéraux, pas des paramètres
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid"
+            " WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_partitions(connection, first, last):
+    """Créer (si besoin) les partitions mensuelles du mois `first` au mois `last` inclus."""
+    existing = {name for name, _ in monthly_partitions(connection)}
+    month, last = month_start(first), month_start(last)
+    while month <= last:
+        if partition_name(month) not in existing:
+            _create_partition(connection, month)
+        month = add_months(month, 1)
+
+
+def _create_partition(connection, month):
+    """
+    Créer la partition de `month`. Si la partition par défaut contient déjà
+    des lignes de ce mois, elle est détachée le temps de créer la partition
+    et d'y reverser ces lignes.
+    """
+    name, default = partition_name(month), f'{TABLE}_default'
+    bounds = f'FROM ({_bound(month)}) TO ({_bound(add_months(month, 1))})'
+    in_month = f'created_at >= {_bound(month)} AND created_at < {_bound(add_months(month, 1))}'
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Plus d'insertion dans la partition par défaut jusqu'au commit
+        cursor.execute(f'LOCK TABLE {default} IN SHARE MODE')
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_month})')
+        if not cursor.fetchone()[0]:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} FOR VALUES {bounds}')
+            return
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {default}')
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}')
+        cursor.execute(f'INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM {default} WHERE {in_month}')
+        cursor.execute(f'DELETE FROM {default} WHERE {in_month}')
+        cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {default} DEFAULT')
+
+
+def monthly_partitions(connection):
+    """[(nom, premier jour du mois)] des partitions mensuelles, de la plus ancienne à la plus récente."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE parent.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f'{TABLE}_p'
+    partitions = []
+    for name in names:
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def partition_table(schema_editor):
+    """
+    Migration : recréer api_notification en table partitionnée par mois
+    (PostgreSQL). La clé primaire d'une table partitionnée doit contenir la
+    clé de partitionnement : (id, created_at) ; `id` reste unique par sa
+    séquence. Les contraintes sont nommées explicitement, l'ancienne table
+    gardant les siennes jusqu'à sa suppression.
+    """
+    connection = schema_editor.connection
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned')
+    schema_editor.execute(
+        f'CREATE TABLE {TABLE} (id bigint GENERATED BY DEFAULT AS IDENTITY, {COLUMN_DEFINITIONS},'
+        f' CONSTRAINT {TABLE}_part_pkey PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)'
+    )
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fk_auth_user_id'
+        f' FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    schema_editor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT MIN(created_at) FROM {TABLE}_unpartitioned')
+        oldest = cursor.fetchone()[0]
+    now = timezone.now()
+    create_partitions(connection, oldest or now, add_months(month_start(now), PARTITIONS_AHEAD))
+
+    schema_editor.execute(f'INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}_unpartitioned')
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'),"
+        f" COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)"
+    )
+    schema_editor.execute(f'DROP TABLE {TABLE}_unpartitioned')
+
+
+def unpartition_table(schema_editor):
+    """Retour arrière de `partition_table` : une table ordinaire avec les mêmes lignes."""
+    schema_editor.execute(f'ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned')
+    schema_editor.execute(
+        f'CREATE TABLE {TABLE} (id bigint GENERATED BY DEFAULT AS IDENTITY'
+        f' CONSTRAINT {TABLE}_plain_pkey PRIMARY KEY, {COLUMN_DEFINITIONS})'
+    )
+    schema_editor.execute(f'INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {TABLE}_partitioned')
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'),"
+        f" COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)"
+    )
+    # Les partitions sont supprimées avec la table parente
+    schema_editor.execute(f'DROP TABLE {TABLE}_partitioned')
+    schema_editor.execute(
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fk_auth_user_id'
+        f' FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    schema_editor.execute(f'CREATE INDEX {TABLE}_user_id_idx ON {TABLE} (user_id)')
+
+
+def delete_read_in_chunks(cutoff, since=None, chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Supprimer les notifications lues créées avant `cutoff` (et après `since`)
+    par tranches de clés primaires, une transaction par tranche.
+    """
+    old = Notification.objects.filter(created_at__lt=cutoff)
+    if since is not None:
+        old = old.filter(created_at__gte=since)
+    bounds = old.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return 0
+    deleted = 0
+    for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+        with transaction.atomic():
+            # Notification n'a ni signal ni dépendance : un seul DELETE par tranche
+            deleted += old.filter(pk__gte=start, pk__lt=start + chunk_size, est_lue=True).delete()[0]
+    return deleted
+
+
+def purge_notifications(days=NOTIFICATION_RETENTION_DAYS, chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Appliquer la rétention des notifications lues. Retourne
+    {'dropped_partitions': [...], 'dropped': n, 'deleted': n}.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    connection = connections[Notification.objects.db]
+    report = {'dropped_partitions': [], 'dropped': 0, 'deleted': 0}
+    if not is_partitioned(connection):
+        report['deleted'] = delete_read_in_chunks(cutoff, chunk_size=chunk_size)
+        return report
+
+    create_partitions(connection, timezone.now(), add_months(month_start(timezone.now()), PARTITIONS_AHEAD))
+    # Partitions entièrement antérieures à la date limite
+    expired_before = month_start(cutoff)
+    for name, month in monthly_partitions(connection):
+        if month >= expired_before:
+            break
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*), COUNT(*) FILTER (WHERE NOT est_lue) FROM {name}')
+            rows, unread = cursor.fetchone()
+            if unread:
+                # Des notifications non lues retiennent la partition : on ne retire que les lues
+                cursor.execute(f'DELETE FROM {name} WHERE est_lue')
+                report['deleted'] += cursor.rowcount
+                continue
+            cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+            cursor.execute(f'DROP TABLE {name}')
+        report['dropped_partitions'].append(name)
+        report['dropped'] += rows
+
+    # Partition par défaut : lignes des mois sans partition, quelle que soit leur date
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}_default WHERE est_lue AND created_at < %s', [cutoff])
+        report['deleted'] += cursor.rowcount
+
+    # Le début du mois de la date limite
+    report['deleted'] += delete_read_in_chunks(
+        cutoff, since=datetime.combine(expired_before, datetime.min.time(), tzinfo=dt_timezone.utc),
+        chunk_size=chunk_size,
+    )
+    return report
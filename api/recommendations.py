@@ -0,0 +1,199 @@
+"""
+Recommandations « souvent achetés ensemble ».
+
+Un travail de fond construit la matrice de co-occurrence produits x produits
+à partir des articles de commande : C[i, j] = nombre de commandes contenant
+à la fois i et j (la diagonale compte les commandes de chaque produit). Le
+calcul est matriciel : les commandes sont traitées par blocs sous forme de
+matrice d'incidence commandes x produits A, et C += Aᵀ·A.
+
+Le score d'une paire est la similarité cosinus C[i, j] / √(C[i, i]·C[j, j]),
+pour que les produits vendus partout (la baguette) n'écrasent pas tout. Les
+`RECOMMENDATIONS_PER_PRODUCT` meilleurs voisins de chaque produit sont
+enregistrés dans `ProductRecommendation` ; le détail d'un produit les lit en
+une requête sur l'index (produit, rang).
+
+La matrice et le dernier identifiant de commande traité sont conservés
+(`CooccurrenceMatrix`) : un rafraîchissement n'ajoute que les nouvelles
+commandes et ne réécrit que les produits dont un score a pu changer. Les
+produits supprimés depuis sont retirés de la matrice au chargement, et ceux
+qui les avaient pour voisins sont recalculés.
+
+Tout le rafraîchissement se fait sous verrou de la ligne `CooccurrenceMatrix`
+(``SELECT ... FOR UPDATE``) : deux exécutions simultanées ne comptent pas deux
+fois les mêmes commandes, la seconde repart de l'état écrit par la première.
+Une commande annulée après avoir été comptée n'est pas retirée de la
+matrice ; le recalcul complet (``refresh_recommendations --full``, à planifier
+de temps en temps) corrige cette dérive.
+"""
+import io
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+
+from .models import CooccurrenceMatrix, Order, OrderItem, Product, ProductRecommendation
+
+RECOMMENDATIONS_PER_PRODUCT = 6
+MIN_COOCCURRENCE = 2
+ORDER_BLOCK_SIZE = 2000
+# Les commandes annulées ne disent rien des goûts des clients
+COUNTED_STATUSES = ('pending', 'paid', 'ready', 'delivered')
+
+
+def _lock_state():
+    """Ligne d'état verrouillée jusqu'à la fin de la transaction (créée au premier passage)."""
+    state, _ = CooccurrenceMatrix.objects.select_for_update().get_or_create(pk=1)
+    return state
+
+
+def _load_state(state):
+    if not state.data:
+        return np.empty(0, dtype=np.int64), np.zeros((0, 0), dtype=np.int32), 0
+    with np.load(io.BytesIO(bytes(state.data))) as arrays:
+        return arrays['product_ids'], arrays['counts'], state.last_order_id
+
+
+def _drop_deleted_products(product_ids, counts):
+    """
+    Retirer de la matrice les produits qui n'existent plus. Retourne aussi
+    les indices (dans la matrice réduite) des produits qui avaient l'un
+    d'eux pour voisin : leurs recommandations sont à réécrire.
+    """
+    existing = Product.objects.filter(pk__in=product_ids.tolist()).values_list('pk', flat=True)
+    live = np.isin(product_ids, list(existing))
+    if live.all():
+        return product_ids, counts, np.empty(0, dtype=np.int64)
+    orphaned = counts[:, ~live].any(axis=1)[live]
+    return product_ids[live], counts[np.ix_(live, live)], np.flatnonzero(orphaned)
+
+
+def _save_state(state, product_ids, counts, last_order_id):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, product_ids=product_ids, counts=counts)
+    state.data = buffer.getvalue()
+    state.last_order_id = last_order_id
+    state.save(update_fields=['data', 'last_order_id', 'updated_at'])
+
+
+def load_pairs(after_order_id, up_to_order_id):
+    """Couples (commande, produit) distincts des commandes dans l'intervalle, en une requête."""
+    rows = (
+        OrderItem.objects
+        .filter(order_id__gt=after_order_id, order_id__lte=up_to_order_id,
+                order__status__in=COUNTED_STATUSES)
+        .values_list('order_id', 'product_id')
+        .distinct()
+        .order_by()
+    )
+    pairs = np.array(list(rows), dtype=np.int64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def cooccurrence(order_ids, product_index, size):
+    """Matrice de co-occurrence (size x size) des couples (commande, indice produit)."""
+    counts = np.zeros((size, size), dtype=np.int32)
+    if not len(order_ids):
+        return counts
+    _, order_index = np.unique(order_ids, return_inverse=True)
+    for start in range(0, order_index.max() + 1, ORDER_BLOCK_SIZE):
+        in_block = (order_index >= start) & (order_index < start + ORDER_BLOCK_SIZE)
+        incidence = np.zeros((ORDER_BLOCK_SIZE, size), dtype=np.float32)
+        incidence[order_index[in_block] - start, product_index[in_block]] = 1
+        counts += (incidence.T @ incidence).astype(np.int32)
+    return counts
+
+
+def top_neighbours(counts, rows, n=RECOMMENDATIONS_PER_PRODUCT, min_count=MIN_COOCCURRENCE):
+    """
+    Pour chaque ligne `rows` de `counts` : (indices des voisins, scores),
+    du meilleur au moins bon, -1 là où il n'y a pas assez de voisins.
+    """
+    diagonal = np.diag(counts).astype(np.float64)
+    block = counts[rows].astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = block / np.sqrt(np.outer(diagonal[rows], diagonal))
+    scores[~np.isfinite(scores) | (block < min_count)] = 0
+    scores[np.arange(len(rows)), rows] = 0
+
+    k = min(n, counts.shape[0])
+    if k == 0:
+        return np.full((len(rows), 0), -1), np.zeros((len(rows), 0))
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best[best_scores <= 0] = -1
+    return best, best_scores
+
+
+def refresh_recommendations(full=False):
+    """
+    Ajouter les commandes passées depuis le dernier calcul (toutes si `full`)
+    et réécrire les recommandations des produits concernés.
+    Retourne {'orders': ..., 'products': ...}.
+    """
+    with transaction.atomic():
+        return _refresh(_lock_state(), full)
+
+
+def _refresh(state, full):
+    up_to = Order.objects.aggregate(last=Max('id'))['last'] or 0
+    orphaned = np.empty(0, dtype=np.int64)
+    if full:
+        product_ids, counts, after = np.empty(0, dtype=np.int64), np.zeros((0, 0), dtype=np.int32), 0
+    else:
+        product_ids, counts, after = _load_state(state)
+        product_ids, counts, orphaned = _drop_deleted_products(product_ids, counts)
+    order_ids, order_products = load_pairs(after, up_to)
+
+    # Nouveaux produits : agrandir la matrice
+    new_products = np.setdiff1d(np.unique(order_products), product_ids)
+    if len(new_products):
+        product_ids = np.concatenate([product_ids, new_products])
+        grown = np.zeros((len(product_ids), len(product_ids)), dtype=np.int32)
+        grown[:counts.shape[0], :counts.shape[1]] = counts
+        counts = grown
+    sort = np.argsort(product_ids)
+    product_index = sort[np.searchsorted(product_ids, order_products, sorter=sort)]
+
+    delta = cooccurrence(order_ids, product_index, len(product_ids))
+    counts += delta
+
+    # Un score (i, j) ne change que si i ou j figure dans les nouvelles commandes
+    touched = np.flatnonzero(np.diag(delta))
+    if full:
+        rows = np.arange(len(product_ids))
+    else:
+        rows = np.union1d(touched, np.flatnonzero(counts[:, touched].any(axis=1)))
+        rows = np.union1d(rows, orphaned)
+
+    neighbours, scores = top_neighbours(counts, rows)
+    ProductRecommendation.objects.filter(product_id__in=product_ids[rows].tolist()).delete()
+    ProductRecommendation.objects.bulk_create([
+        ProductRecommendation(
+            product_id=int(product_ids[row]), recommended_id=int(product_ids[neighbour]),
+            rank=rank, score=round(float(score), 4),
+        )
+        for row, row_neighbours, row_scores in zip(rows, neighbours, scores)
+        for rank, (neighbour, score) in enumerate(zip(row_neighbours, row_scores), start=1)
+        if neighbour >= 0
+    ])
+    _save_state(state, product_ids, counts, up_to)
+    return {'orders': int(len(np.unique(order_ids))), 'products': int(len(rows))}
+
+
+def recommendations_for(product_id, limit=RECOMMENDATIONS_PER_PRODUCT):
+    """Produits recommandés (disponibles) pour `product_id` : une requête sur l'index (produit, rang)."""
+    rows = (
+        ProductRecommendation.objects
+        .filter(product_id=product_id, recommended__available=True)
+        .order_by('rank')
+        .values_list('recommended_id', 'recommended__name', 'recommended__price',
+                     'recommended__image', 'score')[:limit]
+    )
+    return [
+        {'id': pk, 'name': name, 'price': price, 'image': image, 'score': score}
+        for pk, name, price, image, score in rows
+    ]
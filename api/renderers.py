@@ -0,0 +1,89 @@
+"""
+Rendu et lecture JSON rapides pour l'API.
+
+`FastJSONRenderer` / `FastJSONParser` utilisent orjson quand il est installé
+(encodage en C) et retombent sinon sur la bibliothèque standard, avec le même
+résultat que les classes JSON de DRF. orjson écrirait les datetimes UTC avec
+``+00:00`` là où DRF écrit ``Z`` : ils lui sont donc retirés
+(``OPT_PASSTHROUGH_DATETIME``) et passent, comme les Decimal et tout type
+qu'orjson ne connaît pas, par l'encodeur de DRF. Les serializers rendant déjà
+des chaînes, ce détour ne coûte que sur les données natives.
+
+Le choix du moteur se règle avec ``JSON_BACKEND`` dans les settings :
+``'auto'`` (orjson si disponible), ``'orjson'`` ou ``'stdlib'``.
+"""
+import json
+
+from django.conf import settings
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+
+def use_orjson():
+    backend = getattr(settings, 'JSON_BACKEND', 'auto')
+    if backend == 'stdlib':
+        return False
+    if backend == 'orjson' and orjson is None:
+        raise ImportError("JSON_BACKEND = 'orjson' mais orjson n'est pas installé")
+    return orjson is not None
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _orjson_default(obj):
+    # Appelé par orjson pour les types qu'il ne connaît pas et pour date/time/datetime
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer compatible DRF, encodé par orjson quand c'est possible."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not use_orjson():
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        option = orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            option |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=_orjson_default, option=option)
+
+        # Comme DRF : \u2028 et \u2029 échappés pour rester un sous-ensemble strict de JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser compatible DRF, décodé par orjson quand c'est possible."""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if not use_orjson():
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        raw = stream.read() if stream is not None else b''
+        if encoding.lower().replace('-', '') != 'utf8':
+            raw = raw.decode(encoding).encode('utf-8')
+        try:
+            # orjson refuse NaN/Infinity : équivalent du mode strict de DRF
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError as exc:
+            if not self.strict:
+                try:
+                    return json.loads(raw)
+                except ValueError:
+                    pass
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,159 @@
+"""
+Recherche plein texte dans le catalogue.
+
+Sur PostgreSQL, `Product.search_vector` est maintenu par un trigger (voir la
+migration 0009) avec la configuration ``french_unaccent`` : racinisation
+française et insensibilité aux accents. Les résultats sont classés par
+`SearchRank` ; si rien ne correspond, on retombe sur la similarité trigramme
+du nom pour tolérer les fautes de frappe.
+
+Sur SQLite (développement), un index inversé en mémoire est construit à la
+demande et reconstruit seulement quand le catalogue change.
+"""
+import difflib
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import Count, Max
+
+from .models import Product
+
+SEARCH_CONFIG = 'french_unaccent'
+SEARCH_LIMIT = 20
+TRIGRAM_THRESHOLD = 0.3
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+# Mots trop fréquents pour être utiles au classement
+_STOP_WORDS = {
+    'a', 'au', 'aux', 'avec', 'de', 'des', 'du', 'en', 'et', 'la', 'le', 'les',
+    'un', 'une', 'pour', 'sur', 'par', 'l', 'd',
+}
+_SUFFIXES = ('ettes', 'ette', 'ees', 'ee', 'es', 'x', 's', 'e')
+
+
+def normalize(text):
+    """Minuscules sans accents : « Gâteau Crème » -> « gateau creme »."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def stem(word):
+    """Racinisation française minimale (pluriels et féminins courants)."""
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in _WORD_RE.findall(normalize(text)) if word not in _STOP_WORDS]
+
+
+def search_products(query, limit=SEARCH_LIMIT, queryset=None):
+    """Retourner les produits correspondant à `query`, les plus pertinents d'abord."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    if not (query or '').strip():
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(query, limit, queryset)
+    return _search_in_memory(query, limit, queryset)
+
+
+def _search_postgresql(query, limit, queryset):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+    from django.db.models import F
+
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    results = list(
+        queryset
+        .filter(search_vector=search_query)
+        .annotate(rank=SearchRank(F('search_vector'), search_query))
+        .order_by('-rank', 'name')[:limit]
+    )
+    if results:
+        return results
+
+    # Aucun résultat exact : tolérer les fautes de frappe sur le nom
+    return list(
+        queryset
+        .filter(name__trigram_similar=query)
+        .annotate(rank=TrigramSimilarity('name', query))
+        .filter(rank__gte=TRIGRAM_THRESHOLD)
+        .order_by('-rank', 'name')[:limit]
+    )
+
+
+class InvertedIndex:
+    """Index inversé token -> {id produit: poids}, nom pondéré plus que la description."""
+
+    NAME_WEIGHT = 3
+    DESCRIPTION_WEIGHT = 1
+
+    def __init__(self, rows):
+        self.postings = defaultdict(dict)
+        for pk, name, description in rows:
+            for token in tokenize(description):
+                self._add(token, pk, self.DESCRIPTION_WEIGHT)
+            for token in tokenize(name):
+                self._add(token, pk, self.NAME_WEIGHT)
+        self.vocabulary = sorted(self.postings)
+
+    def _add(self, token, pk, weight):
+        postings = self.postings[token]
+        postings[pk] = postings.get(pk, 0) + weight
+
+    def _expand(self, token, is_last):
+        if token in self.postings:
+            return [token]
+        if is_last:
+            # Saisie en cours : compléter le dernier mot par préfixe
+            prefixed = [word for word in self.vocabulary if word.startswith(token)]
+            if prefixed:
+                return prefixed
+        return difflib.get_close_matches(token, self.vocabulary, n=3, cutoff=0.75)
+
+    def search(self, query):
+        """Retourner [(id, score)] triés par score décroissant."""
+        tokens = tokenize(query)
+        scores = defaultdict(float)
+        for position, token in enumerate(tokens):
+            for word in self._expand(token, position == len(tokens) - 1):
+                exact = 1.0 if word == token else 0.5
+                for pk, weight in self.postings[word].items():
+                    scores[pk] += weight * exact
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+_index_lock = threading.Lock()
+_index_cache = {'version': None, 'index': None}
+
+
+def catalog_version():
+    """Version bon marché du catalogue : (nombre de produits, dernière mise à jour)."""
+    stats = Product.objects.aggregate(count=Count('id'), last=Max('updated_at'))
+    return stats['count'], stats['last']
+
+
+def get_index():
+    version = catalog_version()
+    with _index_lock:
+        if _index_cache['version'] != version:
+            rows = Product.objects.values_list('id', 'name', 'description').iterator()
+            _index_cache['index'] = InvertedIndex(rows)
+            _index_cache['version'] = version
+        return _index_cache['index']
+
+
+def _search_in_memory(query, limit, queryset):
+    ranked = get_index().search(query)
+    if not ranked:
+        return []
+    scores = dict(ranked)
+    products = queryset.filter(pk__in=list(scores))
+    results = sorted(products, key=lambda product: (-scores[product.pk], product.pk))[:limit]
+    for product in results:
+        product.rank = scores[product.pk]
+    return results
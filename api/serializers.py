@@ -29,7 +29,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
-    product_price = serializers.DecimalField(source='product.price', read_only=True, max_digits=10, decimal_places=2)
+    product_price = serializers.IntegerField(source='product.price', read_only=True)
     
     class Meta:
         model = OrderItem
@@ -37,17 +37,32 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
-    total_amount = serializers.DecimalField(read_only=True, max_digits=10, decimal_places=2)
+    total_amount = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Order
         fields = ['id', 'user', 'customer_name', 'customer_email', 'customer_phone', 
-                  'items', 'total_amount', 'status', 'notes', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'user', 'total_amount', 'created_at', 'updated_at']
+                  'items', 'total_amount', 'refund_amount', 'status', 'notes', 'pickup_at', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'total_amount', 'refund_amount', 'created_at', 'updated_at']
 
 class ContactMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContactMessage
         fields = ['id', 'user', 'name', 'email', 'phone', 'subject', 'message', 
-                  'status', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+                  'status', 'admin_reponse', 'repondu_le', 'repondu_par', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'admin_reponse', 'repondu_le', 'repondu_par', 'created_at', 'updated_at']
+
+class MesMessagesSerializer(serializers.ModelSerializer):
+    """Fil d'un client : ses messages et les réponses du staff (colonnes de `MES_MESSAGES_FIELDS`)"""
+    est_repondu = serializers.BooleanField(read_only=True)
+    repondu_par_username = serializers.CharField(source='repondu_par.username', read_only=True, default=None)
+
+    class Meta:
+        model = ContactMessage
+        fields = ['id', 'subject', 'message', 'status', 'est_repondu', 'admin_reponse', 'repondu_le',
+                  'repondu_par_username', 'created_at']
+        read_only_fields = fields
+
+# Colonnes lues par MesMessagesSerializer (est_repondu vient de status et admin_reponse)
+MES_MESSAGES_FIELDS = ('id', 'subject', 'message', 'status', 'admin_reponse', 'repondu_le',
+                       'repondu_par__username', 'created_at')
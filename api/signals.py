@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .middleware import invalidate_cached_user
+from .models import CustomerStats, Order, Product
+from .sync import record_deletions
+
+
+@receiver([post_save, post_delete], sender=Product)
+def product_changed(sender, **kwargs):
+    """Toute modification de produit invalide les facettes du catalogue"""
+    bump_catalog_version()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Retirer l'utilisateur du cache d'authentification (is_active, is_staff, mot de passe...)"""
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    """Chaque utilisateur a sa ligne de statistiques : la liste des utilisateurs part de cette table"""
+    if created and not raw:
+        CustomerStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    record_deletions('product', [(instance.pk, None)])
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    record_deletions('order', [(instance.pk, instance.user_id)])
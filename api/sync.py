@@ -0,0 +1,59 @@
+"""
+Synchronisation incrémentale des listes (``?updated_since=<horodatage>``).
+
+Le client garde une copie locale et ne demande que les lignes modifiées
+depuis son dernier passage (`updated_at`, indexé), plus les identifiants
+supprimés entre-temps (table `Tombstone`, alimentée par les signaux
+post_delete ou directement par les suppressions en masse).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Tombstone
+
+TOMBSTONE_RETENTION_DAYS = getattr(settings, 'TOMBSTONE_RETENTION_DAYS', 30)
+
+
+def parse_since(value):
+    """Horodatage ISO 8601 (ou secondes epoch) -> datetime aware, None si invalide."""
+    try:
+        since = datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError):
+        since = parse_datetime(value or '')
+        if since is not None and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    return since
+
+
+def retention_horizon():
+    """Avant cette date, les suppressions ne sont plus garanties : resynchronisation complète."""
+    return timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+
+
+def record_deletions(model_key, objects):
+    """Enregistrer des suppressions : `objects` est une liste de (id, id propriétaire ou None)."""
+    Tombstone.objects.bulk_create([
+        Tombstone(model=model_key, object_id=object_id, owner_id=owner_id)
+        for object_id, owner_id in objects
+    ])
+
+
+def tombstones_since(model_key, since, owner_id=None):
+    tombstones = Tombstone.objects.filter(model=model_key, deleted_at__gte=since)
+    if owner_id is not None:
+        tombstones = tombstones.filter(owner_id=owner_id)
+    return tombstones
+
+
+def deleted_since(model_key, since, owner_id=None):
+    tombstones = tombstones_since(model_key, since, owner_id=owner_id)
+    return sorted(set(tombstones.values_list('object_id', flat=True)))
+
+
+def purge_tombstones():
+    """Supprimer les traces plus anciennes que la période de rétention."""
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=retention_horizon()).delete()
+    return deleted
@@ -1,3 +1,907 @@
-from django.test import TestCase
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.exceptions import ValidationError
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone as dj_timezone
+from rest_framework import serializers
+
+from .data_migrations import (
+    _ensure_checkpoint_table, _write_checkpoint, clear_checkpoint, scale_fields, update_in_chunks,
+)
+from .deletion import DeletionError, archive_old_orders, delete_products, delete_users
+from .fast_serializers import ValuesSerializer
+from .imports import import_products
+from .forecasting import forecast_matrix
+from . import customer_stats, forecasting, idempotency, kitchen, middleware
+from .models import (
+    ArchivedOrder, ContactMessage, CooccurrenceMatrix, CustomerStats, IdempotencyKey, Notification, Order,
+    OrderItem, Product,
+)
+from .ordering import place_order, refund_order
+from .partitions import add_months, delete_read_in_chunks, month_start, partition_name, purge_notifications
+from .recommendations import cooccurrence, recommendations_for, refresh_recommendations, top_neighbours
+from .serializers import (
+    MES_MESSAGES_FIELDS, ContactMessageSerializer, MesMessagesSerializer, OrderSerializer, ProductSerializer,
+)
+from .sync import deleted_since
+from .transitions import transition
+
+
+def values_row(instance, paths):
+    """Simuler une ligne `.values(*paths)` à partir d'une instance en mémoire."""
+    row = {}
+    for path in paths:
+        value = instance
+        parts = path.split('__')
+        for index, part in enumerate(parts):
+            field = value._meta.get_field(part) if part != 'pk' else None
+            if field is not None and field.is_relation and index == len(parts) - 1:
+                value = getattr(value, field.attname)
+            else:
+                value = getattr(value, part)
+        row[path] = value
+    return row
+
+
+def order_data(*lines):
+    """Corps de commande pour `place_order` : `lines` = (produit, quantité)."""
+    return {
+        'customer_name': 'Awa', 'customer_email': 'awa@example.com', 'customer_phone': '770000000',
+        'items': [{'product_id': product.pk, 'quantity': quantity} for product, quantity in lines],
+    }
+
+
+def make_product(name='Éclair', price=1500, stock=10, **kwargs):
+    return Product.objects.create(name=name, description='', price=price, category='patisseries',
+                                  stock=stock, **kwargs)
+
+
+class ValuesSerializerTests(SimpleTestCase):
+    """La sortie rapide des listes doit être identique à celle des serializers."""
+
+    created = datetime(2025, 3, 8, 7, 30, 15, 123456, tzinfo=timezone.utc)
+
+    def product(self, pk, **kwargs):
+        defaults = dict(
+            pk=pk, name=f'Éclair {pk}', description='Au café', price=1500,
+            category='patisseries', stock=4, available=True, image=None,
+            created_at=self.created, updated_at=self.created,
+        )
+        defaults.update(kwargs)
+        return Product(**defaults)
+
+    def test_product_list_matches_serializer(self):
+        products = [self.product(1), self.product(2, price=655, image='https://x.test/a.png')]
+        fast = ValuesSerializer(ProductSerializer)
+        self.assertEqual(
+            [fast.to_representation(values_row(product, fast.paths)) for product in products],
+            ProductSerializer(products, many=True).data,
+        )
+
+    def test_contact_message_list_matches_serializer(self):
+        message = ContactMessage(
+            pk=3, user_id=7, name='Awa', email='awa@example.com', phone='770000000',
+            subject='Commande', message='Bonjour', status='new',
+            created_at=self.created, updated_at=self.created,
+        )
+        fast = ValuesSerializer(ContactMessageSerializer)
+        self.assertEqual(
+            fast.to_representation(values_row(message, fast.paths)),
+            ContactMessageSerializer(message).data,
+        )
+
+    def test_mes_messages_reads_only_selected_columns(self):
+        serializer = ValuesSerializer(MesMessagesSerializer)
+        # est_repondu est calculé à partir de status et admin_reponse
+        self.assertEqual(set(serializer.paths) - {'pk', 'est_repondu'}, set(MES_MESSAGES_FIELDS))
+        message = ContactMessage(pk=4, subject='Commande', message='Bonjour', status='read',
+                                 admin_reponse='Merci', created_at=self.created)
+        self.assertTrue(MesMessagesSerializer(message).data['est_repondu'])
+        self.assertIsNone(MesMessagesSerializer(message).data['repondu_par_username'])
+
+    def test_order_list_with_items_matches_serializer(self):
+        order = Order(
+            pk=5, user_id=7, customer_name='Awa', customer_email='awa@example.com',
+            customer_phone='770000000', status='paid', notes='', total_amount=3500,
+            created_at=self.created, updated_at=self.created,
+        )
+        items = []
+        for pk, product in enumerate([self.product(1), self.product(2, price=2000)], start=10):
+            item = OrderItem(pk=pk, order=order, product=product, quantity=1,
+                             unit_price=product.price, total_price=product.price)
+            items.append(item)
+        # Articles « préchargés » : aucune requête pour order.items.all()
+        queryset = OrderItem.objects.none()
+        queryset._result_cache = items
+        queryset._prefetch_done = True
+        order._prefetched_objects_cache = {'items': queryset}
+
+        fast = ValuesSerializer(OrderSerializer)
+        child, _ = fast.nested['items']
+        nested = {'items': [child.to_representation(values_row(item, child.paths)) for item in items]}
+        self.assertEqual(
+            fast.to_representation(values_row(order, fast.paths), nested),
+            OrderSerializer(order).data,
+        )
+
+    def test_paths_follow_serializer_sources(self):
+        child, fk = ValuesSerializer(OrderSerializer).nested['items']
+        self.assertEqual(fk, 'order_id')
+        self.assertIn('product__name', child.paths)
+        self.assertIn('product__price', child.paths)
+
+
+class MoneyFieldTests(SimpleTestCase):
+    """Les montants FCFA sont des entiers, arrondis au franc."""
+
+    def test_to_python_rounds_half_up(self):
+        field = Product._meta.get_field('price')
+        self.assertEqual(field.to_python('1499.50'), 1500)
+        self.assertEqual(field.to_python(Decimal('1499.49')), 1499)
+        self.assertEqual(field.get_prep_value(Decimal('655.00')), 655)
+
+    def test_invalid_amount(self):
+        with self.assertRaises(ValidationError):
+            Product._meta.get_field('price').to_python('abc')
+
+
+class ForecastMatrixTests(SimpleTestCase):
+    """Prévision vectorisée : une ligne par produit, semaines récentes en premier."""
+
+    def test_moving_average_ignores_unknown_weeks(self):
+        history = np.array([[10.0, 20.0, 30.0], [4.0, np.nan, np.nan], [np.nan, np.nan, np.nan]])
+        forecast, spread = forecast_matrix(history, method='ma')
+        np.testing.assert_allclose(forecast, [20.0, 4.0, 0.0])
+        self.assertEqual(spread[1], 0.0)
+
+    def test_ewma_weights_recent_weeks(self):
+        forecast, _ = forecast_matrix(np.array([[30.0, 10.0, 10.0]]), method='ewma', alpha=0.5)
+        self.assertAlmostEqual(forecast[0], (15 + 2.5 + 1.25) / 0.875)
+
+
+class CooccurrenceTests(SimpleTestCase):
+    """Co-occurrence par produit matriciel et meilleurs voisins par cosinus."""
+
+    def test_counts_orders_containing_both_products(self):
+        # Commandes 1 et 2 : produits 0 et 1 ; commande 3 : produit 0 seul
+        counts = cooccurrence(np.array([1, 1, 2, 2, 3]), np.array([0, 1, 0, 1, 0]), 3)
+        np.testing.assert_array_equal(counts, [[3, 2, 0], [2, 2, 0], [0, 0, 0]])
+
+    def test_top_neighbours_skips_self_and_rare_pairs(self):
+        counts = np.array([[4, 3, 1], [3, 3, 0], [1, 0, 1]])
+        best, scores = top_neighbours(counts, np.array([0, 2]), n=2, min_count=2)
+        self.assertEqual(best[0].tolist(), [1, -1])
+        self.assertAlmostEqual(scores[0, 0], 3 / np.sqrt(12))
+        self.assertEqual(best[1].tolist(), [-1, -1])
+
+
+class RefreshRecommendationsTests(TestCase):
+    """Le rafraîchissement incrémental survit à la suppression d'un produit."""
+
+    def test_deleted_product_is_dropped_from_the_matrix(self):
+        customer = User.objects.create_user('awa')
+        eclair, flan, tarte = make_product('Éclair'), make_product('Flan'), make_product('Tarte')
+        for _ in range(2):
+            place_order(customer, order_data((eclair, 1), (flan, 1), (tarte, 1)))
+        refresh_recommendations()
+        self.assertEqual([row['id'] for row in recommendations_for(eclair.pk)], [flan.pk, tarte.pk])
+
+        Order.objects.update(status='delivered')
+        delete_products([tarte.pk])
+        for _ in range(2):
+            place_order(customer, order_data((eclair, 1), (flan, 1)))
+        refresh_recommendations()
+
+        connection.check_constraints()
+        self.assertEqual([row['id'] for row in recommendations_for(eclair.pk)], [flan.pk])
+        with np.load(io.BytesIO(bytes(CooccurrenceMatrix.objects.get().data))) as arrays:
+            self.assertNotIn(tarte.pk, arrays['product_ids'])
+
+
+    def test_refresh_counts_each_order_once(self):
+        customer = User.objects.create_user('awa')
+        eclair, flan = make_product('Éclair'), make_product('Flan')
+        place_order(customer, order_data((eclair, 1), (flan, 1)))
+        self.assertEqual(refresh_recommendations()['orders'], 1)
+        self.assertEqual(refresh_recommendations()['orders'], 0)
+        with np.load(io.BytesIO(bytes(CooccurrenceMatrix.objects.get().data))) as arrays:
+            self.assertEqual(arrays['counts'].tolist(), [[1, 1], [1, 1]])
+
+
+class PartitionHelpersTests(SimpleTestCase):
+    """Calcul des mois et des noms de partitions (UTC)."""
+
+    def test_month_start_uses_utc(self):
+        evening = datetime(2026, 10, 31, 23, 30, tzinfo=timezone(timedelta(hours=-1)))
+        self.assertEqual(month_start(evening), date(2026, 11, 1))
+        self.assertEqual(month_start(date(2026, 2, 14)), date(2026, 2, 1))
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(add_months(date(2026, 11, 1), 3), date(2027, 2, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(partition_name(date(2026, 3, 1)), 'api_notification_p202603')
+
+
+class NotificationRetentionTests(TestCase):
+    """Sans partitions (SQLite), les notifications lues anciennes partent par tranches."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('awa')
+        old = dj_timezone.now() - timedelta(days=120)
+        for index in range(5):
+            Notification.objects.create(user=self.user, type='commande_statut', message=f'#{index}', est_lue=True)
+        Notification.objects.create(user=self.user, type='commande_statut', message='non lue')
+        Notification.objects.update(created_at=old)
+        Notification.objects.create(user=self.user, type='commande_statut', message='récente', est_lue=True)
+
+    def test_purge_deletes_old_read_notifications_in_chunks(self):
+        report = purge_notifications(days=90, chunk_size=2)
+        self.assertEqual(report, {'dropped_partitions': [], 'dropped': 0, 'deleted': 5})
+        self.assertEqual(
+            sorted(Notification.objects.values_list('message', flat=True)), ['non lue', 'récente'],
+        )
+
+    def test_since_bounds_the_deletion(self):
+        since = dj_timezone.now() - timedelta(days=1)
+        self.assertEqual(delete_read_in_chunks(dj_timezone.now(), since=since, chunk_size=2), 1)
+        self.assertEqual(Notification.objects.count(), 6)
+
+
+class MoneyColumnsTests(TestCase):
+    """Les montants des commandes et des articles sont des francs entiers en base."""
+
+    def test_order_and_line_totals_feed_customer_stats(self):
+        user = User.objects.create_user('awa')
+        order = place_order(user, order_data((make_product(price=Decimal('1250.40')), 3)))
+        item = OrderItem.objects.get(order=order)
+        self.assertEqual((item.unit_price, item.total_price), (1250, 3750))
+        self.assertEqual(Order.objects.get(pk=order.pk).total_amount, 3750)
+        self.assertEqual(Order.items_total(order.pk), 3750)
+
+        customer_stats.rebuild([user.pk])
+        self.assertEqual(CustomerStats.objects.get(user=user).total_spent, 3750)
+
+
+class BatchTests(TestCase):
+    """Un lot exécute chaque sous-requête indépendamment, vues async comprises."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def batch(self, *requests):
+        response = self.client.post('/api/batch/', json.dumps({'requests': list(requests)}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['responses']
+
+    def test_async_views_run_inside_a_batch(self):
+        Notification.objects.create(user=self.staff, type='nouvelle_commande', message='Commande #1')
+        unread, recent = self.batch(
+            {'method': 'GET', 'path': '/api/notifications/unread_count/'},
+            {'method': 'GET', 'path': '/api/notifications/recent/'},
+        )
+        self.assertEqual(unread, {'status': 200, 'headers': {}, 'body': {'count': 1}})
+        self.assertEqual(recent['body'][0]['message'], 'Commande #1')
+
+    def test_failing_sub_request_does_not_abort_the_batch(self):
+        with mock.patch('api.views.kitchen.production_queue', side_effect=RuntimeError('panne')), \
+                self.assertLogs('api.batch', 'ERROR'):
+            failed, products = self.batch(
+                {'method': 'GET', 'path': '/api/kitchen/queue/'},
+                {'method': 'GET', 'path': '/api/products/'},
+            )
+        self.assertEqual(failed['status'], 500)
+        self.assertEqual(products['status'], 200)
+
+
+class CompressionTests(SimpleTestCase):
+    """Seules les données de l'API sont compressées, jamais les pages HTML."""
+
+    def test_html_pages_are_not_compressed(self):
+        from django.http import HttpResponse
+
+        from .compression import _compressible
+
+        self.assertTrue(_compressible(HttpResponse('{}', content_type='application/json')))
+        self.assertTrue(_compressible(HttpResponse('a,b', content_type='text/csv; charset=utf-8')))
+        self.assertFalse(_compressible(HttpResponse('<html></html>')))
+
+
+class AsgiTests(TestCase):
+    """Sous ASGI, les flux restent des flux et la chaîne de middlewares reste async."""
+
+    async def test_export_is_streamed_asynchronously(self):
+        staff = await User.objects.acreate(username='chef', is_staff=True)
+        await self.async_client.aforce_login(staff)
+        response = await self.async_client.get('/api/orders/export/?output=csv')
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertTrue(body.startswith(b'order_id,created_at,status'))
+
+    def test_custom_middleware_is_async_capable(self):
+        from .compression import CompressionMiddleware
+        from .middleware import CachedAuthenticationMiddleware, StaticFilesMiddleware
+
+        async def get_response(request):
+            return None
+
+        for middleware in (CompressionMiddleware, CachedAuthenticationMiddleware, StaticFilesMiddleware):
+            self.assertTrue(middleware.async_capable)
+            self.assertTrue(iscoroutinefunction(middleware(get_response)))
+
+
+class StockReleaseTests(TestCase):
+    """Le stock réservé par une commande revient au catalogue quand elle est annulée ou supprimée."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.client.force_login(self.staff)
+        self.product = make_product(stock=5)
+        self.order = place_order(User.objects.create_user('awa'), order_data((self.product, 3)))
+
+    def stock(self):
+        return Product.objects.values_list('stock', flat=True).get(pk=self.product.pk)
+
+    def test_reservation_fails_when_stock_runs_out(self):
+        with self.assertRaises(serializers.ValidationError):
+            place_order(self.order.user, order_data((self.product, 3)))
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_cancel_releases_stock(self):
+        response = self.client.post(f'/api/orders/{self.order.pk}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(), 5)
+
+    def test_full_update_releases_and_takes_back_stock(self):
+        data = {key: value for key, value in order_data().items() if key != 'items'}
+        for status, stock in (('cancelled', 5), ('pending', 2)):
+            response = self.client.put(f'/api/orders/{self.order.pk}/', json.dumps({**data, 'status': status}),
+                                       content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.stock(), stock)
+
+    def test_bulk_user_deletion_releases_stock(self):
+        place_order(self.order.user, order_data((self.product, 2)))
+        delete_users([self.order.user_id], dry_run=True)
+        self.assertEqual(self.stock(), 0)
+        delete_users([self.order.user_id])
+        self.assertEqual(self.stock(), 5)
+
+    def test_destroy_releases_stock_before_delivery_only(self):
+        delivered = place_order(self.order.user, order_data((self.product, 1)))
+        Order.objects.filter(pk=delivered.pk).update(status='delivered')
+        self.assertEqual(self.client.delete(f'/api/orders/{self.order.pk}/').status_code, 204)
+        self.assertEqual(self.client.delete(f'/api/orders/{delivered.pk}/').status_code, 204)
+        self.assertEqual(self.stock(), 4)
+
+
+class IdempotencyTests(TestCase):
+    """Une requête rejouée avec la même Idempotency-Key renvoie la réponse enregistrée."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('awa'))
+        self.product = make_product(stock=5)
+
+    def post_order(self, key):
+        return self.client.post('/api/orders/', json.dumps(order_data((self.product, 2))),
+                                content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response(self):
+        first = self.post_order('commande-1')
+        replayed = self.post_order('commande-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replayed.status_code, 201)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 3)
+
+    def test_abandoned_claim_is_reclaimed_after_the_lease(self):
+        stale = dj_timezone.now() + timedelta(hours=idempotency.IDEMPOTENCY_KEY_TTL_HOURS,
+                                              seconds=-idempotency.IDEMPOTENCY_LEASE_SECONDS - 1)
+        IdempotencyKey.objects.create(key='a' * 64, request_hash='h', expires_at=stale)
+        self.assertEqual(idempotency.claim('a' * 64, 'h'), (None, True))
+
+        # Une réservation récente reste en cours
+        record, created = idempotency.claim('a' * 64, 'h')
+        self.assertFalse(created)
+        self.assertIsNone(record.status_code)
+
+
+class TransitionTests(TestCase):
+    """Le statut attendu est vérifié par l'UPDATE lui-même."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('chef', is_staff=True))
+        self.customer = User.objects.create_user('awa')
+        self.product = make_product(stock=20)
+
+    def order(self, status='pending'):
+        order = place_order(self.customer, order_data((self.product, 1)))
+        Order.objects.filter(pk=order.pk).update(status=status)
+        return order
+
+    def test_illegal_transition_is_a_conflict(self):
+        order = self.order('delivered')
+        response = self.client.post(f'/api/orders/{order.pk}/update_status/', {'status': 'paid'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['current_status'], 'delivered')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'delivered')
+
+    def test_bulk_transition_skips_orders_in_other_states(self):
+        paid, delivered, cancelled = self.order('paid'), self.order('delivered'), self.order('cancelled')
+        response = self.client.post('/api/orders/bulk_status/', json.dumps({
+            'ids': [paid.pk, delivered.pk, cancelled.pk], 'status': 'ready',
+        }), content_type='application/json')
+        self.assertEqual(response.json(), {'updated': 1, 'requested': 3})
+        self.assertEqual(
+            dict(Order.objects.values_list('pk', 'status')),
+            {paid.pk: 'ready', delivered.pk: 'delivered', cancelled.pk: 'cancelled'},
+        )
+        self.assertEqual(
+            list(Notification.objects.filter(user=self.customer).values_list('type', flat=True)),
+            ['commande_prete'],
+        )
+
+
+class ProductSearchTests(TestCase):
+    """Paramètre `limit` de la recherche : entier, borné entre 1 et 100."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('awa'))
+        make_product('Éclair au café')
+        make_product('Éclair au chocolat')
+
+    def search(self, limit):
+        return self.client.get('/api/products/search/', {'q': 'éclair', 'limit': limit})
+
+    def test_limit_is_clamped(self):
+        for limit in (1, 0, -5):
+            self.assertEqual(len(self.search(limit).json()), 1)
+        self.assertEqual(len(self.search(1000).json()), 2)
+
+    def test_non_integer_limit_is_rejected(self):
+        self.assertEqual(self.search('dix').status_code, 400)
+
+
+class CustomerStatsTests(TestCase):
+    """Les compteurs tenus à jour par deltas égalent un recalcul complet."""
+
+    def stats(self, user):
+        return CustomerStats.objects.filter(user=user).values_list('order_count', 'total_spent').get()
+
+    def test_deltas_match_rebuild(self):
+        user = User.objects.create_user('awa')
+        product = make_product(price=1000)
+        kept, cancelled, refunded = (place_order(user, order_data((product, 2))) for _ in range(3))
+        transition(Order.objects.all(), cancelled.pk, 'cancelled')
+        refund_order(Order.objects.all(), refunded.pk, 500)
+        self.assertEqual(self.stats(user), (2, 3500))
+
+        CustomerStats.objects.all().delete()
+        customer_stats.rebuild([user.pk])
+        self.assertEqual(self.stats(user), (2, 3500))
+
+    def test_users_page_sorts_by_spending(self):
+        product = make_product(price=1000, stock=50)
+        for username, quantity in (('awa', 1), ('binta', 3), ('cheikh', 2)):
+            place_order(User.objects.create_user(username), order_data((product, quantity)))
+        count, results = customer_stats.users_page('-total_spent', search='')
+        self.assertEqual(count, 3)
+        self.assertEqual([row['username'] for row in results], ['binta', 'cheikh', 'awa'])
+
+
+class UserDirectoryTests(TestCase):
+    """Annuaire du staff : recherche et actions en masse, jamais sur les comptes de l'équipe."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('chef', is_staff=True)
+        self.client.force_login(self.staff)
+        self.awa = User.objects.create_user('awa', email='awa@example.com')
+        self.binta = User.objects.create_user('binta', email='binta@example.com')
+        self.colleague = User.objects.create_user('commis', is_staff=True)
+
+    def post(self, path, data):
+        return self.client.post(path, json.dumps(data), content_type='application/json')
+
+    def test_search_by_username_prefix(self):
+        response = self.client.get('/api/users/list/', {'q': 'aw'})
+        self.assertEqual([row['username'] for row in response.json()['results']], ['awa'])
+
+    def test_bulk_deactivate_skips_self(self):
+        response = self.post('/api/users/bulk_active/', {
+            'ids': [self.awa.pk, self.binta.pk, self.staff.pk], 'is_active': False,
+        })
+        self.assertEqual(response.json(), {'updated': 2, 'requested': 3})
+        self.assertEqual(
+            dict(User.objects.values_list('username', 'is_active')),
+            {'chef': True, 'awa': False, 'binta': False, 'commis': True},
+        )
+
+    def test_bulk_delete_dry_run_and_staff_protection(self):
+        ids = [self.awa.pk, self.binta.pk, self.colleague.pk]
+        response = self.post('/api/users/bulk_delete/?dry_run=1', {'ids': ids})
+        self.assertEqual(response.json()['deleted']['users'], 2)
+        self.assertEqual(User.objects.count(), 4)
+
+        response = self.post('/api/users/bulk_delete/', {'ids': ids})
+        self.assertEqual(response.json()['deleted']['users'], 2)
+        self.assertEqual(sorted(User.objects.values_list('username', flat=True)), ['chef', 'commis'])
+
+
+class ArchivalTests(TestCase):
+    """Les commandes terminées passent dans l'archive sans changer l'historique des clients."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('awa')
+        self.product = make_product(name='Flan', price=1000)
+        self.old = place_order(self.user, order_data((self.product, 2)))
+        self.recent = place_order(self.user, order_data((self.product, 1)))
+        Order.objects.update(status='delivered')
+        Order.objects.filter(pk=self.old.pk).update(updated_at=dj_timezone.now() - timedelta(days=400))
+
+    def test_archive_old_orders(self):
+        self.assertEqual(archive_old_orders(days=365, chunk_size=1),
+                         {'archived_orders': 1, 'archived_order_items': 1})
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [self.recent.pk])
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual((archived.pk, archived.user_id, archived.total_amount), (self.old.pk, self.user.pk, 2000))
+        self.assertEqual(
+            list(archived.items.values_list('product_name', 'quantity', 'total_price')), [('Flan', 2, 2000)],
+        )
+        self.assertEqual(deleted_since('order', archived.archived_at, owner_id=self.user.pk), [self.old.pk])
+
+        customer_stats.rebuild([self.user.pk])
+        self.assertEqual(CustomerStats.objects.get(user=self.user).total_spent, 3000)
+
+    def test_product_in_active_order_cannot_be_deleted(self):
+        place_order(self.user, order_data((self.product, 1)))
+        with self.assertRaises(DeletionError):
+            delete_products([self.product.pk])
+        self.assertTrue(Product.objects.filter(pk=self.product.pk).exists())
+
+
+class DataMigrationToolsTests(TestCase):
+    """Mises à jour ensemblistes par tranches, avec reprise après interruption."""
+
+    def setUp(self):
+        self.products = [make_product(name=f'Produit {index}', price=100 * index) for index in range(1, 6)]
+
+    def prices(self):
+        return list(Product.objects.order_by('pk').values_list('price', flat=True))
+
+    def test_scale_fields_in_chunks(self):
+        updated = scale_fields(Product, ['price', 'missing'], 3, chunk_size=2, progress=None)
+        self.assertEqual(updated, 5)
+        self.assertEqual(self.prices(), [300, 600, 900, 1200, 1500])
+
+    def test_resumes_after_the_checkpoint(self):
+        # Interrompue après les deux premiers produits
+        _ensure_checkpoint_table(connection)
+        _write_checkpoint(connection, 'test:Product', self.products[1].pk)
+        updated = update_in_chunks(Product, {'price': F('price') + 1}, checkpoint='test:Product',
+                                   chunk_size=2, progress=None)
+        self.assertEqual(updated, 3)
+        self.assertEqual(self.prices(), [100, 200, 301, 401, 501])
+        clear_checkpoint(connection, 'test:Product')
+
+
+class ExportTests(TestCase):
+    """Export comptable : une ligne CSV par article, un objet NDJSON par commande."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('chef', is_staff=True))
+        customer = User.objects.create_user('awa')
+        self.flan, self.tarte = make_product('Flan', price=1000), make_product('Tarte', price=2500)
+        self.order = place_order(customer, order_data((self.flan, 2), (self.tarte, 1)))
+        cancelled = place_order(customer, order_data((self.flan, 1)))
+        Order.objects.filter(pk=cancelled.pk).update(status='cancelled')
+
+    def export(self, **params):
+        response = self.client.get('/api/orders/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_one_row_per_item(self):
+        lines = self.export(output='csv', status='pending').splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['order_id', 'created_at', 'status'])
+        self.assertEqual(
+            [line.split(',')[-4:] for line in lines[1:]],
+            [['Flan', '2', '1000', '2000'], ['Tarte', '1', '2500', '2500']],
+        )
+
+    def test_ndjson_groups_items_by_order(self):
+        orders = [json.loads(line) for line in self.export(output='ndjson').splitlines()]
+        self.assertEqual([order['status'] for order in orders], ['pending', 'cancelled'])
+        self.assertEqual(orders[0]['total_amount'], 4500)
+        self.assertEqual(
+            [(item['product_name'], item['total_price']) for item in orders[0]['items']],
+            [('Flan', 2000), ('Tarte', 2500)],
+        )
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get('/api/orders/export/', {'output': 'xlsx'}).status_code, 400)
+
+
+class ProductImportTests(TestCase):
+    """Import du catalogue : simulation sans écriture, puis upsert par id ou par nom."""
+
+    CSV = (
+        'id,name,description,price,category,stock,available\n'
+        ',Flan,Flan pâtissier,1200,patisseries,8,true\n'
+        ',Tarte au citron,Citron meringué,2500,patisseries,4,true\n'
+    )
+
+    def setUp(self):
+        self.flan = make_product('Flan', price=1000, stock=3)
+
+    def test_dry_run_reports_without_writing(self):
+        report = import_products(io.StringIO(self.CSV), 'csv', dry_run=True)
+        self.assertEqual((report['created'], report['updated']), (1, 1))
+        self.assertEqual(report['diff'][0]['changes']['price'], [1000, 1200])
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(Product.objects.get().price, 1000)
+
+    def test_upsert_by_name_and_id(self):
+        report = import_products(io.StringIO(self.CSV), 'csv')
+        self.assertEqual((report['created'], report['updated'], report['errors']), (1, 1, []))
+        self.assertEqual(
+            sorted(Product.objects.values_list('name', 'price', 'stock')),
+            [('Flan', 1200, 8), ('Tarte au citron', 2500, 4)],
+        )
+
+        rows = [{'id': self.flan.pk, 'name': 'Flan', 'description': 'Flan pâtissier', 'price': 1300,
+                 'category': 'patisseries'}]
+        report = import_products(io.StringIO(json.dumps(rows)), 'json')
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(Product.objects.values_list('price', 'stock').get(pk=self.flan.pk), (1300, 8))
+
+    def test_name_match_ignores_case(self):
+        rows = [{'name': 'flan', 'description': 'Flan nature', 'price': 1100, 'category': 'patisseries'}]
+        report = import_products(io.StringIO(json.dumps(rows)), 'json')
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        self.assertEqual(Product.objects.values_list('pk', 'price').get(), (self.flan.pk, 1100))
+
+    def test_any_error_rolls_back_the_whole_file(self):
+        rows = [
+            {'name': 'Chouquette', 'description': 'Sucre perlé', 'price': 500, 'category': 'viennoiseries'},
+            {'name': 'Sans prix', 'description': '', 'category': 'viennoiseries'},
+        ]
+        report = import_products(io.StringIO(json.dumps(rows)), 'json')
+        self.assertEqual([error['line'] for error in report['errors']], [2])
+        self.assertFalse(Product.objects.filter(name='Chouquette').exists())
+
+
+class CachedAuthenticationTests(TestCase):
+    """Une modification faite dans un autre worker invalide la copie locale de l'utilisateur."""
+
+    def test_change_in_another_worker_is_seen(self):
+        staff = User.objects.create_user('chef', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/api/users/list/').status_code, 200)
+
+        # Autre worker : la ligne change et seul le tampon partagé est modifié
+        User.objects.filter(pk=staff.pk).update(is_staff=False)
+        middleware._bump_version(staff.pk)
+        self.assertEqual(self.client.get('/api/users/list/').status_code, 403)
+
+
+class KitchenQueueTests(TestCase):
+    """File de production groupée par produit et reprise du flux SSE."""
+
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user('awa')
+        self.flan, self.tarte = make_product('Flan'), make_product('Tarte')
+
+    def place(self, *lines):
+        with self.captureOnCommitCallbacks(execute=True):
+            return place_order(self.customer, order_data(*lines))
+
+    def test_queue_groups_active_orders_by_product(self):
+        self.place((self.flan, 2))
+        paid = self.place((self.flan, 1))
+        cancelled = self.place((self.tarte, 4))
+        Order.objects.filter(pk=paid.pk).update(status='paid')
+        Order.objects.filter(pk=cancelled.pk).update(status='cancelled')
+
+        queue = kitchen.production_queue()
+        self.assertEqual([(row['product_id'], row['quantity'], row['orders']) for row in queue],
+                         [(self.flan.pk, 3, 2)])
+        self.assertEqual(kitchen.queue_rows([self.tarte.pk])[0]['quantity'], 0)
+
+    def test_events_are_numbered_in_order(self):
+        start = kitchen.kitchen_version()
+        self.place((self.flan, 2))
+        self.place((self.tarte, 1))
+        current = kitchen.kitchen_version()
+        self.assertEqual(current, start + 2)
+        rows = kitchen.events_since(start, current)
+        self.assertEqual([row['product_id'] for row in rows], [self.flan.pk, self.tarte.pk])
+        self.assertEqual(kitchen.events_since(current, current), [])
+
+    def test_unknown_or_missing_events_require_a_snapshot(self):
+        self.place((self.flan, 2))
+        current = kitchen.kitchen_version()
+        self.assertIsNone(kitchen.events_since(current + 5, current))
+        cache.delete(f'kitchen:event:{current}')
+        self.assertIsNone(kitchen.events_since(current - 1, current))
+
+    def test_version_survives_a_cache_flush(self):
+        self.place((self.flan, 2))
+        current = kitchen.kitchen_version()
+        cache.clear()
+        self.assertEqual(kitchen.kitchen_version(), current)
+
+
+class KitchenStreamTests(TestCase):
+    """Le flux envoie la file complète si le numéro du client est inconnu."""
+
+    async def stream(self, last_event_id):
+        staff = await User.objects.acreate(username='chef', is_staff=True)
+        await self.async_client.aforce_login(staff)
+        with mock.patch('api.views.KITCHEN_STREAM_DURATION', 0):
+            response = await self.async_client.get('/api/kitchen/stream/',
+                                                   headers={'Last-Event-ID': str(last_event_id)})
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+    async def test_future_event_id_gets_a_snapshot(self):
+        await sync_to_async(cache.clear)()
+        self.assertTrue((await self.stream(99)).startswith('event: snapshot\nid: 0\n'))
+
+    async def test_up_to_date_client_gets_nothing(self):
+        await sync_to_async(cache.clear)()
+        self.assertEqual(await self.stream(0), '')
+
+
+class StockForecastViewTests(TestCase):
+    """Paramètres de la prévision validés avant tout calcul."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('chef', is_staff=True))
+        make_product('Flan')
+
+    def forecast(self, **params):
+        return self.client.get('/api/kitchen/forecast/', params)
+
+    def test_target_beyond_the_horizon_is_rejected(self):
+        far = dj_timezone.localdate() + timedelta(days=120)
+        response = self.forecast(date=far.isoformat())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('jours après aujourd', response.json()['error'])
+
+        last = dj_timezone.localdate() + timedelta(days=forecasting.MAX_HORIZON_DAYS)
+        response = self.forecast(date=last.isoformat(), weeks=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['suggested_stock'], 0)
+
+    def test_invalid_safety_is_rejected(self):
+        for safety in ('-1', 'nan', 'inf'):
+            self.assertEqual(self.forecast(safety=safety).status_code, 400)
+
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """orjson doit produire exactement le JSON de DRF."""
+
+    def test_orjson_output_matches_drf(self):
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer, orjson
+        if orjson is None:
+            self.skipTest("orjson n'est pas installé")
+        data = {
+            'created_at': datetime(2025, 3, 1, 8, 30, 15, 123456, tzinfo=timezone.utc),
+            'pickup_at': datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc),
+            'day': date(2025, 3, 1),
+            'price': Decimal('12.50'),
+            'note': 'ligne suivante',
+        }
+        with self.settings(JSON_BACKEND='orjson'):
+            fast = FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(data)))
+        self.assertIn(b'"2025-03-01T12:00:00Z"', fast)
+
+
+class DeltaSyncTests(TestCase):
+    """?updated_since= : lignes modifiées, suppressions et resynchronisation complète."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.kept = make_product('Flan')
+        self.gone = make_product('Baba')
+        self.since = dj_timezone.now()
+
+    def delta(self, since=None, **headers):
+        since = since or self.since
+        return self.client.get('/api/products/', {'updated_since': since.isoformat()}, headers=headers)
+
+    def test_changes_and_deletions_since(self):
+        Product.objects.filter(pk=self.kept.pk).update(stock=3, updated_at=dj_timezone.now())
+        gone_id = self.gone.pk
+        self.gone.delete()
+        body = self.delta().json()
+        self.assertEqual([row['id'] for row in body['results']], [self.kept.pk])
+        self.assertEqual(body['deleted'], [gone_id])
+        self.assertFalse(body['reset'])
+
+    def test_since_older_than_retention_resets(self):
+        body = self.delta(self.since - timedelta(days=365)).json()
+        self.assertTrue(body['reset'])
+        self.assertEqual(body['deleted'], [])
+        self.assertEqual(len(body['results']), 2)
+
+    def test_deletion_changes_the_delta_etag(self):
+        etag = self.delta()['ETag']
+        self.assertEqual(self.delta(**{'If-None-Match': etag}).status_code, 304)
+        gone_id = self.gone.pk
+        self.gone.delete()
+        response = self.delta(**{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted'], [gone_id])
+
+
+class ConditionalGetTests(TestCase):
+    """304 sur If-None-Match et If-Modified-Since tant que rien ne change."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.product = make_product('Flan')
+
+    def test_if_none_match(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        again = self.client.get('/api/products/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+        make_product('Baba')
+        self.assertEqual(self.client.get('/api/products/', headers={'If-None-Match': response['ETag']}).status_code, 200)
+
+    def test_if_modified_since(self):
+        url = f'/api/products/{self.product.pk}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': last_modified}).status_code, 304)
+        Product.objects.filter(pk=self.product.pk).update(updated_at=dj_timezone.now() + timedelta(minutes=1))
+        self.assertEqual(self.client.get(url, headers={'If-Modified-Since': last_modified}).status_code, 200)
+
+
+class SparseFieldsTests(TestCase):
+    """?fields= et ?expand= : champs demandés seulement, noms inconnus refusés."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        self.product = make_product('Flan')
+
+    def test_fields_restrict_the_output(self):
+        rows = self.client.get('/api/products/', {'fields': 'id,name'}).json()
+        self.assertEqual(rows, [{'id': self.product.pk, 'name': 'Flan'}])
+        detail = self.client.get(f'/api/products/{self.product.pk}/', {'fields': 'stock'}).json()
+        self.assertEqual(detail, {'stock': 10})
+
+    def test_expand_adds_nested_items(self):
+        order = place_order(User.objects.get(username='admin'), order_data((self.product, 2)))
+        rows = self.client.get('/api/orders/', {'fields': 'id', 'expand': 'items'}).json()
+        self.assertEqual(set(rows[0]), {'id', 'items'})
+        self.assertEqual(rows[0]['id'], order.pk)
+        self.assertEqual(rows[0]['items'][0]['quantity'], 2)
+
+    def test_unknown_names_are_rejected(self):
+        response = self.client.get('/api/products/', {'fields': 'id,bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bogus', response.json()['fields'])
+        response = self.client.get('/api/orders/', {'expand': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('bogus', response.json()['expand'])
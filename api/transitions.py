@@ -0,0 +1,156 @@
+"""
+Transitions de statut des commandes.
+
+Le cycle de vie suit `Order.STATUS_CHOICES` :
+
+    pending -> paid -> ready -> delivered
+       \\         \\
+        +---------+-> cancelled
+
+Une transition est un ``UPDATE ... SET status = <cible> WHERE id = ... AND
+status IN (<statuts d'origine autorisés>)`` : la base valide l'état courant
+au moment de l'écriture, sans lecture préalable. Deux guichets qui
+changent la même commande en même temps ne peuvent donc pas écraser l'un
+l'autre ; le perdant reçoit un conflit. La variante en masse marque des
+dizaines de commandes en une seule requête. Une annulation rend le stock
+réservé dans la même transaction.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import customer_stats, kitchen
+from .models import Notification, Order
+from .ordering import release_stock
+
+TRANSITIONS = {
+    'pending': {'paid', 'cancelled'},
+    'paid': {'ready', 'cancelled'},
+    'ready': {'delivered'},
+    'delivered': set(),
+    'cancelled': set(),
+}
+STATUSES = [code for code, _ in Order.STATUS_CHOICES]
+# Statuts cibles autorisés pour le marquage en masse (rush du matin)
+BULK_TARGETS = {'ready', 'delivered'}
+MAX_BULK_SIZE = 500
+
+# Notification envoyée au client pour chaque statut atteint
+NOTIFICATIONS = {
+    'paid': ('commande_statut', "Votre commande #{id} est confirmée."),
+    'ready': ('commande_prete', "Votre commande #{id} est prête."),
+    'delivered': ('commande_livree', "Votre commande #{id} a été livrée."),
+    'cancelled': ('commande_annulee', "Votre commande #{id} a été annulée."),
+}
+
+
+class TransitionError(ValueError):
+    """Transition refusée : statut inconnu, interdit, ou commande déjà changée."""
+
+    def __init__(self, message, status=400, current=None):
+        super().__init__(message)
+        self.status = status
+        self.current = current
+
+
+def sources_for(target):
+    """Statuts depuis lesquels `target` est atteignable."""
+    if target not in TRANSITIONS:
+        raise TransitionError(f"Statut inconnu : {target}")
+    return {source for source, targets in TRANSITIONS.items() if target in targets}
+
+
+def _allowed_sources(target, expected):
+    sources = sources_for(target)
+    if expected is None:
+        if not sources:
+            raise TransitionError(f"Aucune commande ne peut passer au statut {target}")
+        return sources
+    if expected not in TRANSITIONS:
+        raise TransitionError(f"Statut inconnu : {expected}")
+    if expected not in sources:
+        raise TransitionError(f"Transition interdite : {expected} -> {target}")
+    return {expected}
+
+
+def _notify(rows, target):
+    """Notifier les clients : `rows` est une liste de (id commande, id utilisateur)."""
+    if target not in NOTIFICATIONS:
+        return
+    kind, template = NOTIFICATIONS[target]
+    Notification.objects.bulk_create([
+        Notification(user_id=user_id, type=kind, message=template.format(id=order_id),
+                     lien=f'/client/?order={order_id}')
+        for order_id, user_id in rows
+    ])
+
+
+def _update_kitchen(rows, target):
+    """Les commandes qui quittent « en attente / payée » sortent de la file de production."""
+    if target not in kitchen.ACTIVE_STATUSES:
+        kitchen.publish(kitchen.products_of_orders([order_id for order_id, _ in rows]))
+
+
+def _update_stock(rows, target):
+    # Seules les commandes en attente ou payées s'annulent : leur stock est encore réservé
+    if target == 'cancelled':
+        release_stock([order_id for order_id, _ in rows])
+
+
+def _update_customer_stats(rows, target):
+    if target == 'cancelled':
+        customer_stats.orders_cancelled([order_id for order_id, _ in rows])
+
+
+def transition(queryset, pk, target, expected=None):
+    """
+    Passer la commande `pk` (prise dans `queryset`, déjà restreint aux
+    commandes visibles) au statut `target`.
+
+    Si `expected` est donné, la commande doit être dans ce statut ; sinon
+    n'importe quel statut d'origine autorisé convient. Lève TransitionError
+    (404 ou 409) si rien n'a été mis à jour.
+    """
+    sources = _allowed_sources(target, expected)
+    now = timezone.now()
+    with transaction.atomic():
+        updated = queryset.filter(pk=pk, status__in=sources).update(status=target, updated_at=now)
+        if updated:
+            rows = list(queryset.filter(pk=pk).values_list('pk', 'user_id'))
+            _notify(rows, target)
+            _update_stock(rows, target)
+            _update_kitchen(rows, target)
+            _update_customer_stats(rows, target)
+            return updated
+
+    # Échec : on lit le statut courant uniquement pour expliquer le refus
+    current = queryset.filter(pk=pk).values_list('status', flat=True).first()
+    if current is None:
+        raise TransitionError("Commande introuvable", status=404)
+    raise TransitionError(
+        f"La commande est « {current} » : passage à « {target} » impossible",
+        status=409, current=current,
+    )
+
+
+def bulk_transition(queryset, ids, target, expected=None):
+    """
+    Passer toutes les commandes `ids` au statut `target` en un seul UPDATE.
+    Les commandes qui ne sont pas dans un statut d'origine autorisé sont
+    laissées telles quelles. Retourne le nombre de commandes mises à jour.
+    """
+    if target not in BULK_TARGETS:
+        raise TransitionError(f"Statut non autorisé en masse : {target}")
+    if len(ids) > MAX_BULK_SIZE:
+        raise TransitionError(f"{MAX_BULK_SIZE} commandes au maximum par appel")
+    sources = _allowed_sources(target, expected)
+    now = timezone.now()
+    with transaction.atomic():
+        updated = queryset.filter(pk__in=ids, status__in=sources).update(status=target, updated_at=now)
+        if updated:
+            # Les lignes changées portent exactement l'horodatage de cet UPDATE
+            rows = list(queryset.filter(pk__in=ids, status=target, updated_at=now).values_list('pk', 'user_id'))
+            _notify(rows, target)
+            _update_stock(rows, target)
+            _update_kitchen(rows, target)
+            _update_customer_stats(rows, target)
+    return updated
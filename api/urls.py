@@ -13,6 +13,7 @@ urlpatterns = [
     # API REST
     path('api/products/', views.ProductViewSet.as_view({'get': 'list', 'post': 'create'}), name='product-list'),
     path('api/products/<int:pk>/', views.ProductViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='product-detail'),
+    path('api/products/<int:pk>/recommendations/', views.ProductViewSet.as_view({'get': 'recommendations'}), name='product-recommendations'),
     path('api/orders/', views.OrderViewSet.as_view({'get': 'list', 'post': 'create'}), name='order-list'),
     path('api/orders/<int:pk>/', views.OrderViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='order-detail'),
     path('api/contact/', views.ContactMessageViewSet.as_view({'get': 'list', 'post': 'create'}), name='contact-list'),
@@ -20,9 +21,37 @@ urlpatterns = [
     
     # Endpoints supplémentaires
     path('api/users/list/', views.users_list, name='users-list'),
+    path('api/users/bulk_active/', views.users_bulk_active, name='users-bulk-active'),
+    path('api/users/bulk_delete/', views.users_bulk_delete, name='users-bulk-delete'),
+    path('api/users/<int:pk>/toggle-active/', views.user_toggle_active, name='user-toggle-active'),
+    path('api/users/<int:pk>/delete/', views.user_delete, name='user-delete'),
     path('api/contact/mes_messages/', views.mes_messages, name='mes-messages'),
+    path('api/contact/unread/', views.ContactMessageViewSet.as_view({'get': 'unread'}), name='contact-unread'),
+    path('api/contact/unread_count/', views.ContactMessageViewSet.as_view({'get': 'unread_count'}), name='contact-unread-count'),
+    path('api/contact/<int:pk>/mark_as_read/', views.ContactMessageViewSet.as_view({'post': 'mark_as_read'}), name='contact-mark-as-read'),
+    path('api/contact/<int:pk>/mark_as_replied/', views.ContactMessageViewSet.as_view({'post': 'mark_as_replied'}), name='contact-mark-as-replied'),
+    path('api/contact/<int:pk>/reply/', views.ContactMessageViewSet.as_view({'post': 'reply'}), name='contact-reply'),
+    path('api/orders/export/', views.orders_export, name='orders-export'),
+    path('api/orders/<int:pk>/update_status/', views.OrderViewSet.as_view({'post': 'update_status'}), name='order-update-status'),
+    path('api/orders/<int:pk>/confirm/', views.OrderViewSet.as_view({'post': 'confirm'}), name='order-confirm'),
+    path('api/orders/<int:pk>/cancel/', views.OrderViewSet.as_view({'post': 'cancel'}), name='order-cancel'),
+    path('api/orders/<int:pk>/refund/', views.OrderViewSet.as_view({'post': 'refund'}), name='order-refund'),
+    path('api/orders/bulk_status/', views.OrderViewSet.as_view({'post': 'bulk_status'}), name='order-bulk-status'),
+    path('api/products/import/', views.products_import, name='products-import'),
+    path('api/products/search/', views.products_search, name='products-search'),
+    path('api/products/catalog/', views.products_catalog, name='products-catalog'),
+    
+    # Appels groupés
+    path('api/batch/', views.batch, name='batch'),
+    
+    # File de production de la cuisine
+    path('api/kitchen/queue/', views.kitchen_queue, name='kitchen-queue'),
+    path('api/kitchen/stream/', views.kitchen_stream, name='kitchen-stream'),
+    path('api/kitchen/forecast/', views.stock_forecast, name='stock-forecast'),
     
     # Notifications
     path('api/notifications/recent/', views.notifications_recent, name='notifications-recent'),
     path('api/notifications/unread_count/', views.notifications_unread_count, name='notifications-unread-count'),
+    path('api/notifications/<int:pk>/mark_as_read/', views.notification_mark_as_read, name='notification-mark-as-read'),
+    path('api/notifications/mark_all_as_read/', views.notifications_mark_all_as_read, name='notifications-mark-all-as-read'),
 ]
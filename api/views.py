@@ -1,12 +1,41 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
-from .models import Product, Order, ContactMessage
-from .serializers import ProductSerializer, OrderSerializer, ContactMessageSerializer
+from .models import Product, Order, ContactMessage, Notification
+from .serializers import (
+    MES_MESSAGES_FIELDS, ProductSerializer, OrderSerializer, ContactMessageSerializer, MesMessagesSerializer,
+)
+from .exports import EXPORT_FORMATS, aiter_chunks, export_orders
+from .imports import ImportFormatError, guess_format, import_products
+from .search import SEARCH_LIMIT, search_products
+from . import catalog, customer_stats, forecasting, inbox, kitchen
+from .recommendations import recommendations_for
+from .fast_serializers import values_serializer_for
+from .mixins import ConditionalGetMixin, DeltaSyncMixin, ValuesListMixin
+from .batch import BatchError, parse_batch, run_batch
+from .transitions import TransitionError, bulk_transition, transition
+from .idempotency import idempotent
+from .ordering import (
+    STOCK_HELD_STATUSES, place_order, refund_order, release_stock, stock_after_status_change,
+)
+from .deletion import MAX_BULK_USERS, DeletionError, delete_products, delete_users
+from .middleware import invalidate_cached_user
 
 # Vues pour les pages web
 def home(request):
@@ -65,8 +94,12 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, DeltaSyncMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
+    sync_model = 'order'
+    sync_owner_field = 'user'
+    # Les articles affichent le nom et le prix du produit
+    conditional_dependencies = ('items__product__updated_at',)
     
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -74,7 +107,97 @@ class OrderViewSet(viewsets.ModelViewSet):
         else:
             return Order.objects.filter(user=self.request.user)
 
-class ContactMessageViewSet(viewsets.ModelViewSet):
+    def perform_update(self, serializer):
+        # Une modification complète (PUT) peut changer le statut : stock, file de
+        # cuisine et compteurs du client à jour
+        with transaction.atomic():
+            # Statut relu sous verrou : une transition concurrente ne rend pas le stock deux fois
+            previous = (
+                Order.objects.select_for_update()
+                .values_list('status', flat=True).get(pk=serializer.instance.pk)
+            )
+            order = serializer.save()
+            stock_after_status_change(order.pk, previous, order.status)
+            customer_stats.rebuild([order.user_id])
+        kitchen.publish(kitchen.products_of_orders([order.pk]))
+
+    def perform_destroy(self, instance):
+        products = kitchen.products_of_orders([instance.pk])
+        with transaction.atomic():
+            if Order.objects.select_for_update().filter(pk=instance.pk, status__in=STOCK_HELD_STATUSES).exists():
+                release_stock([instance.pk])
+            instance.delete()
+            customer_stats.rebuild([instance.user_id])
+        kitchen.publish(products)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """Passer une commande : coordonnées du client + items [{product_id, quantity}]"""
+        order = place_order(request.user, request.data)
+        return Response(self.get_serializer(order).data, status=status.HTTP_201_CREATED)
+
+    def _transition(self, pk, target, expected=None):
+        try:
+            transition(self.get_queryset(), pk, target, expected)
+        except TransitionError as exc:
+            error = {'error': str(exc)}
+            if exc.current:
+                error['current_status'] = exc.current
+            return Response(error, status=exc.status)
+        return Response(self.get_serializer(self.get_queryset().get(pk=pk)).data)
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def update_status(self, request, pk=None):
+        """Changer le statut ({"status": ..., "expected": statut attendu optionnel})"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        target = request.data.get('status')
+        if not target:
+            return Response({'error': 'Champ "status" manquant'}, status=400)
+        return self._transition(pk, target, request.data.get('expected') or None)
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def confirm(self, request, pk=None):
+        """Confirmer (payer) une commande en attente"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        return self._transition(pk, 'paid', 'pending')
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def cancel(self, request, pk=None):
+        """Annuler une commande (un client ne peut annuler que si elle est en attente)"""
+        expected = None if request.user.is_staff else 'pending'
+        return self._transition(pk, 'cancelled', expected)
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def refund(self, request, pk=None):
+        """Rembourser tout ou partie d'une commande ({"amount": montant en FCFA})"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        order = refund_order(self.get_queryset(), pk, request.data.get('amount'))
+        return Response(self.get_serializer(order).data)
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def bulk_status(self, request):
+        """Marquer plusieurs commandes prêtes ou livrées : {"ids": [...], "status": "ready"}"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            return Response({'error': '"ids" doit être une liste d\'identifiants'}, status=400)
+        try:
+            updated = bulk_transition(self.get_queryset(), ids, request.data.get('status'),
+                                      request.data.get('expected') or None)
+        except TransitionError as exc:
+            return Response({'error': str(exc)}, status=exc.status)
+        return Response({'updated': updated, 'requested': len(set(ids))})
+
+class ContactMessageViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = ContactMessageSerializer
     
     def get_queryset(self):
@@ -83,6 +206,68 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
         else:
             return ContactMessage.objects.filter(user=self.request.user)
 
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            message = serializer.save(user=self.request.user)
+            inbox.message_received(message)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        inbox.unread_changed()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        inbox.unread_changed()
+
+    @action(detail=False, methods=['get'])
+    def unread(self, request):
+        """Messages non lus, les plus anciens d'abord (le total est dans X-Unread-Count)"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        response = Response(values_serializer_for(ContactMessageSerializer).serialize(inbox.unread_messages()))
+        response['X-Unread-Count'] = inbox.unread_count()
+        return response
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        """Nombre de messages non lus, depuis le compteur en cache"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        return Response({'count': inbox.unread_count()})
+
+    def _updated(self, pk, done, conflict):
+        # L'UPDATE conditionnel n'a rien modifié : message absent ou dans un autre état
+        message = self.get_queryset().filter(pk=pk).first()
+        if message is None:
+            return Response({'error': 'Message introuvable'}, status=404)
+        if not done:
+            return Response({'error': conflict, 'current_status': message.status}, status=409)
+        return Response(self.get_serializer(message).data)
+
+    @action(detail=True, methods=['post'])
+    def mark_as_read(self, request, pk=None):
+        """Marquer un message nouveau comme lu"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        return self._updated(pk, inbox.mark_as_read(pk), "Le message n'est plus nouveau")
+
+    @action(detail=True, methods=['post'])
+    def mark_as_replied(self, request, pk=None):
+        """Marquer un message comme répondu (réponse donnée hors de l'application)"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        return self._updated(pk, inbox.mark_as_replied(pk), 'Le message est déjà répondu ou fermé')
+
+    @action(detail=True, methods=['post'])
+    def reply(self, request, pk=None):
+        """Répondre à un message ({"reponse": ...}) : la réponse est enregistrée et le client notifié"""
+        if not request.user.is_staff:
+            return Response({'error': 'Accès non autorisé'}, status=403)
+        reponse = str(request.data.get('reponse') or '').strip()
+        if not reponse:
+            return Response({'error': 'Champ "reponse" manquant'}, status=400)
+        return self._updated(pk, inbox.reply(pk, request.user, reponse), 'Le message est fermé')
+
 # Vues individuelles pour compatibilité
 class ProductList(viewsets.ModelViewSet):
     queryset = Product.objects.all()
@@ -129,34 +314,388 @@ class ContactMessageDetail(viewsets.ModelViewSet):
             return ContactMessage.objects.filter(user=self.request.user)
 
 # Vues pour les notifications
-@api_view(['GET'])
-def notifications_recent(request):
+# Vues async natives (ORM async) : sous un worker ASGI, les sondages toutes les
+# 30 secondes et l'attente longue (?wait=) n'immobilisent pas de processus.
+NOTIFICATIONS_RECENT_LIMIT = 20
+# Fenêtre des notifications récentes : sur PostgreSQL, seules les partitions
+# mensuelles de cette période sont lues
+NOTIFICATIONS_RECENT_DAYS = 30
+NOTIFICATIONS_MAX_WAIT = 30
+NOTIFICATIONS_POLL_INTERVAL = 2
+
+async def notifications_recent(request):
     """Récupérer les notifications récentes"""
-    notifications = []
-    return Response(notifications)
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Méthode non autorisée'}, status=405)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse([], safe=False)
+
+    rows = (
+        Notification.objects
+        .filter(user_id=user.pk, created_at__gte=timezone.now() - timedelta(days=NOTIFICATIONS_RECENT_DAYS))
+        .order_by('-created_at')
+        .values('id', 'type', 'message', 'lien', 'est_lue', 'created_at')[:NOTIFICATIONS_RECENT_LIMIT]
+    )
+    notifications = [row async for row in rows]
+    return JsonResponse(notifications, safe=False)
 
+async def notifications_unread_count(request):
+    """Compter les notifications non lues (?wait=<s>&count=<n> : attendre un changement)"""
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Méthode non autorisée'}, status=405)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'count': 0})
+
+    unread = Notification.objects.filter(user_id=user.pk, est_lue=False)
+    count = await unread.acount()
+    try:
+        wait = min(float(request.GET.get('wait', 0)), NOTIFICATIONS_MAX_WAIT)
+        known = int(request.GET['count']) if 'count' in request.GET else None
+    except ValueError:
+        return JsonResponse({'error': 'wait et count doivent être numériques'}, status=400)
+
+    # Attente longue : répondre dès que le compteur diffère de celui connu du client
+    deadline = time.monotonic() + wait
+    while known is not None and count == known and time.monotonic() < deadline:
+        await asyncio.sleep(NOTIFICATIONS_POLL_INTERVAL)
+        count = await unread.acount()
+    return JsonResponse({'count': count})
+
+async def notification_mark_as_read(request, pk):
+    """Marquer une notification comme lue (un UPDATE conditionnel)"""
+    if request.method != 'POST':
+        return JsonResponse({'detail': 'Méthode non autorisée'}, status=405)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentification requise'}, status=401)
+    mine = Notification.objects.filter(pk=pk, user_id=user.pk)
+    if not await mine.filter(est_lue=False).aupdate(est_lue=True) and not await mine.aexists():
+        return JsonResponse({'error': 'Notification introuvable'}, status=404)
+    return JsonResponse({'id': pk, 'est_lue': True})
+
+async def notifications_mark_all_as_read(request):
+    """Marquer toutes ses notifications comme lues"""
+    if request.method != 'POST':
+        return JsonResponse({'detail': 'Méthode non autorisée'}, status=405)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentification requise'}, status=401)
+    updated = await Notification.objects.filter(user_id=user.pk, est_lue=False).aupdate(est_lue=True)
+    return JsonResponse({'updated': updated})
+
+# File de production de la cuisine
+KITCHEN_POLL_INTERVAL = 1
+KITCHEN_HEARTBEAT = 15
+KITCHEN_STREAM_DURATION = 5 * 60
+
+@api_view(['GET'])
+def kitchen_queue(request):
+    """Produits à préparer (commandes en attente / payées), triés par heure de retrait"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+    version = kitchen.kitchen_version()
+    return Response({'version': version, 'results': kitchen.production_queue()})
+
+def _sse(event, version, data):
+    return f'event: {event}\nid: {version}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+async def kitchen_stream(request):
+    """
+    Flux SSE pour les écrans de cuisine : la file complète à la connexion
+    (évènement « snapshot »), puis les lignes des produits modifiés
+    (« update »). EventSource renvoie Last-Event-ID à la reconnexion, ce qui
+    reprend le flux sans recharger la file.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': 'Méthode non autorisée'}, status=405)
+    user = await request.auser()
+    if not user.is_staff:
+        return JsonResponse({'error': 'Accès non autorisé'}, status=403)
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.GET.get('since', ''))
+    except ValueError:
+        since = None
+
+    async def events():
+        version = await sync_to_async(kitchen.kitchen_version)()
+        rows = None
+        if since is not None:
+            rows = await sync_to_async(kitchen.events_since)(since, version)
+        if rows is None:
+            rows = await sync_to_async(kitchen.production_queue)()
+            yield _sse('snapshot', version, rows)
+        elif rows:
+            yield _sse('update', version, rows)
+
+        deadline = time.monotonic() + KITCHEN_STREAM_DURATION
+        idle = 0
+        while time.monotonic() < deadline:
+            await asyncio.sleep(KITCHEN_POLL_INTERVAL)
+            current = await sync_to_async(kitchen.kitchen_version)()
+            if current == version:
+                idle += KITCHEN_POLL_INTERVAL
+                if idle >= KITCHEN_HEARTBEAT:
+                    idle = 0
+                    yield ': ping\n\n'
+                continue
+            rows = await sync_to_async(kitchen.events_since)(version, current)
+            if rows is None:
+                yield _sse('snapshot', current, await sync_to_async(kitchen.production_queue)())
+            else:
+                yield _sse('update', current, rows)
+            version, idle = current, 0
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# Prévision du stock du matin
 @api_view(['GET'])
-def notifications_unread_count(request):
-    """Compter les notifications non lues"""
-    return Response({'count': 0})
+def stock_forecast(request):
+    """Stock conseillé par produit (?date=AAAA-MM-JJ, ?weeks=, ?method=ewma|ma, ?safety=)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+    try:
+        target = forecasting.parse_target(request.query_params.get('date'))
+        weeks = int(request.query_params.get('weeks', forecasting.DEFAULT_WEEKS))
+        safety = float(request.query_params.get('safety', forecasting.DEFAULT_SAFETY))
+        method = request.query_params.get('method', 'ewma')
+        results = forecasting.suggest_stock(target, weeks=weeks, method=method, safety=safety)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+    return Response({'date': target or timezone.localdate() + timedelta(days=1), 'results': results})
 
 # Vues pour les utilisateurs
 @api_view(['GET'])
 def users_list(request):
-    """Lister les utilisateurs"""
+    """Lister les utilisateurs avec leurs compteurs de commandes (?q=début du nom ou de l'email, ?ordering=, ?page=, ?page_size=)"""
     if not request.user.is_staff:
         return Response({'error': 'Accès non autorisé'}, status=403)
-    
-    from django.contrib.auth.models import User
-    users = User.objects.all().values('id', 'username', 'email', 'is_staff', 'is_active')
-    return Response(list(users))
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', customer_stats.DEFAULT_PAGE_SIZE)), 1),
+                        customer_stats.MAX_PAGE_SIZE)
+        count, results = customer_stats.users_page(
+            request.query_params.get('ordering', customer_stats.DEFAULT_SORT), page, page_size,
+            search=request.query_params.get('q', ''),
+        )
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+    return Response({'count': count, 'page': page, 'page_size': page_size, 'results': results})
+
+
+def _user_ids(request):
+    """Identifiants ``{"ids": [...]}`` du corps de requête, ou une Response d'erreur."""
+    ids = request.data.get('ids')
+    if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+        return Response({'error': '"ids" doit être une liste d\'identifiants'}, status=400)
+    if len(ids) > MAX_BULK_USERS:
+        return Response({'error': f"{MAX_BULK_USERS} utilisateurs au maximum par appel"}, status=400)
+    return ids
+
+
+def _set_active(request, ids, active):
+    # Un seul UPDATE ; on ne se désactive pas soi-même, ni un superutilisateur
+    users = User.objects.filter(pk__in=ids).exclude(pk=request.user.pk)
+    if not active and not request.user.is_superuser:
+        users = users.exclude(is_superuser=True)
+    updated = users.exclude(is_active=active).update(is_active=active)
+    # UPDATE en masse : pas de signal, le cache d'authentification est vidé ici
+    for pk in ids:
+        invalidate_cached_user(pk)
+    return updated
+
+
+def _dry_run(request):
+    return request.query_params.get('dry_run', '').lower() in ('1', 'true')
+
+
+def _delete(request, ids):
+    # Les comptes de l'équipe ne se suppriment pas depuis l'annuaire
+    deletable = list(User.objects.filter(pk__in=ids, is_staff=False, is_superuser=False).values_list('pk', flat=True))
+    return delete_users(deletable, dry_run=_dry_run(request))
+
+
+@api_view(['POST'])
+def users_bulk_active(request):
+    """Activer ou désactiver plusieurs utilisateurs : {"ids": [...], "is_active": true|false}"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+    ids = _user_ids(request)
+    if isinstance(ids, Response):
+        return ids
+    active = request.data.get('is_active')
+    if not isinstance(active, bool):
+        return Response({'error': 'Champ "is_active" (booléen) manquant'}, status=400)
+    return Response({'updated': _set_active(request, ids, active), 'requested': len(set(ids))})
+
+
+@api_view(['POST'])
+def user_toggle_active(request, pk):
+    """Activer / désactiver un utilisateur"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+    active = User.objects.filter(pk=pk).values_list('is_active', flat=True).first()
+    if active is None:
+        return Response({'error': 'Utilisateur introuvable'}, status=404)
+    if not _set_active(request, [pk], not active):
+        return Response({'error': 'Action impossible sur cet utilisateur'}, status=403)
+    return Response({'id': pk, 'is_active': not active})
+
+
+@api_view(['POST'])
+def users_bulk_delete(request):
+    """Supprimer plusieurs utilisateurs (commandes archivées) : {"ids": [...]} (sauf équipe, ?dry_run=1 pour compter)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+    ids = _user_ids(request)
+    if isinstance(ids, Response):
+        return ids
+    return Response({'deleted': _delete(request, ids), 'requested': len(set(ids))})
+
+
+@api_view(['DELETE'])
+def user_delete(request, pk):
+    """Supprimer un utilisateur, commandes archivées (sauf équipe, ?dry_run=1 pour compter)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+    if not User.objects.filter(pk=pk).exists():
+        return Response({'error': 'Utilisateur introuvable'}, status=404)
+    deleted = _delete(request, [pk])
+    if not deleted['users']:
+        return Response({'error': 'Les comptes de l\'équipe ne peuvent pas être supprimés ici'}, status=403)
+    return Response({'deleted': deleted})
+
+# Export des commandes pour la comptabilité
+@api_view(['GET'])
+def orders_export(request):
+    """Exporter les commandes et leurs articles en CSV ou NDJSON (flux)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+
+    export_format = request.query_params.get('output', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response({'error': f"Format inconnu : {export_format}"}, status=400)
+
+    dates = {}
+    for param in ('date_from', 'date_to'):
+        value = request.query_params.get(param)
+        if value:
+            dates[param] = parse_date(value)
+            if dates[param] is None:
+                return Response({'error': f"Date invalide pour {param} (AAAA-MM-JJ)"}, status=400)
+
+    status_filter = request.query_params.get('status')
+    if status_filter and status_filter not in dict(Order.STATUS_CHOICES):
+        return Response({'error': f"Statut inconnu : {status_filter}"}, status=400)
+
+    content_type = 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson'
+    chunks = export_orders(export_format, status=status_filter, **dates)
+    if isinstance(request._request, ASGIRequest):
+        # Un itérateur synchrone serait lu en entier avant le premier octet
+        chunks = aiter_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="commandes.{export_format}"'
+    return response
+
+# Recherche dans le catalogue
+@api_view(['GET'])
+def products_search(request):
+    """Rechercher des produits par nom/description (?q=..., classés par pertinence)"""
+    query = request.query_params.get('q', '')
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', SEARCH_LIMIT)), 100))
+    except ValueError:
+        return Response({'error': 'limit doit être un entier'}, status=400)
+
+    queryset = Product.objects.all()
+    if not request.user.is_staff:
+        queryset = queryset.filter(available=True)
+    products = search_products(query, limit=limit, queryset=queryset)
+    serializer = ProductSerializer(products, many=True)
+    return Response(serializer.data)
+
+# Catalogue filtrable avec compteurs de facettes
+@api_view(['GET'])
+def products_catalog(request):
+    """Page de produits filtrée + compteurs par catégorie, disponibilité et tranche de prix"""
+    try:
+        filters = catalog.parse_filters(request.query_params)
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', catalog.DEFAULT_PAGE_SIZE)), 1), catalog.MAX_PAGE_SIZE)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+
+    ordering = request.query_params.get('ordering', '-created_at')
+    if ordering not in catalog.ORDERINGS:
+        return Response({'error': f"Tri inconnu : {ordering}"}, status=400)
+
+    # La page ne dépend que du catalogue et des paramètres : on la garde en
+    # cache, et le middleware de compression y associe ses octets compressés
+    key = catalog.page_cache_key(request.META.get('QUERY_STRING', ''))
+    data = cache.get(key)
+    if data is None:
+        count, facets = catalog.compute_facets(catalog.facet_cube(), filters)
+        offset = (page - 1) * page_size
+        products = catalog.filter_queryset(Product.objects.all(), filters).order_by(ordering, 'id')[offset:offset + page_size]
+        data = {
+            'count': count,
+            'page': page,
+            'page_size': page_size,
+            'results': ProductSerializer(products, many=True).data,
+            'facets': facets,
+        }
+        cache.set(key, data, catalog.FACETS_CACHE_TIMEOUT)
+    response = Response(data)
+    if request.accepted_renderer.format == 'json':
+        response.compression_cache_key = key
+    return response
+
+# Import en masse du catalogue
+@api_view(['POST'])
+def products_import(request):
+    """Importer un fichier CSV/JSON de produits (upsert, ?dry_run=1 pour simuler)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Accès non autorisé'}, status=403)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Fichier manquant (champ "file")'}, status=400)
+
+    file_format = request.query_params.get('input') or guess_format(upload.name)
+    dry_run = request.query_params.get('dry_run') in ('1', 'true', 'yes')
+    try:
+        report = import_products(upload.file, file_format, dry_run=dry_run)
+    except (ImportFormatError, UnicodeDecodeError) as exc:
+        return Response({'error': str(exc)}, status=400)
+
+    return Response(report, status=400 if report['errors'] else 200)
+
+# Plusieurs appels API en un seul aller-retour
+@api_view(['POST'])
+def batch(request):
+    """Exécuter une liste de sous-requêtes vers les routes /api/ existantes"""
+    try:
+        specs = parse_batch(request.data)
+    except BatchError as exc:
+        return Response({'error': str(exc)}, status=400)
+    return HttpResponse(run_batch(request._request, specs), content_type='application/json')
 
 # Vues pour les messages de contact avec le bon nom d'endpoint
 @api_view(['GET'])
 def mes_messages(request):
-    """Récupérer les messages de l'utilisateur connecté"""
-    messages = ContactMessage.objects.filter(user=request.user)
-    serializer = ContactMessageSerializer(messages, many=True)
+    """Récupérer les messages de l'utilisateur connecté, avec les réponses (une seule requête)"""
+    messages = (
+        ContactMessage.objects
+        .filter(user=request.user)
+        .select_related('repondu_par')
+        .only(*MES_MESSAGES_FIELDS)
+        .order_by('-created_at')
+    )
+    serializer = MesMessagesSerializer(messages, many=True)
     return Response(serializer.data)
 
 # Corriger la vue ProductViewSet pour gérer les uploads
@@ -181,9 +720,37 @@ class ProductViewSet(viewsets.ModelViewSet):
             serializer.save()
 
 # Mettre à jour ProductViewSet pour gérer les URLs
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, DeltaSyncMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    sync_model = 'product'
+
+    @property
+    def conditional_dependencies(self):
+        # Le détail embarque les recommandations : leur recalcul change l'ETag
+        if self.action == 'retrieve':
+            return ('recommendations__computed_at',)
+        return ()
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == 200 and self.requested_fields() is None:
+            response.data['recommendations'] = recommendations_for(self.kwargs['pk'])
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        """Supprimer un produit : ses commandes terminées sont archivées (?dry_run=1 pour compter)"""
+        product = self.get_object()
+        try:
+            deleted = delete_products([product.pk], dry_run=_dry_run(request))
+        except DeletionError as exc:
+            return Response({'error': str(exc)}, status=409)
+        return Response({'deleted': deleted})
+
+    @action(detail=True, methods=['get'])
+    def recommendations(self, request, pk=None):
+        """Produits souvent achetés avec celui-ci"""
+        return Response(recommendations_for(pk))
     
     def perform_create(self, serializer):
         image_data = self.request.data.get('image')
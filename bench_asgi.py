@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Benchmark : déploiement synchrone (gunicorn + workers sync, WSGI) contre
+déploiement async (gunicorn + UvicornWorker, ASGI).
+
+Pour chaque mode, le script démarre gunicorn, ouvre `--concurrency`
+connexions keep-alive qui appellent `--path` en boucle pendant `--duration`
+secondes, puis affiche le débit, la latence et la mémoire (RSS du maître et
+des workers, lue dans /proc) ramenée au nombre de connexions simultanées.
+
+Exemples :
+    python bench_asgi.py
+    python bench_asgi.py --concurrency 200 --path /api/notifications/unread_count/
+    # Attente longue (nécessite une session authentifiée) :
+    python bench_asgi.py --cookie "sessionid=..." \\
+        --path "/api/notifications/unread_count/?wait=5&count=0"
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODES = {
+    'sync (wsgi)': ['delices_backend.wsgi:application', '-k', 'sync'],
+    'async (asgi)': ['delices_backend.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def rss_kib(pid):
+    """RSS du processus et de ses enfants (Kio), Linux uniquement."""
+    total = 0
+    pids = [pid]
+    try:
+        children = subprocess.run(['pgrep', '-P', str(pid)], capture_output=True, text=True).stdout.split()
+        pids.extend(int(child) for child in children)
+    except FileNotFoundError:
+        pass
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return True
+        time.sleep(0.2)
+    return False
+
+
+async def client(port, request, stop_at, latencies, errors):
+    reader = writer = None
+    while time.monotonic() < stop_at:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            start = time.monotonic()
+            writer.write(request)
+            await writer.drain()
+            headers = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in headers.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            latencies.append(time.monotonic() - start)
+            if b'connection: close' in headers.lower():
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            errors.append(1)
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, path, cookie, concurrency, duration, server_pid):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: application/json\r\n'
+        + (f'Cookie: {cookie}\r\n' if cookie else '')
+        + 'Connection: keep-alive\r\n\r\n'
+    ).encode()
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    tasks = [asyncio.create_task(client(port, request, stop_at, latencies, errors)) for _ in range(concurrency)]
+    await asyncio.sleep(duration / 2)
+    peak_rss = rss_kib(server_pid)
+    await asyncio.gather(*tasks)
+    return latencies, len(errors), peak_rss
+
+
+def run_mode(name, target, args):
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'delices_backend.settings')
+    command = [
+        sys.executable, '-m', 'gunicorn', *target,
+        '--workers', str(args.workers), '--bind', f'127.0.0.1:{args.port}',
+        '--log-level', 'warning', '--timeout', '120',
+    ]
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    try:
+        if not wait_for_port(args.port):
+            print(f"{name:<14} le serveur n'a pas démarré")
+            return
+        time.sleep(1)
+        idle_rss = rss_kib(server.pid)
+        latencies, errors, peak_rss = asyncio.run(
+            load(args.port, args.path, args.cookie, args.concurrency, args.duration, server.pid)
+        )
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    if not latencies:
+        print(f"{name:<14} aucune réponse ({errors} erreurs)")
+        return
+    latencies.sort()
+    per_connection = max(peak_rss - idle_rss, 0) / args.concurrency
+    print(
+        f"{name:<14} {len(latencies) / args.duration:8.0f} req/s"
+        f"   p50 {statistics.median(latencies) * 1000:7.1f} ms"
+        f"   p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms"
+        f"   erreurs {errors:5d}"
+        f"   RSS {idle_rss / 1024:6.1f} -> {peak_rss / 1024:6.1f} Mio"
+        f"   {per_connection:6.1f} Kio/connexion"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/notifications/unread_count/')
+    parser.add_argument('--cookie', default='', help="En-tête Cookie (ex. sessionid=...) pour une session authentifiée")
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--mode', choices=list(MODES), action='append', help="Mode(s) à mesurer (tous par défaut)")
+    args = parser.parse_args()
+
+    print(f"{args.path} : {args.concurrency} connexions, {args.workers} workers, {args.duration:.0f} s\n")
+    for name in args.mode or MODES:
+        run_mode(name, MODES[name], args)
+
+
+if __name__ == '__main__':
+    main()
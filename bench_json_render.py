@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark du rendu JSON : JSONRenderer de DRF vs FastJSONRenderer (orjson / stdlib)
+sur une liste de 10 000 commandes avec leurs articles.
+
+Usage : python bench_json_render.py [nombre_de_commandes] [répétitions]
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'delices_backend.settings')
+
+import django
+django.setup()
+
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer, orjson
+
+
+def build_orders(count, datetimes_as_strings):
+    """Charge utile de la forme de OrderSerializer (3 articles par commande, montants en FCFA entiers)."""
+    start = datetime(2025, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+    def when(value):
+        if value is None or not datetimes_as_strings:
+            return value
+        # Comme DateTimeField de DRF
+        return value.isoformat().replace('+00:00', 'Z')
+
+    orders = []
+    for i in range(count):
+        created = start + timedelta(minutes=17 * i)
+        items = [
+            {
+                'id': i * 3 + j,
+                'product': j + 1,
+                'product_name': f'Gâteau au chocolat n°{j}',
+                'product_price': 1500 + 250 * j,
+                'quantity': j + 1,
+                'total_price': (1500 + 250 * j) * (j + 1),
+            }
+            for j in range(3)
+        ]
+        orders.append({
+            'id': i,
+            'user': i % 50,
+            'customer_name': f'Client {i}',
+            'customer_email': f'client{i}@example.com',
+            'customer_phone': '+221 77 000 00 00',
+            'items': items,
+            'total_amount': sum(item['total_price'] for item in items),
+            'refund_amount': 0,
+            'status': 'pending',
+            'notes': 'Sans noix, merci !',
+            'pickup_at': when(created + timedelta(hours=4) if i % 2 else None),
+            'created_at': when(created),
+            'updated_at': when(created),
+        })
+    return orders
+
+
+def bench(label, renderer, data, repeat):
+    best = min(timeit.repeat(lambda: renderer.render(data), number=1, repeat=repeat))
+    size = len(renderer.render(data))
+    print(f"{label:<42} {best * 1000:8.1f} ms   {size / 1024:8.0f} Kio")
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"{count} commandes, meilleur temps sur {repeat} essais\n")
+
+    serialized = build_orders(count, datetimes_as_strings=True)
+    native = build_orders(count, datetimes_as_strings=False)
+
+    baseline = bench("DRF JSONRenderer (sortie serializer)", JSONRenderer(), serialized, repeat)
+    with override_settings(JSON_BACKEND='stdlib'):
+        bench("FastJSONRenderer stdlib (sortie serializer)", FastJSONRenderer(), serialized, repeat)
+    if orjson is None:
+        print("\norjson non installé : seul le repli stdlib est mesuré")
+        return
+    with override_settings(JSON_BACKEND='orjson'):
+        fast = bench("FastJSONRenderer orjson (sortie serializer)", FastJSONRenderer(), serialized, repeat)
+        native_time = bench("FastJSONRenderer orjson (datetime natifs)", FastJSONRenderer(), native, repeat)
+    baseline_native = bench("DRF JSONRenderer (datetime natifs)", JSONRenderer(), native, repeat)
+    print(f"\nGain orjson : x{baseline / fast:.1f} (chaînes), x{baseline_native / native_time:.1f} (types natifs)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 import dj_database_url
+from corsheaders.defaults import default_headers
 from decouple import config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,17 +25,63 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.middleware.StaticFilesMiddleware',
+    'api.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'delices_backend.urls'
 
+# Sessions : 'cached_db' (défaut) évite la lecture en base à chaque requête,
+# 'signed_cookies' supprime complètement la table (données côté client, signées),
+# 'db' revient au comportement par défaut de Django.
+SESSION_BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+# Les sessions 'cached_db' sont lues dans le cache partagé (CACHES plus bas) :
+# sans requête SQL avec Redis, mais une requête sur la table du cache avec
+# CACHE_URL=db.
+SESSION_ENGINE = SESSION_BACKENDS[config('SESSION_BACKEND', default='cached_db')]
+
+# Cache partagé par tous les workers : version du catalogue, journal de la
+# cuisine, réponses compressées, compteur de messages non lus.
+# CACHE_URL=redis://... (Redis), CACHE_URL=db (table créée au build par
+# createcachetable) ; sans CACHE_URL, cache en mémoire propre à chaque
+# processus, réservé au développement.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL == 'db':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Durée (secondes) pendant laquelle un utilisateur authentifié reste en cache
+# dans chaque processus ; les modifications sont propagées aux autres
+# processus par le cache partagé (voir api/middleware.py)
+USER_CACHE_TTL = config('USER_CACHE_TTL', default=30, cast=int)
+
 # Configuration Render - utilise DATABASE_URL si disponible, sinon configuration locale
 if config('DATABASE_URL', default=None):
     DATABASES = {
@@ -52,6 +99,10 @@ else:
         }
     }
 
+# Recherche plein texte (SearchQuery, trigrammes) : uniquement sur PostgreSQL
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    INSTALLED_APPS.append('django.contrib.postgres')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -83,8 +134,40 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Django REST Framework : rendu/lecture JSON via orjson si installé (voir api/renderers.py)
+JSON_BACKEND = config('JSON_BACKEND', default='auto')
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Compression des réponses (Brotli si le paquet est installé, sinon gzip) au-delà de ce seuil (octets)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
+# Synchronisation incrémentale : durée de conservation des suppressions (jours)
+TOMBSTONE_RETENTION_DAYS = config('TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Rétention des notifications lues (manage.py purge_notifications), en jours
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+
+# Archivage des commandes livrées ou annulées (manage.py archive_orders), en jours
+ORDER_ARCHIVE_AFTER_DAYS = config('ORDER_ARCHIVE_AFTER_DAYS', default=365, cast=int)
+
+# Durée de conservation des réponses rejouables (en-tête Idempotency-Key), en heures
+IDEMPOTENCY_KEY_TTL_HOURS = config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int)
+# Délai (secondes) après lequel une requête restée sans réponse libère sa clé
+IDEMPOTENCY_LEASE_SECONDS = config('IDEMPOTENCY_LEASE_SECONDS', default=120, cast=int)
+
 # Configuration CORS
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:8000,http://127.0.0.1:8000').split(',')
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Configuration Whitenoise pour les médias
 WHITENOISE_USE_FINDERS = True
@@ -11,6 +11,7 @@ const API_ENDPOINTS = {
     orders: `${API_BASE_URL}/orders/`,
     contact: `${API_BASE_URL}/contact/`,
     notifications: `${API_BASE_URL}/notifications/`,
+    users: `${API_BASE_URL}/users/`,
 };
 
 /**
@@ -98,6 +99,30 @@ async function apiCall(url, options = {}) {
     }
 }
 
+/**
+ * Appel non rejouable (création de commande, changement de statut) : une même
+ * clé Idempotency-Key accompagne l'appel et ses nouvelles tentatives après une
+ * coupure réseau, le serveur renvoie alors la réponse déjà produite.
+ */
+async function idempotentCall(url, options = {}, retries = 2) {
+    const key = (window.crypto && crypto.randomUUID)
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).substring(2)}`;
+    const finalOptions = {
+        ...options,
+        headers: { ...options.headers, 'Idempotency-Key': key },
+    };
+    for (let attempt = 0; ; attempt++) {
+        try {
+            return await apiCall(url, finalOptions);
+        } catch (error) {
+            // fetch lève TypeError quand la requête n'a pas abouti (réseau)
+            if (!(error instanceof TypeError) || attempt >= retries) throw error;
+            await new Promise((resolve) => setTimeout(resolve, 500 * (attempt + 1)));
+        }
+    }
+}
+
 // Helper: lire un cookie par nom (utilisé pour CSRF)
 function getCookie(name) {
     const value = `; ${document.cookie}`;
@@ -140,11 +165,23 @@ const ProductsAPI = {
         return unwrapListResponse(r) || [];
     },
 
+    // GET /api/products/?updated_since= - Modifications depuis server_time du dernier appel
+    // Réponse: { results, deleted, server_time, reset }
+    getChanges: async (since, params = {}) => {
+        const queryString = new URLSearchParams({ ...params, updated_since: since }).toString();
+        return await apiCall(`${API_ENDPOINTS.products}?${queryString}`);
+    },
+
     // GET /api/products/{id}/ - Détails d'un produit
     getById: async (id) => {
         return await apiCall(`${API_ENDPOINTS.products}${id}/`);
     },
 
+    // GET /api/products/{id}/recommendations/ - Souvent achetés avec ce produit
+    getRecommendations: async (id) => {
+        return await apiCall(`${API_ENDPOINTS.products}${id}/recommendations/`);
+    },
+
     // POST /api/products/ - Créer un produit
     create: async (data) => {
         const body = data instanceof FormData ? data : JSON.stringify(data);
@@ -173,8 +210,9 @@ const ProductsAPI = {
     },
 
     // DELETE /api/products/{id}/ - Supprimer un produit
-    delete: async (id) => {
-        return await apiCall(`${API_ENDPOINTS.products}${id}/`, {
+    // Réponse: { deleted: { products, archived_orders, ... } } ; 409 si le produit est dans une commande en cours
+    delete: async (id, dryRun = false) => {
+        return await apiCall(`${API_ENDPOINTS.products}${id}/${dryRun ? '?dry_run=1' : ''}`, {
             method: 'DELETE',
         });
     },
@@ -194,6 +232,19 @@ const ProductsAPI = {
         });
     },
 
+    // GET /api/products/search/?q= - Recherche plein texte (classée par pertinence)
+    search: async (q, params = {}) => {
+        const queryString = new URLSearchParams({ q, ...params }).toString();
+        return await apiCall(`${API_ENDPOINTS.products}search/?${queryString}`);
+    },
+
+    // GET /api/products/catalog/ - Page filtrée + compteurs de facettes
+    // params: category (répétable), price_band (répétable), available, page, page_size, ordering
+    getCatalog: async (params = {}) => {
+        const queryString = new URLSearchParams(params).toString();
+        return await apiCall(`${API_ENDPOINTS.products}catalog/?${queryString}`);
+    },
+
     // GET /api/products/low_stock/ - Produits avec stock faible
     getLowStock: async () => {
         return await apiCall(`${API_ENDPOINTS.products}low_stock/`);
@@ -217,6 +268,13 @@ const OrdersAPI = {
         return unwrapListResponse(r) || [];
     },
 
+    // GET /api/orders/?updated_since= - Modifications depuis server_time du dernier appel
+    // Réponse: { results, deleted, server_time, reset }
+    getChanges: async (since, params = {}) => {
+        const queryString = new URLSearchParams({ ...params, updated_since: since }).toString();
+        return await apiCall(`${API_ENDPOINTS.orders}?${queryString}`);
+    },
+
     // GET /api/orders/{id}/ - Détails d'une commande
     getById: async (id) => {
         return await apiCall(`${API_ENDPOINTS.orders}${id}/`);
@@ -224,7 +282,7 @@ const OrdersAPI = {
 
     // POST /api/orders/ - Créer une commande
     create: async (data) => {
-        return await apiCall(API_ENDPOINTS.orders, {
+        return await idempotentCall(API_ENDPOINTS.orders, {
             method: 'POST',
             body: JSON.stringify(data),
         });
@@ -255,26 +313,49 @@ const OrdersAPI = {
 
     // POST /api/orders/{id}/update_status/ - Mettre à jour le statut
     updateStatus: async (id, status) => {
-        return await apiCall(`${API_ENDPOINTS.orders}${id}/update_status/`, {
+        return await idempotentCall(`${API_ENDPOINTS.orders}${id}/update_status/`, {
             method: 'POST',
             body: JSON.stringify({ status }),
         });
     },
 
+    // POST /api/orders/bulk_status/ - Marquer plusieurs commandes prêtes/livrées
+    // Réponse: { updated, requested }
+    bulkStatus: async (ids, status) => {
+        return await idempotentCall(`${API_ENDPOINTS.orders}bulk_status/`, {
+            method: 'POST',
+            body: JSON.stringify({ ids, status }),
+        });
+    },
+
     // POST /api/orders/{id}/cancel/ - Annuler une commande
     cancel: async (id) => {
-        return await apiCall(`${API_ENDPOINTS.orders}${id}/cancel/`, {
+        return await idempotentCall(`${API_ENDPOINTS.orders}${id}/cancel/`, {
             method: 'POST',
         });
     },
 
     // POST /api/orders/{id}/confirm/ - Confirmer une commande
     confirm: async (id) => {
-        return await apiCall(`${API_ENDPOINTS.orders}${id}/confirm/`, {
+        return await idempotentCall(`${API_ENDPOINTS.orders}${id}/confirm/`, {
+            method: 'POST',
+        });
+    },
+
+    // POST /api/orders/{id}/refund/ - Rembourser tout ou partie d'une commande (FCFA)
+    refund: async (id, amount) => {
+        return await idempotentCall(`${API_ENDPOINTS.orders}${id}/refund/`, {
             method: 'POST',
+            body: JSON.stringify({ amount }),
         });
     },
 
+    // GET /api/orders/export/ - URL de l'export CSV/NDJSON (téléchargement direct)
+    exportUrl: (params = {}) => {
+        const queryString = new URLSearchParams(params).toString();
+        return queryString ? `${API_ENDPOINTS.orders}export/?${queryString}` : `${API_ENDPOINTS.orders}export/`;
+    },
+
     // GET /api/orders/statistics/ - Statistiques des commandes
     getStatistics: async () => {
         return await apiCall(`${API_ENDPOINTS.orders}statistics/`);
@@ -324,6 +405,11 @@ const ContactAPI = {
     getUnread: async () => {
         return await apiCall(`${API_ENDPOINTS.contact}unread/`);
     },
+
+    // GET /api/contact/unread_count/ - Nombre de messages non lus { count }
+    getUnreadCount: async () => {
+        return await apiCall(`${API_ENDPOINTS.contact}unread_count/`);
+    },
 };
 
 /**
@@ -381,9 +467,112 @@ const MessagesAPI = {
     },
 };
 
+/**
+ * API Batch : plusieurs appels en un seul aller-retour
+ * requests: [{ method: 'GET', path: '/api/products/?fields=id,name' }, { method: 'POST', path: ..., body: {...} }]
+ * Réponse: { responses: [{ status, headers, body }, ...] } dans le même ordre
+ */
+const BatchAPI = {
+    run: async (requests) => {
+        return await apiCall(`${API_BASE_URL}/batch/`, {
+            method: 'POST',
+            body: JSON.stringify({ requests }),
+        });
+    },
+};
+
+/**
+ * API Cuisine : file de production (produits à préparer, triés par heure de retrait)
+ * Ligne: { product_id, product_name, category, quantity, orders, next_pickup }
+ */
+const KitchenAPI = {
+    // GET /api/kitchen/queue/ - File complète { version, results }
+    getQueue: async () => {
+        return await apiCall(`${API_BASE_URL}/kitchen/queue/`);
+    },
+
+    // GET /api/kitchen/forecast/ - Stock conseillé du matin { date, results }
+    // params: { date: 'AAAA-MM-JJ', weeks, method: 'ewma' | 'ma', safety }
+    getForecast: async (params = {}) => {
+        const queryString = new URLSearchParams(params).toString();
+        return await apiCall(`${API_BASE_URL}/kitchen/forecast/${queryString ? `?${queryString}` : ''}`);
+    },
+
+    // GET /api/kitchen/stream/ (SSE) - onChange(lignes triées) à chaque mise à jour.
+    // Retourne une fonction pour se désabonner.
+    subscribe: (onChange) => {
+        const rows = new Map();
+        const source = new EventSource(`${API_BASE_URL}/kitchen/stream/`, { withCredentials: true });
+        const emit = () => {
+            const sorted = [...rows.values()].sort((a, b) =>
+                String(a.next_pickup).localeCompare(String(b.next_pickup)) || a.product_id - b.product_id);
+            onChange(sorted);
+        };
+        source.addEventListener('snapshot', (event) => {
+            rows.clear();
+            JSON.parse(event.data).forEach((row) => rows.set(row.product_id, row));
+            emit();
+        });
+        source.addEventListener('update', (event) => {
+            // Une quantité nulle signifie que le produit sort de la file
+            JSON.parse(event.data).forEach((row) => {
+                if (row.quantity > 0) rows.set(row.product_id, row);
+                else rows.delete(row.product_id);
+            });
+            emit();
+        });
+        return () => source.close();
+    },
+};
+
+/**
+ * API Utilisateurs (staff)
+ */
+const UsersAPI = {
+    // GET /api/users/list/ - Utilisateurs et compteurs de commandes, paginés
+    // params: { q: début du nom ou de l'email, ordering: 'username' | '-order_count' | '-total_spent' | '-last_order_at' ..., page, page_size }
+    // Réponse: { count, page, page_size, results }
+    getAll: async (params = {}) => {
+        const queryString = new URLSearchParams(params).toString();
+        return await apiCall(`${API_ENDPOINTS.users}list/${queryString ? `?${queryString}` : ''}`);
+    },
+
+    // POST /api/users/{id}/toggle-active/ - Activer / désactiver
+    toggleActive: async (id) => {
+        return await apiCall(`${API_ENDPOINTS.users}${id}/toggle-active/`, { method: 'POST' });
+    },
+
+    // POST /api/users/bulk_active/ - Activer / désactiver plusieurs utilisateurs
+    // Réponse: { updated, requested }
+    bulkActive: async (ids, isActive) => {
+        return await apiCall(`${API_ENDPOINTS.users}bulk_active/`, {
+            method: 'POST',
+            body: JSON.stringify({ ids, is_active: isActive }),
+        });
+    },
+
+    // DELETE /api/users/{id}/delete/ - Supprimer un utilisateur (commandes archivées)
+    // dryRun: seulement compter ce qui serait supprimé
+    delete: async (id, dryRun = false) => {
+        return await apiCall(`${API_ENDPOINTS.users}${id}/delete/${dryRun ? '?dry_run=1' : ''}`, { method: 'DELETE' });
+    },
+
+    // POST /api/users/bulk_delete/ - Supprimer plusieurs utilisateurs
+    // Réponse: { deleted: { users, archived_orders, archived_order_items, contact_messages, notifications }, requested }
+    bulkDelete: async (ids, dryRun = false) => {
+        return await apiCall(`${API_ENDPOINTS.users}bulk_delete/${dryRun ? '?dry_run=1' : ''}`, {
+            method: 'POST',
+            body: JSON.stringify({ ids }),
+        });
+    },
+};
+
 // Exporter les API
 window.ProductsAPI = ProductsAPI;
 window.OrdersAPI = OrdersAPI;
 window.ContactAPI = ContactAPI;
 window.NotificationsAPI = NotificationsAPI;
 window.MessagesAPI = MessagesAPI;
+window.BatchAPI = BatchAPI;
+window.KitchenAPI = KitchenAPI;
+window.UsersAPI = UsersAPI;
@@ -229,12 +229,12 @@ function generateId() {
 }
 
 /**
- * Formate un prix en euros
+ * Formate un prix en FCFA (montant entier, sans centimes)
  * @param {number} price - Prix à formater
  * @returns {string} Prix formaté
  */
 function formatPrice(price) {
-    return `${parseFloat(price).toFixed(2)} cfa`;
+    return `${Math.round(Number(price))} cfa`;
 }
 
 /**
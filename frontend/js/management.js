@@ -114,8 +114,8 @@ async function loadStockManagement() {
     try {
         container.innerHTML = '<div class="loading">Chargement...</div>';
         
-        // Récupérer tous les produits
-        let products = await ProductsAPI.getAll();
+        // Récupérer tous les produits (uniquement les champs affichés sur les cartes de stock)
+        let products = await ProductsAPI.getAll({ fields: 'id,name,category,stock' });
         // console.log('management.loadStockManagement - raw products:', products);
         products = normalizeListResponse(products);
 
@@ -11,6 +11,9 @@ python debug_render.py
 echo "🗄️  Migration de la base de données..."
 python manage.py migrate --noinput || echo "⚠️ Migration échouée, continuation..."
 
+echo "🗃️  Table du cache partagé (CACHE_URL=db)..."
+python manage.py createcachetable
+
 echo "🔧 Création superuser si nécessaire..."
 python manage.py shell -c "
 from django.contrib.auth.models import User